@@ -0,0 +1,75 @@
+# analytics.py
+"""
+Sales analytics for the app's Analytics tab.
+
+Every figure is an aggregate computed by the backend (GROUP BY queries on the
+warehouse, see statements.py), so a dashboard view transfers a few hundred rows
+instead of the order history.
+
+Results live in their own cache with a fixed refresh interval
+(STORE_ANALYTICS_REFRESH_SECONDS). Unlike the list cache it is not invalidated by
+every order write: a busy store would otherwise recompute the dashboard on nearly
+every view. ``refresh()`` drops it on demand.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+import store
+from backends import utcnow
+from cache import ResultCache, cached_query
+from shared_cache import shared_cache
+
+GRAINS = ("day", "week", "month")
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("STORE_ANALYTICS_REFRESH_SECONDS", "600"))
+# Stand-in lower bound for "all time", so every query keeps the same shape.
+ALL_TIME = datetime(1970, 1, 1)
+
+_cache = shared_cache("analytics", ANALYTICS_REFRESH_SECONDS, 64) or ResultCache(ttl=ANALYTICS_REFRESH_SECONDS, max_entries=64)
+
+
+def get_cache() -> ResultCache:
+    return _cache
+
+
+def refresh():
+    """Drops every cached aggregate; the next view recomputes them."""
+    _cache.invalidate()
+
+
+def _since(days: Optional[int]) -> datetime:
+    if not days:
+        return ALL_TIME
+    # Whole days, so the cache key's window does not move between calls.
+    return datetime.combine((utcnow() - timedelta(days=days)).date(), datetime.min.time())
+
+
+@cached_query(get_cache)
+def revenue_by_period(grain: str = "day", days: Optional[int] = 90) -> pd.DataFrame:
+    """Orders, revenue and average order value per day, week or month (column ``period``)."""
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+    df = store.get_backend().revenue_by_period(grain, _since(days))
+    # SQLite returns the bucket as text, the warehouse as a timestamp.
+    return df.assign(period=pd.to_datetime(df["period"], format="ISO8601"))
+
+
+@cached_query(get_cache)
+def sales_summary(days: Optional[int] = 90) -> dict:
+    """Totals for the window plus ``computed_at``, the time the figures were computed."""
+    summary = dict(store.get_backend().sales_summary(_since(days)))
+    summary["computed_at"] = utcnow()
+    return summary
+
+
+@cached_query(get_cache)
+def top_products(days: Optional[int] = 90, top_n: int = 10) -> pd.DataFrame:
+    return store.get_backend().top_products(_since(days), int(top_n))
+
+
+@cached_query(get_cache)
+def top_customers(days: Optional[int] = 90, top_n: int = 10) -> pd.DataFrame:
+    return store.get_backend().top_customers(_since(days), int(top_n))
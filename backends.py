@@ -0,0 +1,827 @@
+# backends.py
+"""
+Storage backends behind store.py.
+
+``StoreBackend`` is the repository interface for customer, product and order
+operations. A backend implements a handful of table-level primitives (insert,
+update, delete, list, page, bulk write); the entity operations the app calls are
+defined once on top of them and can be overridden where a backend has something
+faster (the SQL backend in store.py uses its prepared statements).
+
+Implementations:
+- ``store.SQLBackend``     Databricks SQL Warehouse, or a local SQLite file (raw DB-API + pool)
+- ``SQLAlchemyBackend``    database.py's engine: MSSQL, or its SQLite fallback
+- ``MemoryBackend``        process-local dicts; no I/O, for load tests and UI development
+
+store.use_backend() / the STORE_BACKEND environment variable pick one.
+"""
+
+import operator
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from schema import ROLLUP_KEYS, TABLE_COLUMNS, TABLE_SCHEMAS
+
+# Day range covering every order, for rollup operations without explicit bounds.
+ROLLUP_MIN_DAY = date(1970, 1, 1)
+ROLLUP_MAX_DAY = date(9999, 12, 31)
+
+# Supported page filter operators, with their SQL spelling.
+FILTER_OPS = {"=": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "contains": "LIKE"}
+
+
+class OrderLine(NamedTuple):
+    product_id: str
+    quantity: int
+
+
+class Cart(NamedTuple):
+    """One order placement: a line per product, and the id of the orders row each line becomes."""
+    customer_id: str
+    lines: Tuple[OrderLine, ...]
+    order_ids: Tuple[str, ...]
+
+
+class PlacedOrder(NamedTuple):
+    order_ids: Tuple[str, ...]
+    # Per line: quantity x the product's price when the stock was taken.
+    line_totals: Tuple[float, ...]
+
+    @property
+    def total_amount(self) -> float:
+        return float(sum(self.line_totals))
+
+
+class OutOfStock(ValueError):
+    """A cart was rejected because some of its products lack stock (or do not exist); nothing was written."""
+
+    def __init__(self, product_ids: Sequence[str]):
+        self.product_ids = list(product_ids)
+        super().__init__("Not enough stock for product(s): " + ", ".join(self.product_ids))
+
+
+class Page(NamedTuple):
+    rows: pd.DataFrame
+    # Keyset cursor (sort value, id) of the last row; pass it as ``after`` to get the next page.
+    next_cursor: Optional[Tuple[object, str]]
+
+
+def check_page_args(table: str, limit: int, filters: Sequence[Tuple[str, str, object]], sort_by: str):
+    """Validates list_page() arguments; column names end up in SQL text, so they must be whitelisted."""
+    columns = TABLE_COLUMNS.get(table)
+    if columns is None:
+        raise ValueError(f"Unknown table: {table}")
+    if sort_by not in columns:
+        raise ValueError(f"Cannot sort {table} by {sort_by!r}")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    for column, op, _ in filters:
+        if column not in columns:
+            raise ValueError(f"Cannot filter {table} by {column!r}")
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op!r}")
+
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, matching what the warehouse's current_timestamp() stores."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def empty_frame(table: str) -> pd.DataFrame:
+    return pd.DataFrame(columns=list(TABLE_COLUMNS[table]))
+
+
+def _instants(values) -> pd.Series:
+    # Timestamps as naive UTC, whichever form the backend returns them in (text on SQLite).
+    return pd.Series(pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601", utc=True)).dt.tz_localize(None)
+
+
+def _unchanged(rows: pd.DataFrame, current: pd.DataFrame) -> pd.Series:
+    """Per row of ``rows`` (id, last_update_date): whether ``current`` still has that row at that last_update_date."""
+    now = _instants(current["last_update_date"]).set_axis(current["id"].to_numpy())
+    expected = _instants(rows["last_update_date"]).to_numpy()
+    return pd.Series(now.reindex(rows["id"].to_numpy()).to_numpy() == expected, index=rows.index)
+
+
+def edit_conflicts(updates: pd.DataFrame, deletes: pd.DataFrame, current: pd.DataFrame, stamp: datetime) -> List[str]:
+    """
+    Ids of an apply_edits() batch that were not applied, from the (id, last_update_date)
+    of its rows after the write: updated rows carry ``stamp``, deleted rows are gone.
+    """
+    stamps = _instants(current["last_update_date"])
+    written = set(current["id"].to_numpy()[(stamps == pd.Timestamp(stamp)).to_numpy()])
+    present = set(current["id"])
+    return [id_ for id_ in updates["id"] if id_ not in written] + [id_ for id_ in deletes["id"] if id_ in present]
+
+
+class StoreBackend(ABC):
+    """Repository interface used by store.py. Ids are generated by the caller."""
+
+    name = "abstract"
+
+    # -- primitives
+    @abstractmethod
+    def initialize(self):
+        """Creates the tables if they do not exist."""
+
+    def startup(self):
+        """Per-process checks once the schema is current (see store.initialize_db); cheap when nothing is due."""
+
+    # -- schema version (migrations.py)
+    def schema_version(self) -> Optional[int]:
+        """Highest migration recorded in the store, or None when none is (new or pre-versioning store)."""
+        raise NotImplementedError
+
+    def record_migration(self, version: int, description: str):
+        raise NotImplementedError
+
+    def add_column(self, table: str, column: str, col_type: str) -> bool:
+        """Adds a nullable column (a schema.py type) unless it exists; returns whether it was added."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert(self, table: str, row: dict):
+        """Inserts one row (``id`` included); created_date/last_update_date are set to now."""
+
+    @abstractmethod
+    def update(self, table: str, id_: str, values: dict):
+        """Updates the given columns of one row and sets last_update_date to now."""
+
+    @abstractmethod
+    def delete(self, table: str, id_: str):
+        pass
+
+    @abstractmethod
+    def list_rows(self, table: str) -> pd.DataFrame:
+        """Every row of ``table``, newest created_date first."""
+
+    def changed_since(self, table: str, since: Optional[datetime]) -> pd.DataFrame:
+        """Rows whose last_update_date is after ``since`` (every row when ``since`` is None)."""
+        df = self.list_rows(table)
+        if since is None or df.empty:
+            return df
+        return df[pd.to_datetime(df["last_update_date"], format="ISO8601") > since]
+
+    def row_ids(self, table: str) -> pd.Series:
+        return self.list_rows(table)["id"]
+
+    def count_rows(self, table: str) -> int:
+        return len(self.list_rows(table))
+
+    def high_water(self, table: str) -> Optional[datetime]:
+        """Newest last_update_date in ``table``; None when it has no rows."""
+        newest = pd.to_datetime(self.list_rows(table)["last_update_date"], format="ISO8601").max()
+        return None if pd.isna(newest) else newest.to_pydatetime()
+
+    def iter_batches(self, table: str, batch_rows: int, filters: Sequence[Tuple[str, str, object]] = ()) -> Iterator[pd.DataFrame]:
+        """
+        Every row of ``table`` (matching ``filters``, as for page()) as DataFrames of up
+        to ``batch_rows`` rows, in no particular order.
+        """
+        df = filter_frame(self.list_rows(table), filters)
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
+
+    @abstractmethod
+    def page(self, table: str, limit: int, after, filters, sort_by: str, descending: bool) -> Page:
+        """One keyset page; arguments are already validated by check_page_args()."""
+
+    @abstractmethod
+    def write_batch(self, table: str, rows: pd.DataFrame, mode: str = "insert"):
+        """
+        Writes rows by id in one batch. ``mode`` "insert" and "upsert" take complete rows
+        (timestamps included); "update" sets the given columns of rows that exist.
+        """
+
+    def delete_batch(self, table: str, ids: Sequence[str]):
+        for id_ in ids:
+            self.delete(table, id_)
+
+    def apply_changes(self, table: str, upserts: pd.DataFrame, updates: Sequence[pd.DataFrame], deletes: Sequence[str]):
+        """
+        Applies one batch of net changes to ``table``: deletes by id, column updates (one
+        frame per column set) and complete rows upserted by id. Rewriting the same batch
+        is harmless, so a failed batch can be retried as a whole.
+        """
+        if len(deletes):
+            self.delete_batch(table, deletes)
+        for rows in updates:
+            self.write_batch(table, rows, "update")
+        if len(upserts):
+            self.write_batch(table, upserts, "upsert")
+
+    def apply_edits(self, table: str, updates: pd.DataFrame, deletes: pd.DataFrame, stamp: datetime) -> List[str]:
+        """
+        Applies the edits of a grid with optimistic concurrency. ``updates`` has the id,
+        the last_update_date the row had when it was loaded, and the new values of the
+        edited columns; ``deletes`` has id and last_update_date. A row is updated (its
+        last_update_date set to ``stamp``) or deleted only if its last_update_date is
+        still the loaded one. Returns the ids left alone: changed or deleted meanwhile.
+
+        This default checks, then writes; backends override it to check in the write.
+        """
+        current = self.list_rows(table)[["id", "last_update_date"]]
+        ok_updates = updates[_unchanged(updates, current)]
+        ok_deletes = deletes[_unchanged(deletes, current)]
+        if len(ok_updates):
+            self.write_batch(table, ok_updates.assign(last_update_date=stamp), "update")
+        if len(ok_deletes):
+            self.delete_batch(table, ok_deletes["id"].tolist())
+        return [id_ for id_ in (*updates["id"], *deletes["id"]) if id_ not in set(ok_updates["id"]) | set(ok_deletes["id"])]
+
+    def close(self):
+        pass
+
+    # -- entity operations
+    def create_customer(self, cid: str, name: str, email: str, phone: str, address: str):
+        self.insert("customers", {"id": cid, "name": name, "email": email, "phone": phone, "address": address})
+
+    def list_customers(self) -> pd.DataFrame:
+        return self.list_rows("customers")
+
+    def update_customer(self, cid: str, name: str, email: str, phone: str, address: str):
+        self.update("customers", cid, {"name": name, "email": email, "phone": phone, "address": address})
+
+    def delete_customer(self, cid: str):
+        self.delete("customers", cid)
+
+    def create_product(self, pid: str, name: str, description: str, price: float, stock: int):
+        self.insert("products", {"id": pid, "name": name, "description": description, "price": price, "stock": stock})
+
+    def list_products(self) -> pd.DataFrame:
+        return self.list_rows("products")
+
+    def update_product(self, pid: str, name: str, description: str, price: float, stock: int):
+        self.update("products", pid, {"name": name, "description": description, "price": price, "stock": stock})
+
+    def delete_product(self, pid: str):
+        self.delete("products", pid)
+
+    def create_order(self, oid: str, customer_id: str, product_id: str, quantity: int, total_amount: float,
+                     order_date: Optional[datetime] = None):
+        self.insert("orders", {
+            "id": oid,
+            "customer_id": customer_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "total_amount": total_amount,
+            "order_date": order_date or utcnow(),
+        })
+
+    def list_orders(self) -> pd.DataFrame:
+        return self.list_rows("orders")
+
+    def update_order(self, oid: str, customer_id: str, product_id: str, quantity: int, total_amount: float,
+                     order_date: Optional[datetime] = None):
+        self.update("orders", oid, {
+            "customer_id": customer_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "total_amount": total_amount,
+            "order_date": order_date or utcnow(),
+        })
+
+    def delete_order(self, oid: str):
+        self.delete("orders", oid)
+
+    def place_orders(self, carts: Sequence[Cart]) -> List[object]:
+        """
+        Places each cart all-or-nothing: takes every line's quantity from products.stock,
+        provided there is enough stock for the whole cart, and writes one orders row per line
+        priced from the product row. Returns a ``PlacedOrder`` or an ``OutOfStock`` per cart.
+        Needs an atomic conditional update, so there is no default on top of the primitives.
+        """
+        raise NotImplementedError(f"{self.name} backend cannot place orders")
+
+    def list_orders_detailed(self) -> pd.DataFrame:
+        """Orders with customer_name, product_name and product_price. Backends with joins override this."""
+        orders = self.list_rows("orders")
+        customers = self.list_rows("customers")[["id", "name"]].rename(columns={"id": "customer_id", "name": "customer_name"})
+        products = self.list_rows("products")[["id", "name", "price"]].rename(
+            columns={"id": "product_id", "name": "product_name", "price": "product_price"})
+        return orders.merge(customers, on="customer_id", how="left").merge(products, on="product_id", how="left")
+
+    # -- analytics. These defaults aggregate in pandas over every order in range; the
+    # SQL backend pushes them down as GROUP BY queries.
+    def _orders_since(self, since: datetime) -> pd.DataFrame:
+        orders = self.list_rows("orders")
+        order_date = pd.to_datetime(orders["order_date"], format="ISO8601")
+        return orders.assign(order_date=order_date)[order_date >= since]
+
+    def revenue_by_period(self, grain: str, since: datetime) -> pd.DataFrame:
+        """Columns period, orders, revenue, avg_order_value; ``grain`` is day, week or month."""
+        orders = self._orders_since(since)
+        day = orders["order_date"].dt.floor("D")
+        period = {
+            "day": day,
+            "week": day - pd.to_timedelta(day.dt.weekday, unit="D"),
+            "month": day - pd.to_timedelta(day.dt.day - 1, unit="D"),
+        }[grain]
+        out = orders.groupby(period)["total_amount"].agg(orders="count", revenue="sum", avg_order_value="mean")
+        return out.rename_axis("period").reset_index()
+
+    def sales_summary(self, since: datetime) -> dict:
+        """orders, revenue, avg_order_value and distinct customers since ``since``."""
+        orders = self._orders_since(since)
+        return {
+            "orders": len(orders),
+            "revenue": float(orders["total_amount"].sum()),
+            "avg_order_value": float(orders["total_amount"].mean()) if len(orders) else None,
+            "customers": int(orders["customer_id"].nunique()),
+        }
+
+    def top_products(self, since: datetime, top_n: int) -> pd.DataFrame:
+        orders = self._orders_since(since)
+        top = (orders.groupby("product_id")
+               .agg(units=("quantity", "sum"), orders=("id", "count"), revenue=("total_amount", "sum"))
+               .nlargest(top_n, "revenue").reset_index())
+        names = self.list_rows("products")[["id", "name"]].rename(columns={"id": "product_id", "name": "product_name"})
+        return top.merge(names, on="product_id", how="left")[["product_id", "product_name", "units", "orders", "revenue"]]
+
+    # -- daily rollups (schema.ROLLUP_SCHEMAS). Only the SQL backend materializes them;
+    # the defaults compute them from the orders on read, so there is nothing to rebuild.
+    def rebuild_rollups(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Recomputes the rollup rows of the days in [start, end) from the orders."""
+
+    def recompute_rollup(self, rollup: str, start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+        """Rollup rows for [start, end) aggregated from the orders: day, key, orders, units, revenue."""
+        key = ROLLUP_KEYS[rollup]
+        orders = self.list_rows("orders")
+        day = pd.to_datetime(orders["order_date"], format="ISO8601").dt.floor("D")
+        in_range = (day >= pd.Timestamp(start or ROLLUP_MIN_DAY)) & (day < pd.Timestamp(end or ROLLUP_MAX_DAY))
+        orders = orders.assign(day=day)[in_range]
+        return (orders.groupby(["day", key])
+                .agg(orders=("id", "count"), units=("quantity", "sum"), revenue=("total_amount", "sum"))
+                .reset_index())
+
+    def rollup_rows(self, rollup: str, start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+        """Stored rollup rows for [start, end) with a non-zero order count."""
+        return self.recompute_rollup(rollup, start, end)
+
+    def top_customers(self, since: datetime, top_n: int) -> pd.DataFrame:
+        orders = self._orders_since(since)
+        top = (orders.groupby("customer_id")
+               .agg(orders=("id", "count"), revenue=("total_amount", "sum"))
+               .nlargest(top_n, "revenue").reset_index())
+        names = self.list_rows("customers")[["id", "name", "email"]].rename(
+            columns={"id": "customer_id", "name": "customer_name", "email": "customer_email"})
+        return top.merge(names, on="customer_id", how="left")[
+            ["customer_id", "customer_name", "customer_email", "orders", "revenue"]]
+
+
+# -------------------------
+# In-memory backend
+# -------------------------
+_COMPARE = {"=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def filter_frame(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """Rows of ``df`` matching ``filters``, as page() applies them."""
+    for column, op, value in filters:
+        if op == "contains":
+            df = df[df[column].astype(str).str.lower().str.contains(str(value).lower(), regex=False, na=False)]
+        else:
+            df = df[_COMPARE[op](df[column], value)]
+    return df
+
+
+def keyset_mask(df: pd.DataFrame, after, until, sort_by: str, descending: bool) -> pd.Series:
+    """
+    Which rows of ``df`` come after the cursor ``after`` and up to the cursor ``until``
+    (included) in (sort_by, id) order; a None cursor leaves that end open.
+    """
+    before = operator.lt if descending else operator.gt
+    mask = pd.Series(True, index=df.index)
+    if after is not None:
+        last_value, last_id = after
+        mask &= before(df[sort_by], last_value) | ((df[sort_by] == last_value) & before(df["id"], last_id))
+    if until is not None:
+        last_value, last_id = until
+        mask &= ~(before(df[sort_by], last_value) | ((df[sort_by] == last_value) & before(df["id"], last_id)))
+    return mask
+
+
+class MemoryBackend(StoreBackend):
+    """Rows live in per-table dicts keyed by id; nothing survives the process."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[str, dict]] = {table: {} for table in TABLE_SCHEMAS}
+        self._lock = threading.Lock()
+        self._migrations: List[int] = []
+
+    def initialize(self):
+        pass
+
+    def schema_version(self):
+        return max(self._migrations, default=None)
+
+    def record_migration(self, version, description):
+        self._migrations.append(version)
+
+    def add_column(self, table, column, col_type):
+        with self._lock:
+            rows = self._tables[table].values()
+            if any(column in row for row in rows):
+                return False
+            for row in rows:
+                row[column] = None
+        return True
+
+    def insert(self, table, row):
+        now = utcnow()
+        record = {c: None for c in TABLE_COLUMNS[table]}
+        record.update(row, created_date=now, last_update_date=now)
+        with self._lock:
+            if record["id"] in self._tables[table]:
+                raise ValueError(f"Duplicate id in {table}: {record['id']}")
+            self._tables[table][record["id"]] = record
+
+    def update(self, table, id_, values):
+        with self._lock:
+            record = self._tables[table].get(id_)
+            if record is not None:
+                record.update(values, last_update_date=utcnow())
+
+    def delete(self, table, id_):
+        with self._lock:
+            self._tables[table].pop(id_, None)
+
+    def delete_batch(self, table, ids):
+        with self._lock:
+            for id_ in ids:
+                self._tables[table].pop(id_, None)
+
+    def apply_edits(self, table, updates, deletes, stamp):
+        def same_time(record, expected):
+            return record is not None and pd.Timestamp(record["last_update_date"]) == pd.Timestamp(expected)
+
+        records: List[dict] = updates.astype(object).where(updates.notna(), None).to_dict("records")
+        conflicts = []
+        with self._lock:
+            stored = self._tables[table]
+            for record in records:
+                existing = stored.get(record["id"])
+                if same_time(existing, record["last_update_date"]):
+                    existing.update(record, last_update_date=stamp)
+                else:
+                    conflicts.append(record["id"])
+            for id_, expected in zip(deletes["id"], deletes["last_update_date"]):
+                if same_time(stored.get(id_), expected):
+                    del stored[id_]
+                else:
+                    conflicts.append(id_)
+        return conflicts
+
+    def list_rows(self, table):
+        with self._lock:
+            records = list(self._tables[table].values())
+        if not records:
+            return empty_frame(table)
+        df = pd.DataFrame.from_records(records, columns=list(TABLE_COLUMNS[table]))
+        return df.iloc[::-1].sort_values("created_date", ascending=False, kind="stable").reset_index(drop=True)
+
+    def changed_since(self, table, since):
+        if since is None:
+            return self.list_rows(table)
+        with self._lock:
+            records = [r for r in self._tables[table].values() if r["last_update_date"] > since]
+        return pd.DataFrame.from_records(records, columns=list(TABLE_COLUMNS[table]))
+
+    def row_ids(self, table):
+        with self._lock:
+            return pd.Series(list(self._tables[table]), name="id", dtype=object)
+
+    def count_rows(self, table):
+        with self._lock:
+            return len(self._tables[table])
+
+    def place_orders(self, carts):
+        results: List[object] = []
+        with self._lock:
+            products, orders = self._tables["products"], self._tables["orders"]
+            for cart in carts:
+                # Against the cart's total per product: a product may be on several lines.
+                need: Dict[str, int] = {}
+                for line in cart.lines:
+                    need[line.product_id] = need.get(line.product_id, 0) + line.quantity
+                short = [pid for pid, quantity in need.items()
+                         if (products.get(pid) or {}).get("stock") is None or products[pid]["stock"] < quantity]
+                if short:
+                    results.append(OutOfStock(short))
+                    continue
+                now = utcnow()
+                totals = []
+                for oid, line in zip(cart.order_ids, cart.lines):
+                    product = products[line.product_id]
+                    product.update(stock=product["stock"] - line.quantity, last_update_date=now)
+                    totals.append(line.quantity * float(product["price"] or 0.0))
+                    orders[oid] = {
+                        "id": oid, "customer_id": cart.customer_id, "product_id": line.product_id,
+                        "quantity": line.quantity, "total_amount": totals[-1],
+                        "order_date": now, "created_date": now, "last_update_date": now,
+                    }
+                results.append(PlacedOrder(cart.order_ids, tuple(totals)))
+        return results
+
+    def page(self, table, limit, after, filters, sort_by, descending):
+        df = filter_frame(self.list_rows(table), filters)
+        df = df[keyset_mask(df, after, None, sort_by, descending)]
+        df = df.sort_values([sort_by, "id"], ascending=not descending, kind="stable")
+        rows = df.iloc[:limit].reset_index(drop=True)
+        next_cursor = None
+        if len(df) > limit:
+            last = rows.iloc[-1]
+            next_cursor = (last[sort_by], last["id"])
+        return Page(rows, next_cursor)
+
+    def write_batch(self, table, rows, mode="insert"):
+        records: List[dict] = rows.astype(object).where(rows.notna(), None).to_dict("records")
+        with self._lock:
+            stored = self._tables[table]
+            for record in records:
+                existing = stored.get(record["id"])
+                if existing is not None:
+                    if mode == "insert":
+                        raise ValueError(f"Duplicate id in {table}: {record['id']}")
+                    existing.update({k: v for k, v in record.items() if k != "created_date"})
+                elif mode != "update":
+                    full = {c: None for c in TABLE_COLUMNS[table]}
+                    full.update(record)
+                    stored[record["id"]] = full
+
+
+# -------------------------
+# SQLAlchemy backend (database.py)
+# -------------------------
+# schema.py type -> sqlalchemy type, for add_column().
+_SQLALCHEMY_TYPES = {"STRING": "String", "DOUBLE": "Float", "INT": "Integer", "TIMESTAMP": "DateTime", "DATE": "Date"}
+
+
+class SQLAlchemyBackend(StoreBackend):
+    """
+    Uses the models and engine from database.py: MSSQL when credentials are configured,
+    otherwise its local SQLite fallback. Each operation runs in its own transaction.
+    """
+
+    name = "sqlalchemy"
+
+    def __init__(self, engine=None):
+        import database  # deferred: creates the engine on import
+
+        self._db = database
+        self._engine = engine if engine is not None else database._engine
+        self._tables = {
+            "customers": database.Customer.__table__,
+            "products": database.Product.__table__,
+            "orders": database.Order.__table__,
+        }
+
+    def initialize(self):
+        self._db.Base.metadata.create_all(bind=self._engine)
+
+    def schema_version(self):
+        from sqlalchemy import func, select
+        from sqlalchemy.exc import SQLAlchemyError
+
+        try:
+            with self._engine.connect() as conn:
+                return conn.execute(select(func.max(self._db.SchemaVersion.version))).scalar()
+        except SQLAlchemyError:  # no schema_version table yet
+            return None
+
+    def record_migration(self, version, description):
+        from sqlalchemy import insert
+
+        with self._engine.begin() as conn:
+            conn.execute(insert(self._db.SchemaVersion.__table__).values(
+                version=version, description=description, applied_date=utcnow()))
+
+    def add_column(self, table, column, col_type):
+        import sqlalchemy
+        from sqlalchemy import inspect, text
+
+        if column in {c["name"] for c in inspect(self._engine).get_columns(table)}:
+            return False
+        sql_type = getattr(sqlalchemy, _SQLALCHEMY_TYPES[col_type])().compile(dialect=self._engine.dialect)
+        with self._engine.begin() as conn:
+            # "ADD <column>" without COLUMN: accepted by both SQLite and SQL Server.
+            conn.execute(text(f"ALTER TABLE {table} ADD {column} {sql_type}"))
+        return True
+
+    def insert(self, table, row):
+        from sqlalchemy import insert
+
+        now = utcnow()
+        with self._engine.begin() as conn:
+            conn.execute(insert(self._tables[table]).values(**row, created_date=now, last_update_date=now))
+
+    def update(self, table, id_, values):
+        from sqlalchemy import update
+
+        t = self._tables[table]
+        with self._engine.begin() as conn:
+            conn.execute(update(t).where(t.c.id == id_).values(**values, last_update_date=utcnow()))
+
+    def delete(self, table, id_):
+        from sqlalchemy import delete
+
+        t = self._tables[table]
+        with self._engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.id == id_))
+
+    def delete_batch(self, table, ids):
+        from sqlalchemy import delete
+
+        t = self._tables[table]
+        with self._engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.id.in_(list(ids))))
+
+    def apply_edits(self, table, updates, deletes, stamp):
+        from sqlalchemy import bindparam, delete, select, update
+
+        t = self._tables[table]
+        unchanged = (t.c.id == bindparam("b_id")) & (t.c.last_update_date == bindparam("b_expected"))
+        columns = [c for c in updates.columns if c not in ("id", "last_update_date")]
+        records = updates.astype(object).where(updates.notna(), None).to_dict("records")
+        ids = [*updates["id"], *deletes["id"]]
+        with self._engine.begin() as conn:
+            if records:
+                stmt = update(t).where(unchanged).values({**{c: bindparam(f"b_{c}") for c in columns}, "last_update_date": stamp})
+                conn.execute(stmt, [
+                    {"b_id": r["id"], "b_expected": r["last_update_date"], **{f"b_{c}": r[c] for c in columns}} for r in records
+                ])
+            if len(deletes):
+                conn.execute(delete(t).where(unchanged), [
+                    {"b_id": id_, "b_expected": expected} for id_, expected in zip(deletes["id"], deletes["last_update_date"].astype(object))
+                ])
+            result = conn.execute(select(t.c.id, t.c.last_update_date).where(t.c.id.in_(ids)))
+            current = pd.DataFrame(result.fetchall(), columns=["id", "last_update_date"])
+        return edit_conflicts(updates, deletes, current, stamp)
+
+    def _frame(self, stmt) -> pd.DataFrame:
+        with self._engine.connect() as conn:
+            result = conn.execute(stmt)
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    def list_rows(self, table):
+        from sqlalchemy import select
+
+        t = self._tables[table]
+        return self._frame(select(t).order_by(t.c.created_date.desc()))
+
+    def changed_since(self, table, since):
+        from sqlalchemy import select
+
+        t = self._tables[table]
+        stmt = select(t)
+        if since is not None:
+            stmt = stmt.where(t.c.last_update_date > since)
+        return self._frame(stmt)
+
+    def row_ids(self, table):
+        from sqlalchemy import select
+
+        return self._frame(select(self._tables[table].c.id))["id"]
+
+    def count_rows(self, table):
+        from sqlalchemy import func, select
+
+        with self._engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self._tables[table])).scalar_one()
+
+    def high_water(self, table):
+        from sqlalchemy import func, select
+
+        with self._engine.connect() as conn:
+            return conn.execute(select(func.max(self._tables[table].c.last_update_date))).scalar_one()
+
+    def _where(self, table, stmt, filters):
+        from sqlalchemy import func
+
+        t = self._tables[table]
+        for column, op, value in filters:
+            col = t.c[column]
+            if op == "contains":
+                stmt = stmt.where(func.lower(col).like(f"%{str(value).lower()}%"))
+            else:
+                stmt = stmt.where(_COMPARE[op](col, value))
+        return stmt
+
+    def iter_batches(self, table, batch_rows, filters=()):
+        from sqlalchemy import select
+
+        stmt = self._where(table, select(self._tables[table]), filters)
+        with self._engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_rows).execute(stmt)
+            columns = list(result.keys())
+            for rows in result.partitions():
+                yield pd.DataFrame(rows, columns=columns)
+
+    def page(self, table, limit, after, filters, sort_by, descending):
+        from sqlalchemy import and_, or_, select
+
+        t = self._tables[table]
+        stmt = self._where(table, select(t), filters)
+        sort_col = t.c[sort_by]
+        if after is not None:
+            last_value, last_id = after
+            before = operator.lt if descending else operator.gt
+            stmt = stmt.where(or_(before(sort_col, last_value), and_(sort_col == last_value, before(t.c.id, last_id))))
+        order = (sort_col.desc(), t.c.id.desc()) if descending else (sort_col.asc(), t.c.id.asc())
+        df = self._frame(stmt.order_by(*order).limit(limit + 1))
+        rows = df.iloc[:limit]
+        next_cursor = None
+        if len(df) > limit:
+            last = rows.iloc[-1]
+            next_cursor = (last[sort_by], last["id"])
+        return Page(rows, next_cursor)
+
+    def write_batch(self, table, rows, mode="insert"):
+        from sqlalchemy import bindparam, insert, select, update
+
+        t = self._tables[table]
+        records = rows.astype(object).where(rows.notna(), None).to_dict("records")
+        with self._engine.begin() as conn:
+            if mode == "update":
+                columns = [c for c in rows.columns if c != "id"]
+                stmt = update(t).where(t.c.id == bindparam("b_id")).values({c: bindparam(f"b_{c}") for c in columns})
+                if records:
+                    conn.execute(stmt, [{f"b_{k}": v for k, v in r.items()} for r in records])
+                return
+            if mode == "upsert":
+                ids = [r["id"] for r in records]
+                existing = set(conn.execute(select(t.c.id).where(t.c.id.in_(ids))).scalars())
+                updates = [r for r in records if r["id"] in existing]
+                records = [r for r in records if r["id"] not in existing]
+                if updates:
+                    columns = [c for c in rows.columns if c not in ("id", "created_date")]
+                    stmt = update(t).where(t.c.id == bindparam("b_id")).values({c: bindparam(f"b_{c}") for c in columns})
+                    conn.execute(stmt, [{f"b_{k}": v for k, v in r.items()} for r in updates])
+            if records:
+                conn.execute(insert(t), records)
+
+    def place_orders(self, carts):
+        from sqlalchemy import insert, select, update
+
+        products, orders = self._tables["products"], self._tables["orders"]
+        results: List[object] = []
+        # One transaction for the batch, a savepoint per cart: a rejected cart rolls back
+        # alone and the batch commits once.
+        with self._engine.begin() as conn:
+            for cart in carts:
+                savepoint = conn.begin_nested()
+                now = utcnow()
+                short, totals = [], []
+                for line in cart.lines:
+                    taken = conn.execute(
+                        update(products)
+                        .where(products.c.id == line.product_id, products.c.stock >= line.quantity)
+                        .values(stock=products.c.stock - line.quantity, last_update_date=now)
+                    )
+                    if taken.rowcount != 1:
+                        short.append(line.product_id)
+                        continue
+                    # The updated row stays locked until commit, so this is the price the stock was taken at.
+                    price = conn.execute(select(products.c.price).where(products.c.id == line.product_id)).scalar_one()
+                    totals.append(line.quantity * float(price or 0.0))
+                if short:
+                    savepoint.rollback()
+                    results.append(OutOfStock(short))
+                    continue
+                conn.execute(insert(orders), [
+                    {"id": oid, "customer_id": cart.customer_id, "product_id": line.product_id,
+                     "quantity": line.quantity, "total_amount": total,
+                     "order_date": now, "created_date": now, "last_update_date": now}
+                    for oid, line, total in zip(cart.order_ids, cart.lines, totals)
+                ])
+                savepoint.commit()
+                results.append(PlacedOrder(cart.order_ids, tuple(totals)))
+        return results
+
+    def list_orders_detailed(self):
+        from sqlalchemy.orm import Session
+
+        # Order.customer / Order.product are lazy="joined": one SELECT with two LEFT OUTER JOINs.
+        Order = self._db.Order
+        session = Session(bind=self._engine)
+        try:
+            records = []
+            for o in session.query(Order).order_by(Order.created_date.desc()):
+                row = {c: getattr(o, c) for c in TABLE_COLUMNS["orders"]}
+                row["customer_name"] = o.customer.name if o.customer is not None else None
+                row["product_name"] = o.product.name if o.product is not None else None
+                row["product_price"] = o.product.price if o.product is not None else None
+                records.append(row)
+        finally:
+            session.close()
+        columns = list(TABLE_COLUMNS["orders"]) + ["customer_name", "product_name", "product_price"]
+        return pd.DataFrame.from_records(records, columns=columns)
+
+    def close(self):
+        self._engine.dispose()
@@ -0,0 +1,162 @@
+"""
+Offline benchmark: fetchall() rows -> DataFrame vs Arrow -> DataFrame vs streamed Arrow batches.
+
+The warehouse sends results as Arrow. With fetchall() the connector turns them into one
+Python tuple per row, which store.execute() then turns back into columns; with
+fetchall_arrow() the DataFrame is built from the Arrow columns directly. This replays
+both conversions on a synthetic orders result (written to an Arrow IPC file and
+memory-mapped, like a fetched result) and reports time and peak memory per path, each
+in a fresh process:
+
+  rows      Arrow -> list of row tuples (what fetchall() returns) -> pd.DataFrame
+  arrow     store._arrow_to_frame(fetchall_arrow())
+  stream    store._arrow_to_frame() per fetchmany_arrow() batch, one batch alive at a time
+
+    python benchmarks/bench_arrow.py --rows 1000000
+
+With --databricks, also times store.execute() on the configured warehouse with
+ARROW_FETCH on and off (SELECT * FROM orders LIMIT --rows).
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow as pa  # noqa: E402
+
+import store  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+
+def make_orders(n):
+    rng = np.random.default_rng(0)
+    created = np.datetime64("2025-01-01") + rng.integers(0, 365 * 24 * 3600, size=n).astype("timedelta64[s]")
+    customers, products = new_uuids(max(n // 10, 1)), new_uuids(max(n // 100, 1))
+    return pa.table({
+        "id": new_uuids(n),
+        "customer_id": customers[rng.integers(0, len(customers), size=n)],
+        "product_id": products[rng.integers(0, len(products), size=n)],
+        "quantity": rng.integers(1, 10, size=n).astype(np.int32),
+        "total_amount": rng.uniform(1, 5000, size=n),
+        "order_date": created,
+        "created_date": created,
+        "last_update_date": created,
+    })
+
+
+def _reset_peak_rss():
+    """Resets the peak-RSS high-water mark to the current RSS (Linux only); returns whether it could."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb(field):
+    """VmRSS (current) or VmHWM (peak) from /proc/self/status; falls back to ru_maxrss."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rows(table, batch_rows):
+    import pandas as pd
+
+    columns = [c.to_pylist() for c in table.columns]
+    rows = list(zip(*columns))
+    del columns
+    return pd.DataFrame(rows, columns=table.column_names)
+
+
+def _arrow(table, batch_rows):
+    return store._arrow_to_frame(table)
+
+
+def _stream(table, batch_rows):
+    n = 0
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        n += len(store._arrow_to_frame(pa.Table.from_batches([batch])))
+    return n
+
+
+PATHS = {"rows": _rows, "arrow": _arrow, "stream": _stream}
+
+
+def _run_path(name, path, batch_rows, out):
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        _reset_peak_rss()
+        baseline = _rss_mb("VmRSS")
+        start = time.perf_counter()
+        PATHS[name](table, batch_rows)
+        seconds = time.perf_counter() - start
+    out.put((seconds, _rss_mb("VmHWM") - baseline))
+
+
+def run_isolated(name, path, batch_rows):
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_run_path, args=(name, path, batch_rows, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def run_databricks(rows):
+    results = {}
+    for arrow in (False, True):
+        store.ARROW_FETCH = arrow
+        store.execute(f"SELECT * FROM {store.table_name('orders')} LIMIT 10", fetch=True)  # warm the connection
+        start = time.perf_counter()
+        df = store.execute(f"SELECT * FROM {store.table_name('orders')} LIMIT {int(rows)}", fetch=True)
+        results["arrow" if arrow else "rows"] = (time.perf_counter() - start, len(df))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-rows", type=int, default=store.STREAM_BATCH_ROWS)
+    parser.add_argument("--databricks", action="store_true", help="also time store.execute() against the warehouse")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "orders.arrow")
+        table = make_orders(args.rows)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=args.batch_rows)
+        print(f"rows={args.rows:,}  arrow result={table.nbytes / 2**20:,.0f} MB  batch_rows={args.batch_rows:,}")
+        del table
+
+        base = None
+        for name in PATHS:
+            seconds, peak_mb = run_isolated(name, path, args.batch_rows)
+            base = base or seconds
+            print(f"{name:<7} {seconds:7.3f}s  {args.rows / seconds:>12,.0f} rows/s  "
+                  f"x{base / seconds:5.1f} vs rows  peak +{peak_mb:,.0f} MB")
+
+    if args.databricks:
+        for name, (seconds, n) in run_databricks(args.rows).items():
+            print(f"warehouse {name:<6} {seconds:7.3f}s  {n / seconds:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
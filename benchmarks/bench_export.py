@@ -0,0 +1,118 @@
+"""
+Export throughput and peak memory: streaming export vs loading the whole table first.
+
+Writes --orders synthetic orders into a local SQLite store, then exports them to CSV
+and Parquet files two ways:
+
+- full load: backend.list_orders() into one DataFrame, then to_csv() / to_parquet(),
+             which is what exporting the list_orders() result does;
+- streaming: export.export_table(), one --batch-rows batch in memory at a time.
+
+Reports rows/s and the peak resident memory above the level before the export (Linux:
+the peak is reset through /proc/self/clear_refs before each run).
+
+    python benchmarks/bench_export.py --orders 1000000
+    python benchmarks/bench_export.py --orders 200000 1000000 --batch-rows 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export  # noqa: E402
+import store  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+
+def _status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def timed(fn):
+    """Seconds and peak RSS growth (MB, None where it cannot be measured) of ``fn()``."""
+    measurable = reset_peak()
+    before = _status_kb("VmRSS")
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    peak = (_status_kb("VmHWM") - before) / 1024 if measurable else None
+    return seconds, peak
+
+
+def populate(n, rng, batch=50_000):
+    backend = store.get_backend()
+    customers, products = new_uuids(10_000), new_uuids(1_000)
+    start = pd.Timestamp("2024-01-01")
+    for offset in range(0, n, batch):
+        m = min(batch, n - offset)
+        stamps = start + pd.to_timedelta(rng.integers(0, 365 * 86_400, size=m), unit="s")
+        backend.write_batch("orders", pd.DataFrame({
+            "id": new_uuids(m),
+            "customer_id": customers[rng.integers(len(customers), size=m)],
+            "product_id": products[rng.integers(len(products), size=m)],
+            "quantity": rng.integers(1, 5, size=m),
+            "total_amount": np.round(rng.uniform(1, 2000, size=m), 2),
+            "order_date": stamps,
+            "created_date": stamps,
+            "last_update_date": stamps,
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--batch-rows", type=int, default=export.DEFAULT_BATCH_ROWS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store.set_cache(None)
+    print(f"{'orders':>10} {'format':<8} {'variant':<10} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'file MB':>8}")
+    for n in args.orders:
+        with tempfile.TemporaryDirectory() as tmp:
+            store.use_backend("sqlite", sqlite_path=os.path.join(tmp, "bench.db"))
+            store.initialize_db()
+            populate(n, np.random.default_rng(args.seed))
+            backend = store.get_backend()
+            for fmt in export.FORMATS:
+                path = os.path.join(tmp, f"orders.{fmt}")
+
+                def full_load():
+                    df = backend.list_orders()
+                    if fmt == "csv":
+                        df.to_csv(path, index=False)
+                    else:
+                        df.to_parquet(path, index=False)
+
+                def streaming():
+                    export.export_table("orders", path, fmt, batch_rows=args.batch_rows)
+
+                for variant, fn in (("full load", full_load), ("streaming", streaming)):
+                    seconds, peak = timed(fn)
+                    peak_text = f"{peak:8.0f}" if peak is not None else f"{'n/a':>8}"
+                    print(f"{n:>10,} {fmt:<8} {variant:<10} {seconds:8.2f} {n / seconds:10,.0f} {peak_text} "
+                          f"{os.path.getsize(path) / 1e6:8.1f}")
+            backend.close()
+
+
+if __name__ == "__main__":
+    main()
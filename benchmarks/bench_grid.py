@@ -0,0 +1,96 @@
+"""
+Bulk edits from the grid: one batched commit vs one update/delete call per row.
+
+Seeds --products products into a local SQLite store, then changes the price of --rows
+of them and deletes --deletes more, two ways:
+
+- per row:  store.update_product() / store.delete_product() per row, which is what the
+            "Edit or Delete" form costs for the same change;
+- grid:     edits.diff() of the page before and after, then store.commit_edits()
+            (one UPDATE for every edited row, one DELETE for every removed row, both
+            checked against last_update_date).
+
+Reports statements, local time, and the time at --round-trip-ms per statement, which
+is what dominates on the warehouse.
+
+    python benchmarks/bench_grid.py --rows 1000
+    python benchmarks/bench_grid.py --rows 100 1000 --deletes 100 --round-trip-ms 150
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import edits  # noqa: E402
+import store  # noqa: E402
+import tracing  # noqa: E402
+from backends import utcnow  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+
+def seed(n, rng):
+    now = utcnow()
+    store.get_backend().write_batch("products", pd.DataFrame({
+        "id": new_uuids(n),
+        "name": [f"Product {i}" for i in range(n)],
+        "description": [f"Description of product {i}" for i in range(n)],
+        "price": np.round(rng.uniform(1, 500, size=n), 2),
+        "stock": rng.integers(0, 1000, size=n),
+        "created_date": now,
+        "last_update_date": now,
+    }))
+
+
+def timed(fn):
+    run = tracing.begin_run()
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0, len(run.queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000], help="rows whose price changes")
+    parser.add_argument("--deletes", type=int, default=10, help="rows deleted in the same commit")
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--round-trip-ms", type=float, default=100.0, help="warehouse latency per statement")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store.set_cache(None)
+    print(f"{'rows':>6} {'deletes':>7} {'variant':<8} {'statements':>10} {'local ms':>9} {'at RTT s':>9}")
+    for n in args.rows:
+        for variant in ("per row", "grid"):
+            with tempfile.TemporaryDirectory() as tmp:
+                store.use_backend("sqlite", sqlite_path=os.path.join(tmp, "bench.db"))
+                store.initialize_db()
+                seed(max(args.products, n + args.deletes), np.random.default_rng(args.seed))
+                before = store.list_products().iloc[:n + args.deletes]
+                after = before.iloc[:n].assign(price=before["price"].iloc[:n] * 1.1)
+
+                if variant == "per row":
+                    def apply():
+                        for row in after.itertuples(index=False):
+                            store.update_product(row.id, row.name, row.description, row.price, row.stock)
+                        for id_ in before["id"].iloc[n:]:
+                            store.delete_product(id_)
+                else:
+                    def apply():
+                        result = store.commit_edits(edits.diff("products", before, after))
+                        assert result.updated == n and result.deleted == args.deletes and not result.conflicts
+
+                seconds, statements = timed(apply)
+                store.get_backend().close()
+            modeled = statements * args.round_trip_ms / 1000
+            print(f"{n:>6} {args.deletes:>7} {variant:<8} {statements:>10} {seconds * 1000:>9.1f} {modeled:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Order placement throughput with many concurrent sessions, batched vs one cart per call.
+
+Seeds products with stock into the local SQLite or in-memory backend, then starts
+--sessions threads (Streamlit runs each browser session as a thread of the server
+process) that each place --carts-per-session carts of --lines random products through
+checkout.place_order(). Every configuration runs twice: with the order batcher (carts
+waiting at the same moment share one transaction) and with STORE_ORDER_BATCH=0
+behaviour (one transaction per cart). Reports orders/s, p50/p95 latency and batch
+sizes, then checks that no stock was oversold or lost.
+
+    python benchmarks/bench_orders.py --sessions 1 8 32 64
+    python benchmarks/bench_orders.py --scarce     # every cart competes for a few units
+
+With --scarce, stock is far below demand, so most carts are rejected; the check then
+shows that concurrent placements never sold more than there was.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import checkout  # noqa: E402
+import store  # noqa: E402
+from backends import OutOfStock  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+
+def seed(n_customers, n_products, stock, rng):
+    now = datetime.utcnow()
+    customers = pd.DataFrame({
+        "id": new_uuids(n_customers),
+        "name": [f"Customer {i}" for i in range(n_customers)],
+        "created_date": now,
+        "last_update_date": now,
+    })
+    products = pd.DataFrame({
+        "id": new_uuids(n_products),
+        "name": [f"Product {i}" for i in range(n_products)],
+        "price": np.round(rng.uniform(1, 500, size=n_products), 2),
+        "stock": stock,
+        "created_date": now,
+        "last_update_date": now,
+    })
+    backend = store.get_backend()
+    backend.write_batch("customers", customers)
+    backend.write_batch("products", products)
+    return customers["id"].to_numpy(), products["id"].to_numpy()
+
+
+def run_sessions(sessions, carts_per_session, n_lines, customer_ids, product_ids, seed_):
+    """Places carts from ``sessions`` threads at once; returns latencies, placed lines and rejections."""
+    latencies, placed, rejected = [], [], [0]
+    lock = threading.Lock()
+    start_gate = threading.Barrier(sessions + 1)
+
+    def session(i):
+        rng = np.random.default_rng(seed_ + i)
+        own_latencies, own_placed, own_rejected = [], [], 0
+        start_gate.wait()
+        for _ in range(carts_per_session):
+            customer = customer_ids[rng.integers(len(customer_ids))]
+            lines = [(pid, int(q)) for pid, q in zip(
+                rng.choice(product_ids, size=n_lines, replace=False), rng.integers(1, 4, size=n_lines))]
+            t0 = time.perf_counter()
+            try:
+                result = checkout.place_order(customer, lines)
+                own_placed.append((result, lines))
+            except OutOfStock:
+                own_rejected += 1
+            own_latencies.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(own_latencies)
+            placed.extend(own_placed)
+            rejected[0] += own_rejected
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies, placed, rejected[0]
+
+
+def check_stock(initial_stock, placed):
+    """Initial stock minus what was sold must equal the stock left, and none may go negative."""
+    sold = pd.Series([q for _, lines in placed for _, q in lines],
+                     index=[pid for _, lines in placed for pid, _ in lines], dtype="int64").groupby(level=0).sum()
+    left = store.get_backend().list_products().set_index("id")["stock"].astype("int64")
+    expected = initial_stock.sub(sold, fill_value=0).astype("int64")
+    orders = store.get_backend().count_rows("orders")
+    lines = sum(len(r.order_ids) for r, _ in placed)
+    return bool((left.reindex(expected.index) == expected).all() and (left >= 0).all() and orders == lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--carts-per-session", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=3, help="products per cart")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--scarce", action="store_true", help="seed 5 units per product instead of plenty")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store.set_cache(None)
+    stock = 5 if args.scarce else 1_000_000
+    print(f"{'mode':<10} {'sessions':>8} {'carts':>7} {'orders/s':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'rejected':>8} {'batches':>8} {'max batch':>9} {'stock ok':>8}")
+    for sessions in args.sessions:
+        for batched in (True, False):
+            with tempfile.TemporaryDirectory() as tmp:
+                if args.backend == "sqlite":
+                    store.use_backend("sqlite", sqlite_path=os.path.join(tmp, "bench.db"))
+                else:
+                    store.use_backend("memory")
+                store.initialize_db()
+                rng = np.random.default_rng(args.seed)
+                customer_ids, product_ids = seed(args.customers, args.products, stock, rng)
+                initial_stock = pd.Series(stock, index=product_ids, dtype="int64")
+
+                checkout.ORDER_BATCHING = batched
+                batcher = checkout._batcher = checkout.OrderBatcher()
+                seconds, latencies, placed, rejected = run_sessions(
+                    sessions, args.carts_per_session, args.lines, customer_ids, product_ids, args.seed)
+                ms = np.asarray(latencies) * 1000
+                print(f"{'batched' if batched else 'per cart':<10} {sessions:>8} {len(latencies):>7} "
+                      f"{len(placed) / seconds:>10,.0f} {np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} "
+                      f"{rejected:>8} {batcher.stats['batches'] if batched else len(latencies):>8} "
+                      f"{batcher.stats['largest_batch'] if batched else 1:>9} {str(check_stock(initial_stock, placed)):>8}")
+                store.get_backend().close()
+
+
+if __name__ == "__main__":
+    main()
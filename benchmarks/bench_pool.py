@@ -0,0 +1,76 @@
+"""
+Offline benchmark: connect-per-call (the old get_connection() pattern) vs the pooled store connections.
+
+Runs against a local SQLite file via pool.sqlite_connect; --connect-delay simulates the
+TLS + session-open cost of a Databricks SQL Warehouse connection.
+
+    python benchmarks/bench_pool.py --calls 200 --threads 4 --connect-delay 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pool import ConnectionPool, sqlite_connect  # noqa: E402
+
+
+def one_statement(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM customers")
+        cur.fetchall()
+
+
+def run_unpooled(connect, calls, threads):
+    def task(_):
+        conn = connect()
+        try:
+            one_statement(conn)
+        finally:
+            conn.close()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(task, range(calls)))
+    return time.perf_counter() - start
+
+
+def run_pooled(pool, calls, threads):
+    def task(_):
+        with pool.connection() as conn:
+            one_statement(conn)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(task, range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--connect-delay", type=float, default=0.05, help="simulated session-open latency (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connect = sqlite_connect(os.path.join(tmp, "bench.db"), connect_delay=args.connect_delay)
+        setup = connect()
+        setup.execute("CREATE TABLE customers (id TEXT PRIMARY KEY, name TEXT)")
+        setup.close()
+
+        unpooled = run_unpooled(connect, args.calls, args.threads)
+        pool = ConnectionPool(connect, max_size=args.pool_size)
+        pooled = run_pooled(pool, args.calls, args.threads)
+        pool.close()
+
+    print(f"calls={args.calls} threads={args.threads} connect_delay={args.connect_delay * 1000:.0f}ms")
+    print(f"connect-per-call: {unpooled:.3f}s  ({args.calls / unpooled:,.0f} calls/s)")
+    print(f"pooled:           {pooled:.3f}s  ({args.calls / pooled:,.0f} calls/s)  stats={pool.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Read latency: local read replica vs the warehouse path.
+
+Seeds --orders orders (and their customers and products) into a local SQLite store
+standing in for the warehouse, where every statement also sleeps --round-trip-ms, then
+times the app's reads, uncached, two ways:
+
+- warehouse: the primary backend, one round trip per statement;
+- replica:   replica.ReplicaBackend in front of it, reads served from its SQLite copy
+             (no round trip) while within the staleness bound.
+
+Also reports what keeping the replica fresh costs on the primary: the statements and
+time of a refresh with nothing changed and after --changes new orders, and the first
+read after a write (falls back to the primary until the next refresh).
+
+    python benchmarks/bench_replica.py
+    python benchmarks/bench_replica.py --orders 200000 --round-trip-ms 150 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+import migrations  # noqa: E402
+import replica  # noqa: E402
+import store  # noqa: E402
+import tracing  # noqa: E402
+from backends import utcnow  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+
+def seed(customers, products, orders, rng):
+    backend = store.get_backend()
+    now = utcnow()
+    customer_ids, product_ids = new_uuids(customers), new_uuids(products)
+    backend.write_batch("customers", pd.DataFrame({
+        "id": customer_ids,
+        "name": [f"Customer {i}" for i in range(customers)],
+        "email": [f"customer{i}@example.com" for i in range(customers)],
+        "created_date": now,
+        "last_update_date": now,
+    }))
+    backend.write_batch("products", pd.DataFrame({
+        "id": product_ids,
+        "name": [f"Product {i}" for i in range(products)],
+        "description": [f"Description of product {i}" for i in range(products)],
+        "price": np.round(rng.uniform(1, 500, size=products), 2),
+        "stock": rng.integers(0, 1000, size=products),
+        "created_date": now,
+        "last_update_date": now,
+    }))
+    stamps = pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 180 * 86_400, size=orders), unit="s")
+    backend.write_batch("orders", pd.DataFrame({
+        "id": new_uuids(orders),
+        "customer_id": customer_ids[rng.integers(customers, size=orders)],
+        "product_id": product_ids[rng.integers(products, size=orders)],
+        "quantity": rng.integers(1, 5, size=orders),
+        "total_amount": np.round(rng.uniform(1, 2000, size=orders), 2),
+        "order_date": stamps,
+        "created_date": stamps,
+        "last_update_date": stamps,
+    }))
+    return customer_ids, product_ids
+
+
+# The app's reads, uncached (``.uncached`` skips the result cache).
+def page(table, limit, filters=(), sort_by="created_date", descending=True):
+    return lambda: store.get_backend().page(table, limit, None, filters, sort_by, descending)
+
+
+READS = [
+    ("page customers", page("customers", 50)),
+    ("page orders filtered", page("orders", 50, (("total_amount", ">=", 1000.0),))),
+    ("lookup product by name", page("products", 20, (("name", "contains", "product 12"),), "name", False)),
+    ("all customers", lambda: store.table_rows.uncached("customers")),
+    ("orders detailed", lambda: store.list_orders_detailed.uncached()),
+    ("sales summary 90d", lambda: analytics.sales_summary.uncached(90)),
+    ("top products 90d", lambda: analytics.top_products.uncached(90, 10)),
+]
+
+
+def timed(fn, repeat):
+    """Median seconds and statements sent to the primary per call."""
+    seconds, statements = [], 0
+    for _ in range(repeat):
+        run = tracing.begin_run()
+        t0 = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - t0)
+        statements += len(run.queries)
+    return float(np.median(seconds)), statements / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=5_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--changes", type=int, default=100, help="new orders before the incremental refresh")
+    parser.add_argument("--round-trip-ms", type=float, default=100.0, help="warehouse latency per statement")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    store.set_cache(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        store.use_backend("sqlite", sqlite_path=os.path.join(tmp, "warehouse.db"))
+        store.initialize_db()
+        customer_ids, product_ids = seed(args.customers, args.products, args.orders, rng)
+        primary = store.get_backend()
+        # Only the primary's statements are traced: the round trip is the warehouse's.
+        tracing.add_hook(lambda trace: time.sleep(args.round_trip_ms / 1000))
+
+        warehouse = {name: timed(fn, args.repeat) for name, fn in READS}
+
+        rb = replica.ReplicaBackend(primary, replica.sqlite_replica(os.path.join(tmp, "replica.db")),
+                                    max_lag=3600, refresh_every=0)
+        store.set_backend(rb)
+        migrations.bootstrap(rb.local)
+        run = tracing.begin_run()
+        t0 = time.perf_counter()
+        rb.refresh()
+        first_copy = (time.perf_counter() - t0, len(run.queries))
+        local = {name: timed(fn, args.repeat) for name, fn in READS}
+
+        print(f"{'read':<24} {'warehouse ms':>12} {'stmts':>5} {'replica ms':>10} {'stmts':>5} {'speedup':>7}")
+        for name, _ in READS:
+            (w, ws), (r, rs) = warehouse[name], local[name]
+            print(f"{name:<24} {w * 1000:>12.1f} {ws:>5.0f} {r * 1000:>10.1f} {rs:>5.0f} {w / r:>6.1f}x")
+
+        def refresh():
+            rb.refresh()
+
+        idle = timed(refresh, 1)
+        for _ in range(args.changes):
+            primary.create_order(new_uuids(1)[0], str(rng.choice(customer_ids)), str(rng.choice(product_ids)), 1, 10.0)
+        changed = timed(refresh, 1)
+        rb.written("orders")
+        fallback = timed(READS[1][1], 1)
+        print()
+        print(f"first copy into the replica:    {first_copy[0] * 1000:9.0f} ms, {first_copy[1]} statements")
+        print(f"refresh, nothing changed:       {idle[0] * 1000:9.0f} ms, {idle[1]:.0f} statements")
+        print(f"refresh after {args.changes:>5} new orders: {changed[0] * 1000:9.0f} ms, {changed[1]:.0f} statements")
+        print(f"read right after a write:       {fallback[0] * 1000:9.0f} ms, {fallback[1]:.0f} statements (fallback)")
+        rb.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Scaling with replicas: warehouse statements and rerun latency, per-process vs shared cache.
+
+Seeds a local SQLite store, then runs --replicas app replicas (one process each, like
+deploy.py) at once. Each replica runs --reruns reruns of the app's reads (a page of
+every table, the whole-table reads and the analytics of app.py) for random pages, and
+every --write-every reruns a create_order(), which invalidates the orders results.
+Every statement sleeps --round-trip-ms, standing in for the warehouse round trip. Two
+cache setups:
+
+- per process: each replica has its own ResultCache (what N Streamlit servers get);
+- shared:      every replica uses the shared_cache.py file (STORE_SHARED_CACHE_PATH),
+               as deploy.py sets it up.
+
+Reports warehouse statements across all replicas and the p50/p95 rerun latency.
+
+    python benchmarks/bench_replicas.py
+    python benchmarks/bench_replicas.py --replicas 1 2 4 8 16 --reruns 50 --round-trip-ms 150
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+import store  # noqa: E402
+import tracing  # noqa: E402
+from backends import utcnow  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+SORTS = ("created_date", "name")
+
+
+def seed(customers, products, orders, rng):
+    backend = store.get_backend()
+    now = utcnow()
+    customer_ids, product_ids = new_uuids(customers), new_uuids(products)
+    backend.write_batch("customers", pd.DataFrame({
+        "id": customer_ids,
+        "name": [f"Customer {i}" for i in range(customers)],
+        "email": [f"customer{i}@example.com" for i in range(customers)],
+        "created_date": now,
+        "last_update_date": now,
+    }))
+    backend.write_batch("products", pd.DataFrame({
+        "id": product_ids,
+        "name": [f"Product {i}" for i in range(products)],
+        "description": [f"Description of product {i}" for i in range(products)],
+        "price": np.round(rng.uniform(1, 500, size=products), 2),
+        "stock": rng.integers(0, 1000, size=products),
+        "created_date": now,
+        "last_update_date": now,
+    }))
+    stamps = pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 180 * 86_400, size=orders), unit="s")
+    backend.write_batch("orders", pd.DataFrame({
+        "id": new_uuids(orders),
+        "customer_id": customer_ids[rng.integers(customers, size=orders)],
+        "product_id": product_ids[rng.integers(products, size=orders)],
+        "quantity": rng.integers(1, 5, size=orders),
+        "total_amount": np.round(rng.uniform(1, 2000, size=orders), 2),
+        "order_date": stamps,
+        "created_date": stamps,
+        "last_update_date": stamps,
+    }))
+    return customer_ids, product_ids
+
+
+def rerun(rnd):
+    """The reads of one app rerun with every tab open, for a random page and sort."""
+    for table in ("customers", "products", "orders"):
+        store.list_page(table, 50, sort_by=rnd.choice(SORTS) if table != "orders" else "created_date",
+                        descending=rnd.random() < 0.5)
+    store.table_rows("customers")
+    store.table_rows("products")
+    store.list_orders_detailed()
+    store.product_index()
+    days = rnd.choice((30, 90))
+    analytics.sales_summary(days)
+    analytics.revenue_by_period("day", days)
+    analytics.top_products(days, 10)
+    analytics.top_customers(days, 10)
+
+
+def replica(index, args, customer_ids, product_ids, barrier, results):
+    """One replica process: counts its statements and times its reruns."""
+    statements = 0
+
+    def round_trip(trace):
+        nonlocal statements
+        statements += 1
+        time.sleep(args.round_trip_ms / 1000)
+
+    rnd = random.Random(args.seed + index)
+    store.initialize_db()
+    tracing.add_hook(round_trip)
+    barrier.wait()
+    seconds = []
+    for i in range(args.reruns):
+        if args.write_every and i % args.write_every == args.write_every - 1:
+            store.create_order(rnd.choice(customer_ids), rnd.choice(product_ids), 1, 10.0)
+        t0 = time.perf_counter()
+        rerun(rnd)
+        seconds.append(time.perf_counter() - t0)
+    results.put((statements, seconds))
+
+
+def run(replicas, args, env, customer_ids, product_ids):
+    ctx = multiprocessing.get_context("spawn")  # fresh interpreters, which read the env on import
+    barrier, results = ctx.Barrier(replicas), ctx.Queue()
+    saved = dict(os.environ)
+    os.environ.update(env)
+    try:
+        procs = [ctx.Process(target=replica, args=(i, args, customer_ids, product_ids, barrier, results))
+                 for i in range(replicas)]
+        for p in procs:
+            p.start()
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return sum(s for s, _ in out), np.concatenate([t for _, t in out])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--reruns", type=int, default=20, help="reruns per replica")
+    parser.add_argument("--write-every", type=int, default=5, help="a create_order() every N reruns (0: never)")
+    parser.add_argument("--round-trip-ms", type=float, default=100.0, help="warehouse latency per statement")
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        store.use_backend("sqlite", sqlite_path=db_path)
+        store.initialize_db()
+        customer_ids, product_ids = seed(args.customers, args.products, args.orders, np.random.default_rng(args.seed))
+        store.get_backend().close()
+
+        print(f"{'replicas':>8} {'cache':<12} {'statements':>10} {'per rerun':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for n in args.replicas:
+            for variant in ("per process", "shared"):
+                # The slow-query log would report every simulated round trip.
+                env = {"STORE_BACKEND": "sqlite", "STORE_SQLITE_PATH": db_path, "STORE_SLOW_QUERY_MS": "1e9"}
+                if variant == "shared":
+                    env["STORE_SHARED_CACHE_PATH"] = os.path.join(tmp, f"shared-{n}.db")
+                statements, seconds = run(n, args, env, list(customer_ids), list(product_ids))
+                print(f"{n:>8} {variant:<12} {statements:>10} {statements / len(seconds):>9.2f} "
+                      f"{np.percentile(seconds, 50) * 1000:>8.0f} {np.percentile(seconds, 95) * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
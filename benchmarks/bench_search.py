@@ -0,0 +1,86 @@
+"""
+Typeahead search latency: the search index vs scanning the table per keystroke.
+
+Builds synthetic customers (name + email) at each --rows size, then times:
+
+- build:   SearchIndex construction (done once per rebuild, in the background);
+- index:   SearchIndex.search() for a mix of typed queries (prefixes, infixes, emails);
+- scan:    the same queries as a case-insensitive substring filter over the DataFrame,
+           which is what a selector without an index does on every keystroke;
+- options: building the full id -> label option list a plain selectbox needs per rerun.
+
+    python benchmarks/bench_search.py --rows 10000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+
+FIRST = ["alice", "bob", "charlie", "dmitri", "émile", "zoë", "frank", "grace", "hana", "ivan"]
+LAST = ["smith", "jones", "o'brien", "müller", "nguyen", "garcia", "kowalski", "tanaka"]
+QUERIES = ["a", "ch", "char", "charlie s", "müll", "ith", "nguyen 12", "example.org", "@mail", "zzz", "4242"]
+
+
+def customers(n, rng):
+    first = np.array(FIRST)[rng.integers(len(FIRST), size=n)]
+    last = np.array(LAST)[rng.integers(len(LAST), size=n)]
+    numbers = np.arange(n).astype(str)
+    names = pd.Series(first, dtype=object).str.title() + " " + pd.Series(last, dtype=object).str.title() + " " + numbers
+    emails = pd.Series(first, dtype=object) + "." + numbers + np.where(np.arange(n) % 2, "@example.org", "@mail.com")
+    return pd.DataFrame({"id": new_uuids(n), "name": names, "email": emails})
+
+
+def percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each query")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'build s':>8} {'index p50':>10} {'index p95':>10} {'scan p50':>9} {'scan p95':>9} {'options ms':>11}")
+    for n in args.rows:
+        df = customers(n, np.random.default_rng(args.seed))
+
+        start = time.perf_counter()
+        index = search.SearchIndex(df, search.SEARCH_FIELDS["customers"])
+        build = time.perf_counter() - start
+
+        index_times, scan_times = [], []
+        for q in QUERIES:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                index.search(q, args.limit)
+                index_times.append(time.perf_counter() - t0)
+            for _ in range(max(args.repeat // 10, 1)):
+                t0 = time.perf_counter()
+                mask = df["name"].str.contains(q, case=False, regex=False) | df["email"].str.contains(q, case=False, regex=False)
+                df.loc[mask, ["id", "name", "email"]].head(args.limit)
+                scan_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        ids = df["id"].tolist()
+        dict(zip(ids, (f"{i} | {name}" for i, name in zip(ids, df["name"].tolist()))))
+        options = time.perf_counter() - t0
+
+        i50, i95 = percentiles(index_times)
+        s50, s95 = percentiles(scan_times)
+        print(f"{n:>10,} {build:>8.2f} {i50:>8.2f}ms {i95:>8.2f}ms {s50:>7.1f}ms {s95:>7.1f}ms {options * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
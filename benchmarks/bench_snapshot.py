@@ -0,0 +1,141 @@
+"""
+Memory of a cached whole table: DataFrame vs compact.CompactTable.
+
+Builds --orders orders (plus customers and products) as the backend returns them,
+then encodes each table with compact.CompactTable and reports bytes per row of:
+
+- frame:   the DataFrame as loaded (pandas' default string dtype, Arrow-backed when
+           pyarrow is installed; SQLite timestamps as text);
+- object:  the same DataFrame with object-dtype Python strings (pandas without Arrow
+           strings, and the warehouse connector without Arrow fetching);
+- compact: the CompactTable, dictionaries included;
+
+plus the time to encode, to convert back with to_frame(), and to look up one row by id.
+
+    python benchmarks/bench_snapshot.py --orders 1000000 2000000
+    python benchmarks/bench_snapshot.py --orders 1000000 --sqlite   # load through the SQLite backend
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compact  # noqa: E402
+import store  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+from schema import TABLE_SCHEMAS  # noqa: E402
+
+
+def _text_timestamps(n, rng):
+    # As SQLite returns them: ISO text with microseconds.
+    start = np.datetime64("2024-01-01T00:00:00", "us")
+    stamps = start + np.sort(rng.integers(0, 365 * 86_400_000_000, size=n)).astype("timedelta64[us]")
+    return pd.Series(np.datetime_as_string(stamps[::-1], unit="us"), dtype="str").str.replace("T", " ")
+
+
+def synthetic(n_orders, n_customers, n_products, rng):
+    customers = pd.DataFrame({
+        "id": new_uuids(n_customers),
+        "name": [f"Customer {i}" for i in range(n_customers)],
+        "email": [f"customer{i}@example.com" for i in range(n_customers)],
+        "phone": [f"+1-555-{i % 10_000:04d}" for i in range(n_customers)],
+        "address": [f"{i} Main Street" for i in range(n_customers)],
+        "created_date": _text_timestamps(n_customers, rng),
+        "last_update_date": _text_timestamps(n_customers, rng),
+    })
+    products = pd.DataFrame({
+        "id": new_uuids(n_products),
+        "name": [f"Product {i}" for i in range(n_products)],
+        "description": [f"Description of product {i}" for i in range(n_products)],
+        "price": np.round(rng.uniform(1, 500, size=n_products), 2),
+        "stock": rng.integers(0, 1000, size=n_products),
+        "created_date": _text_timestamps(n_products, rng),
+        "last_update_date": _text_timestamps(n_products, rng),
+    })
+    stamps = _text_timestamps(n_orders, rng)
+    orders = pd.DataFrame({
+        "id": new_uuids(n_orders),
+        "customer_id": customers["id"].to_numpy()[rng.integers(n_customers, size=n_orders)],
+        "product_id": products["id"].to_numpy()[rng.integers(n_products, size=n_orders)],
+        "quantity": rng.integers(1, 5, size=n_orders),
+        "total_amount": np.round(rng.uniform(1, 2000, size=n_orders), 2),
+        "order_date": stamps,
+        "created_date": stamps,
+        "last_update_date": stamps,
+    })
+    for df in (customers, products, orders):
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].astype("str")
+    return {"customers": customers, "products": products, "orders": orders}
+
+
+def through_sqlite(tables, path):
+    """Writes the tables into a SQLite store and reads them back with the backend's list_* queries."""
+    store.set_cache(None)
+    store.use_backend("sqlite", sqlite_path=path)
+    store.initialize_db()
+    backend = store.get_backend()
+    for table, df in tables.items():
+        backend.write_batch(table, df)
+    return {table: getattr(backend, f"list_{table}")() for table in tables}
+
+
+def measure(table, df):
+    frame = df.memory_usage(deep=True).sum()
+    obj = df.astype({c: object for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])}).memory_usage(deep=True).sum()
+
+    t0 = time.perf_counter()
+    packed = compact.CompactTable.from_frame(df, TABLE_SCHEMAS[table])
+    encode = time.perf_counter() - t0
+    size = packed.nbytes
+
+    t0 = time.perf_counter()
+    packed.to_frame()
+    to_frame = time.perf_counter() - t0
+
+    ids = df["id"].to_numpy()
+    t0 = time.perf_counter()
+    packed.row(ids[len(ids) // 2])
+    first_row = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for id_ in ids[:100]:
+        packed.row(id_)
+    next_row = (time.perf_counter() - t0) / min(len(ids), 100)
+
+    n = len(df)
+    print(f"{table:<10} {n:>10,} {frame / n:>8.0f} {obj / n:>8.0f} {size / n:>8.1f} {frame / size:>6.1f}x "
+          f"{encode:>8.2f} {to_frame:>9.2f} {first_row * 1000:>9.1f} {next_row * 1000:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--sqlite", action="store_true", help="load the rows through the SQLite backend")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'table':<10} {'rows':>10} {'frame B':>8} {'object B':>8} {'compact B':>9} {'saved':>7} "
+          f"{'encode s':>8} {'to_frame s':>10} {'row 1st ms':>10} {'row ms':>8}")
+    for n_orders in args.orders:
+        tables = synthetic(n_orders, args.customers, args.products, np.random.default_rng(args.seed))
+        if args.sqlite:
+            with tempfile.TemporaryDirectory() as tmp:
+                tables = through_sqlite(tables, os.path.join(tmp, f"bench-{uuid.uuid4().hex}.db"))
+                store.get_backend().close()
+        for table, df in tables.items():
+            measure(table, df)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Start-up cost: cold start of the app's imports and the per-rerun schema bootstrap.
+
+Cold start (fresh interpreter per sample, like a new server process):
+- streamlit: importing streamlit, which is all that precedes the page title now;
+- data layer: pandas, store and the rest of app.py's imports, which the title used to wait for.
+
+Schema bootstrap on a local SQLite store (statement counts carry over to the
+warehouse, where each statement is a round-trip of 100 ms or more):
+- DDL per rerun (before): backend.initialize(), the CREATE TABLE IF NOT EXISTS statements
+  app.py used to run on every rerun;
+- new process: initialize_db() against an existing store at the current version;
+- later reruns: initialize_db() once it ran in this process.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --cold-samples 10 --reruns 200
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_COLD_START = """
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import streamlit
+t1 = time.perf_counter()
+import pandas, analytics, bulk_import, checkout, tracing, store, loader
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def cold_start(samples):
+    code = _COLD_START.format(root=ROOT)
+    streamlit_s, data_s = [], []
+    for _ in range(samples):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=tempfile.gettempdir())
+        a, b = map(float, out.stdout.split()[-2:])
+        streamlit_s.append(a)
+        data_s.append(b)
+    return sorted(streamlit_s)[len(streamlit_s) // 2], sorted(data_s)[len(data_s) // 2]
+
+
+def timed(fn, repeat):
+    """Median seconds and statements per call of ``fn``."""
+    import tracing
+
+    seconds, statements = [], []
+    for _ in range(repeat):
+        run = tracing.begin_run()
+        t0 = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - t0)
+        statements.append(len(run.queries))
+    return sorted(seconds)[len(seconds) // 2], max(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cold-samples", type=int, default=5, help="fresh interpreters for the cold start")
+    parser.add_argument("--reruns", type=int, default=100, help="timed calls per bootstrap variant")
+    args = parser.parse_args()
+
+    streamlit_s, data_s = cold_start(args.cold_samples)
+    print(f"cold start (median of {args.cold_samples}):")
+    print(f"  title drawn after      before {(streamlit_s + data_s) * 1000:8.0f} ms   now {streamlit_s * 1000:8.0f} ms")
+    print(f"  data layer imports            {data_s * 1000:8.0f} ms (after the title now)")
+
+    import store
+
+    store.set_cache(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        store.use_backend("sqlite", sqlite_path=os.path.join(tmp, "bench.db"))
+        first, first_statements = timed(store.initialize_db, 1)
+        backend = store.get_backend()
+        ddl, ddl_statements = timed(backend.initialize, args.reruns)
+
+        def new_process():
+            store._initialized = None
+            store.initialize_db()
+        check, check_statements = timed(new_process, args.reruns)
+        rerun, rerun_statements = timed(store.initialize_db, args.reruns)
+        backend.close()
+
+    print("schema bootstrap (SQLite; median per call):")
+    print(f"  {'new store':<28} {first * 1000:9.3f} ms {first_statements:3d} statements")
+    print(f"  {'DDL per rerun (before)':<28} {ddl * 1000:9.3f} ms {ddl_statements:3d} statements")
+    print(f"  {'new process, current store':<28} {check * 1000:9.3f} ms {check_statements:3d} statements")
+    print(f"  {'later reruns':<28} {rerun * 1000:9.3f} ms {rerun_statements:3d} statements")
+
+
+if __name__ == "__main__":
+    main()
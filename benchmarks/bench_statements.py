@@ -0,0 +1,86 @@
+"""
+Offline micro-benchmark: literal SQL (the old f-string + escape() style) vs bound parameters.
+
+Runs against the local SQLite stand-in backend and inserts the same customers three ways:
+  literal      one unique SQL text per row, values formatted into the statement
+  parameters   one templated statement (store.statement("create_customer")), values bound
+  executemany  the templated statement executed as one batch
+
+    python benchmarks/bench_statements.py --rows 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store  # noqa: E402
+from pool import ConnectionPool, sqlite_connect  # noqa: E402
+
+
+def _escape(s):
+    return s.replace("'", "''")
+
+
+def literal(conn, rows):
+    with conn.cursor() as cur:
+        for r in rows:
+            cur.execute(
+                f"INSERT INTO customers (id, name, email, phone, address, created_date, last_update_date) "
+                f"VALUES ('{r['id']}', '{_escape(r['name'])}', '{_escape(r['email'])}', '{_escape(r['phone'])}', "
+                f"'{_escape(r['address'])}', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            )
+
+
+def parameters(conn, rows):
+    sql = store.statement("create_customer")
+    with conn.cursor() as cur:
+        for r in rows:
+            cur.execute(sql, r)
+
+
+def executemany(conn, rows):
+    with conn.cursor() as cur:
+        cur.executemany(store.statement("create_customer"), rows)
+
+
+def make_rows(n):
+    return [
+        {"id": str(uuid.uuid4()), "name": f"Customer {i}", "email": f"c{i}@example.com", "phone": f"0{i:09d}", "address": f"{i} O'Neil St"}
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    store.set_dialect("sqlite")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in (("literal", literal), ("parameters", parameters), ("executemany", executemany)):
+            pool = ConnectionPool(sqlite_connect(os.path.join(tmp, f"{name}.db")), max_size=1)
+            store.set_pool(pool)
+            store.initialize_db()
+            rows = make_rows(args.rows)
+            with pool.connection() as conn:
+                conn.execute("BEGIN")
+                start = time.perf_counter()
+                fn(conn, rows)
+                results[name] = time.perf_counter() - start
+                conn.execute("COMMIT")
+            pool.close()
+
+    base = results["literal"]
+    print(f"rows={args.rows}")
+    for name, seconds in results.items():
+        print(f"{name:<12} {seconds:7.3f}s  {args.rows / seconds:>10,.0f} rows/s  x{base / seconds:4.1f} vs literal")
+
+
+if __name__ == "__main__":
+    main()
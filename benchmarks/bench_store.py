@@ -0,0 +1,307 @@
+"""
+Load test of the CRUD layer at configurable scale, with JSON results for run-to-run comparison.
+
+Seeds synthetic customers, products and orders into the local SQLite or in-memory
+backend, then times every store create_/list_/update_/delete_ function, list_page,
+the orders read model and a simulated app.py rerun (initialize_db plus every tab's
+reads through the loader). Reports p50/p95/p99 latency, throughput and peak memory.
+
+    python benchmarks/bench_store.py --orders 10000 --output results/10k.json
+    python benchmarks/bench_store.py --backend memory --orders 1000000 --compare results/10k.json
+
+The result cache is disabled unless --cache is given, so every call reaches the backend.
+With --sync, list_* are served from incrementally synced snapshots (see sync.py).
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store  # noqa: E402
+import sync  # noqa: E402
+from bulk_import import new_uuids  # noqa: E402
+from loader import load_concurrently  # noqa: E402
+
+SEED_BATCH_ROWS = 10_000
+
+
+# -------------------------
+# Seeding
+# -------------------------
+def _timestamps(rng, n, now):
+    """Creation times spread over the last year."""
+    offsets = rng.integers(0, 365 * 24 * 3600, size=n)
+    return pd.to_datetime(now) - pd.to_timedelta(offsets, unit="s")
+
+
+def _seed_table(table, n, make_batch):
+    backend = store.get_backend()
+    ids = []
+    for start in range(0, n, SEED_BATCH_ROWS):
+        batch = make_batch(start, min(SEED_BATCH_ROWS, n - start))
+        backend.write_batch(table, batch)
+        ids.append(batch["id"].to_numpy())
+    return np.concatenate(ids) if ids else np.array([], dtype=str)
+
+
+def seed(n_customers, n_products, n_orders, rng):
+    """Writes the synthetic data set in batches; returns the seeded ids per table."""
+    now = datetime.utcnow()
+
+    def customers(start, n):
+        idx = np.arange(start, start + n).astype(str)
+        created = _timestamps(rng, n, now)
+        return pd.DataFrame({
+            "id": new_uuids(n),
+            "name": np.char.add("Customer ", idx),
+            "email": np.char.add(np.char.add("c", idx), "@example.com"),
+            "phone": np.char.zfill(idx, 10),
+            "address": np.char.add(idx, " Main St"),
+            "created_date": created,
+            "last_update_date": created,
+        })
+
+    def products(start, n):
+        idx = np.arange(start, start + n).astype(str)
+        created = _timestamps(rng, n, now)
+        return pd.DataFrame({
+            "id": new_uuids(n),
+            "name": np.char.add("Product ", idx),
+            "description": np.char.add("Description of product ", idx),
+            "price": np.round(rng.uniform(1, 500, size=n), 2),
+            "stock": rng.integers(0, 1000, size=n),
+            "created_date": created,
+            "last_update_date": created,
+        })
+
+    customer_ids = _seed_table("customers", n_customers, customers)
+    product_ids = _seed_table("products", n_products, products)
+
+    def orders(start, n):
+        created = _timestamps(rng, n, now)
+        quantity = rng.integers(1, 10, size=n)
+        return pd.DataFrame({
+            "id": new_uuids(n),
+            "customer_id": customer_ids[rng.integers(0, len(customer_ids), size=n)],
+            "product_id": product_ids[rng.integers(0, len(product_ids), size=n)],
+            "quantity": quantity,
+            "total_amount": np.round(quantity * rng.uniform(1, 500, size=n), 2),
+            "order_date": created,
+            "created_date": created,
+            "last_update_date": created,
+        })
+
+    order_ids = _seed_table("orders", n_orders, orders)
+    return {"customers": customer_ids, "products": product_ids, "orders": order_ids}
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(samples, peak_alloc=None):
+    ms = np.asarray(samples) * 1000
+    total = float(np.sum(samples))
+    out = {
+        "calls": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "ops_per_sec": len(samples) / total if total else 0.0,
+    }
+    if peak_alloc is not None:
+        out["peak_alloc_mb"] = peak_alloc / (1024 * 1024)
+    return out
+
+
+def measure(fn, calls, trace_memory=False):
+    """Calls ``fn(i)`` ``calls`` times and returns the latency summary."""
+    if trace_memory:
+        tracemalloc.start()
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summarize(samples, peak)
+
+
+def rerun_jobs():
+    """The reads app.py submits on a rerun with every tab open and default paging widgets."""
+    page = {"limit": 50, "after": None, "filters": (), "sort_by": "created_date", "descending": True}
+    return [
+        ("customers_page", lambda: store.list_page("customers", **page)),
+        ("customers", store.list_customers),
+        ("products_page", lambda: store.list_page("products", **page)),
+        ("products", store.list_products),
+        ("orders_page", lambda: store.list_page("orders", **page)),
+        ("orders_detailed", store.list_orders_detailed),
+        ("customer_index", store.customer_index),
+        ("product_index", store.product_index),
+    ]
+
+
+def simulated_rerun(_):
+    store.initialize_db()
+    jobs = rerun_jobs()
+    loads = load_concurrently(jobs, version=store.data_version)
+    for name, _fn in jobs:
+        loads.get(name)
+
+
+def run_operations(ids, args, rng):
+    results = {}
+    w, r = args.iterations, args.read_iterations
+
+    def ops(name, fn, calls):
+        results[name] = measure(fn, calls, args.trace_memory)
+
+    def pick(table):
+        return ids[table][rng.integers(0, len(ids[table]))]
+
+    created = {"customers": [], "products": [], "orders": []}
+
+    # Writes; rows created here are the ones deleted at the end, so the seeded set stays intact.
+    ops("create_customer", lambda i: created["customers"].append(
+        store.create_customer(f"Bench {i}", f"bench{i}@example.com", "0123456789", "1 Bench Rd")), w)
+    ops("create_product", lambda i: created["products"].append(
+        store.create_product(f"Bench product {i}", "bench", 9.99, 100)), w)
+    ops("create_order", lambda i: created["orders"].append(
+        store.create_order(pick("customers"), pick("products"), 2, 19.98)), w)
+    ops("update_customer", lambda i: store.update_customer(
+        pick("customers"), f"Updated {i}", f"u{i}@example.com", "0123456789", "2 Bench Rd"), w)
+    ops("update_product", lambda i: store.update_product(pick("products"), f"Updated product {i}", "bench", 10.5, 50), w)
+    ops("update_order", lambda i: store.update_order(pick("orders"), pick("customers"), pick("products"), 3, 31.5), w)
+
+    # Reads
+    ops("list_customers", lambda i: store.list_customers(), r)
+    ops("list_products", lambda i: store.list_products(), r)
+    ops("list_orders", lambda i: store.list_orders(), r)
+    ops("list_orders_detailed", lambda i: store.list_orders_detailed(), r)
+    ops("list_page_orders", lambda i: store.list_page("orders", limit=50), r)
+    ops("list_page_orders_filtered", lambda i: store.list_page(
+        "orders", limit=50, filters=[("quantity", ">=", 5)], sort_by="total_amount"), r)
+    ops("app_rerun", simulated_rerun, r)
+    if sync.SYNC_ENABLED:
+        # One changed row, then a list: the snapshot refresh should fetch only that row.
+        ops("list_orders_after_update", lambda i: (
+            store.update_order(pick("orders"), pick("customers"), pick("products"), 1, 10.5), store.list_orders()), r)
+
+    ops("delete_order", lambda i: store.delete_order(created["orders"][i]), w)
+    ops("delete_product", lambda i: store.delete_product(created["products"][i]), w)
+    ops("delete_customer", lambda i: store.delete_customer(created["customers"][i]), w)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["operations"]
+    print(f"\nvs {baseline_path} (p50 / p95 ratio, >1 is slower):")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        p50 = stats["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("nan")
+        p95 = stats["p95_ms"] / base["p95_ms"] if base["p95_ms"] else float("nan")
+        print(f"  {name:<28} x{p50:5.2f}  x{p95:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--sqlite-path", help="SQLite file (default: a temporary file)")
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--customers", type=int, help="default: orders / 10")
+    parser.add_argument("--products", type=int, help="default: orders / 100, at least 100")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per write operation")
+    parser.add_argument("--read-iterations", type=int, default=20, help="calls per read operation")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--sync", action="store_true", help="serve list_* from incrementally synced snapshots (STORE_SYNC)")
+    parser.add_argument("--trace-memory", action="store_true", help="record peak Python allocations per operation (slower)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="print latency ratios against an earlier --output")
+    args = parser.parse_args()
+
+    n_customers = args.customers or max(args.orders // 10, 1)
+    n_products = args.products or max(args.orders // 100, 100)
+    rng = np.random.default_rng(args.seed)
+
+    sync.SYNC_ENABLED = sync.SYNC_ENABLED or args.sync
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            store.use_backend("sqlite", sqlite_path=args.sqlite_path or os.path.join(tmp, "bench.db"))
+        else:
+            store.use_backend("memory")
+        if not args.cache:
+            store.set_cache(None)
+        store.initialize_db()
+
+        start = time.perf_counter()
+        ids = seed(n_customers, n_products, args.orders, rng)
+        seed_seconds = time.perf_counter() - start
+        seed_rows = n_customers + n_products + args.orders
+        rss_after_seed = peak_rss_mb()
+        print(f"seeded {n_customers:,} customers, {n_products:,} products, {args.orders:,} orders "
+              f"in {seed_seconds:.1f}s ({seed_rows / seed_seconds:,.0f} rows/s), peak RSS {rss_after_seed:,.0f} MB")
+
+        results = run_operations(ids, args, rng)
+        store.get_backend().close()
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "pandas": pd.__version__},
+        "config": {
+            "backend": args.backend,
+            "customers": n_customers,
+            "products": n_products,
+            "orders": args.orders,
+            "iterations": args.iterations,
+            "read_iterations": args.read_iterations,
+            "cache": args.cache,
+            "sync": sync.SYNC_ENABLED,
+        },
+        "seed": {"rows": seed_rows, "seconds": seed_seconds, "rows_per_sec": seed_rows / seed_seconds},
+        "peak_rss_mb": {"after_seed": rss_after_seed, "end": peak_rss_mb()},
+        "operations": results,
+    }
+
+    print(f"{'operation':<28} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for name, s in results.items():
+        print(f"{name:<28} {s['calls']:>6} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f} {s['ops_per_sec']:10,.1f}")
+    print(f"peak RSS {report['peak_rss_mb']['end']:,.0f} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
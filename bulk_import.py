@@ -0,0 +1,263 @@
+# bulk_import.py
+"""
+Bulk import of customers, products and orders from CSV or Parquet.
+
+The file is read in chunks; each chunk is validated and given UUIDs and timestamps
+with vectorized pandas/numpy operations, then handed to the configured backend's
+``write_batch`` (multi-row INSERT or upsert statements with bound values on the SQL
+backends).
+Progress and per-batch throughput are reported through a callback.
+
+CLI:
+    python bulk_import.py customers customers.csv
+    python bulk_import.py orders orders.parquet --batch-size 2000 --mode upsert
+    python bulk_import.py products products.csv --sqlite store.db   # local stand-in backend
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import store
+
+# Columns a file must provide per table; everything else in TABLE_SCHEMAS is optional.
+REQUIRED_COLUMNS = {
+    "customers": ("name",),
+    "products": ("name", "price"),
+    "orders": ("customer_id", "product_id", "quantity", "total_amount"),
+}
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+class BulkImportError(Exception):
+    pass
+
+
+class BatchStats(NamedTuple):
+    batch: int
+    rows: int
+    seconds: float
+    rows_per_sec: float
+    total_rows: int
+    rejected_rows: int
+
+
+class ImportResult(NamedTuple):
+    table: str
+    rows: int
+    rejected_rows: int
+    batches: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# -------------------------
+# Reading
+# -------------------------
+def read_chunks(source, fmt: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yields DataFrames of at most ``chunk_size`` rows from a CSV or Parquet file.
+    ``source`` is a path or a binary file object (e.g. a Streamlit upload);
+    ``fmt`` is "csv" or "parquet" and defaults to the file extension.
+    """
+    if fmt is None:
+        name = source if isinstance(source, str) else getattr(source, "name", "")
+        fmt = "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+    if fmt == "csv":
+        # Read everything as strings; validation does the typing so bad cells are rejected, not fatal.
+        yield from pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise BulkImportError("Parquet import requires pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise BulkImportError(f"Unsupported format: {fmt}")
+
+
+# -------------------------
+# Validation
+# -------------------------
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_UUID_DIGIT_POSITIONS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+
+def new_uuids(n: int) -> np.ndarray:
+    """n random (version 4) UUID strings, built from one block of random bytes without a Python loop."""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    digits = np.empty((n, 32), dtype=np.uint8)
+    digits[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    digits[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    out[:, _UUID_DIGIT_POSITIONS] = digits
+    return out.view("S36").ravel().astype(str)
+
+
+def prepare_chunk(table: str, df: pd.DataFrame, now: Optional[datetime] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Validates and completes one chunk for ``table``.
+
+    Returns (rows to insert, number of rejected rows). Rows with a missing required
+    value or a non-numeric number column are rejected; unknown columns are dropped;
+    missing ids get fresh UUIDs and missing timestamps get ``now``. ``last_update_date``
+    is always ``now``, whatever the file says: snapshots and replicas fetch rows changed
+    since their high-water mark, and an older stamp would hide the imported row from them.
+    """
+    schema = store.TABLE_SCHEMAS[table]
+    missing = [c for c in REQUIRED_COLUMNS[table] if c not in df.columns]
+    if missing:
+        raise BulkImportError(f"{table}: missing required column(s): {', '.join(missing)}")
+
+    df = df[[c for c in df.columns if c in schema]].copy()
+    n = len(df)
+    valid = np.ones(n, dtype=bool)
+
+    for column, col_type in schema.items():
+        if column not in df.columns:
+            continue
+        if col_type in ("INT", "DOUBLE"):
+            values = pd.to_numeric(df[column], errors="coerce")
+            bad = values.isna() & df[column].notna()
+            if col_type == "INT":
+                bad |= values.notna() & (values % 1 != 0)
+            valid &= ~bad.to_numpy()
+            df[column] = values
+        elif col_type == "TIMESTAMP":
+            values = pd.to_datetime(df[column], errors="coerce")
+            valid &= ~(values.isna() & df[column].notna()).to_numpy()
+            df[column] = values
+        else:
+            df[column] = df[column].astype("string").str.strip()
+
+    for column in REQUIRED_COLUMNS[table]:
+        valid &= df[column].notna().to_numpy()
+        if schema[column] == "STRING":
+            valid &= (df[column] != "").fillna(False).to_numpy()
+
+    df = df[valid]
+    rejected = n - len(df)
+    for column, col_type in schema.items():
+        if col_type == "INT" and column in df.columns:
+            df[column] = df[column].astype("Int64")
+
+    if "id" not in df.columns:
+        df.insert(0, "id", new_uuids(len(df)))
+    else:
+        no_id = df["id"].isna() | (df["id"] == "")
+        df.loc[no_id, "id"] = new_uuids(int(no_id.sum()))
+
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    for column, col_type in schema.items():
+        if col_type == "TIMESTAMP":
+            if column not in df.columns or column == "last_update_date":
+                df[column] = pd.Timestamp(now)
+            else:
+                df[column] = df[column].fillna(pd.Timestamp(now))
+
+    return df[[c for c in schema if c in df.columns]], rejected
+
+
+# -------------------------
+# Writing
+# -------------------------
+def import_file(
+    table: str,
+    source,
+    fmt: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mode: str = "insert",
+    on_batch: Optional[Callable[[BatchStats], None]] = None,
+) -> ImportResult:
+    """
+    Imports a CSV/Parquet file into ``table`` through the configured backend.
+    ``on_batch`` is called after every written batch with its throughput.
+    """
+    if table not in REQUIRED_COLUMNS:
+        raise BulkImportError(f"Unknown table: {table}")
+    if batch_size < 1:
+        raise BulkImportError("batch_size must be at least 1")
+    if mode not in ("insert", "upsert"):
+        raise BulkImportError(f"Unknown import mode: {mode}")
+
+    started = time.perf_counter()
+    total = rejected = batches = 0
+    backend = store.get_backend()
+    first_day = last_day = None
+    # Upserted orders go through apply_changes, whose rollup deltas also take out what a
+    # rewritten order counted on the day it had before; inserted orders bypass the
+    # deltas and the days they cover are rebuilt at the end.
+    upsert_orders = table == "orders" and mode == "upsert"
+    try:
+        for chunk in read_chunks(source, fmt, chunk_size):
+            rows, bad = prepare_chunk(table, chunk)
+            rejected += bad
+            if table == "orders" and not upsert_orders and len(rows):
+                days = pd.to_datetime(rows["order_date"]).dt.date
+                first_day = min(filter(None, (first_day, days.min())))
+                last_day = max(filter(None, (last_day, days.max())))
+            for start in range(0, len(rows), batch_size):
+                batch = rows.iloc[start:start + batch_size]
+                t0 = time.perf_counter()
+                if upsert_orders:
+                    backend.apply_changes(table, batch, [], [])
+                else:
+                    backend.write_batch(table, batch, mode)
+                elapsed = time.perf_counter() - t0
+                total += len(batch)
+                batches += 1
+                if on_batch is not None:
+                    on_batch(BatchStats(batches, len(batch), elapsed, len(batch) / elapsed if elapsed else 0.0, total, rejected))
+        if first_day is not None and store.ROLLUPS:
+            backend.rebuild_rollups(first_day, last_day + timedelta(days=1))
+    finally:
+        cache = store.get_cache()
+        if cache is not None:
+            cache.invalidate(table)
+        store.invalidate_search(table)
+    return ImportResult(table, total, rejected, batches, time.perf_counter() - started)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import customers, products or orders from CSV/Parquet.")
+    parser.add_argument("table", choices=sorted(REQUIRED_COLUMNS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per INSERT statement")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows read from the file at a time")
+    parser.add_argument("--mode", choices=["insert", "upsert"], default="insert")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="import into a local SQLite file instead of Databricks")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        store.use_backend("sqlite", sqlite_path=args.sqlite)
+    store.initialize_db()
+
+    def report(b: BatchStats):
+        print(f"batch {b.batch:>5}: {b.rows:>6} rows in {b.seconds * 1000:8.1f} ms "
+              f"({b.rows_per_sec:>10,.0f} rows/s)  total={b.total_rows:,} rejected={b.rejected_rows:,}")
+
+    result = import_file(args.table, args.path, args.format, args.batch_size, args.chunk_size, args.mode, report)
+    print(f"Imported {result.rows:,} {result.table} in {result.seconds:.2f}s "
+          f"({result.rows_per_sec:,.0f} rows/s, {result.batches} batches, {result.rejected_rows:,} rejected)")
+
+
+if __name__ == "__main__":
+    main()
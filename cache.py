@@ -0,0 +1,163 @@
+# cache.py
+"""
+Process-wide query-result cache for the store's read functions.
+
+Entries are tagged with the tables they were read from. The create_/update_/delete_
+functions invalidate their table, so a user sees their own writes on the very next
+rerun, while repeated reads within one rerun (and across reruns) are served from memory.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterable, Optional
+
+
+class ResultCache:
+    """
+    LRU + TTL cache keyed by arbitrary hashable keys, with per-table invalidation.
+
+    - entries expire ``ttl`` seconds after they were stored
+    - at most ``max_entries`` entries are kept; the least recently used is evicted first
+    - ``invalidate(table)`` drops every entry tagged with ``table``; a read that was
+      already in flight when the table changed is not stored, so it cannot
+      resurrect stale rows; ``invalidate()`` without tables bumps a global epoch that
+      every store checks, so it also covers tables never invalidated before
+    - concurrent misses on the same key share one load (single flight)
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value)
+        self._generations = {}  # table -> number of invalidations so far
+        self._epoch = 0  # number of invalidate() calls without tables
+        self._inflight = {}  # key -> (tables, Future) for reads currently running
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    def get_or_load(self, key: Hashable, tables: Iterable[str], loader: Callable[[], object]):
+        tables = tuple(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                # Same read already running in another thread: wait for it instead of querying twice.
+                self.coalesced += 1
+                pending = inflight[1]
+            else:
+                self.misses += 1
+                generations = self._snapshot(tables)
+                pending = Future()
+                self._inflight[key] = (tables, pending)
+                inflight = None
+
+        if inflight is not None:
+            return pending.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is pending:
+                    del self._inflight[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            if self._inflight.get(key, (None, None))[1] is pending:
+                del self._inflight[key]
+            if self._snapshot(tables) == generations:
+                self._entries[key] = (time.monotonic() + self.ttl, tables, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        pending.set_result(value)
+        return value
+
+    def invalidate(self, *tables: str):
+        """Drops cached results read from any of ``tables`` (all entries when called without arguments)."""
+        with self._lock:
+            self.invalidations += 1
+            if not tables:
+                self._epoch += 1
+                self._entries.clear()
+                self._inflight.clear()
+                return
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [k for k, (_, tagged, _) in self._entries.items() if set(tagged) & set(tables)]
+            for key in stale:
+                del self._entries[key]
+            # Later callers must not join a read that started before this write.
+            for key in [k for k, (tagged, _) in self._inflight.items() if set(tagged) & set(tables)]:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+            }
+
+    def _snapshot(self, tables):
+        return (self._epoch, *(self._generations.get(t, 0) for t in tables))
+
+
+def cached_query(
+    cache: Callable[[], Optional[ResultCache]],
+    *tables: str,
+    tables_from: Optional[Callable[..., Iterable[str]]] = None,
+):
+    """
+    Decorator for read functions: results are cached under (function name, args)
+    and tagged with ``tables``, or with ``tables_from(*args, **kwargs)`` when the
+    table depends on the arguments. ``cache`` is a callable so the instance can be
+    swapped or disabled (return None) at runtime.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            c = cache()
+            if c is None:
+                return fn(*args, **kwargs)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            tags = tables_from(*args, **kwargs) if tables_from is not None else tables
+            return c.get_or_load(key, tags, lambda: fn(*args, **kwargs))
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
+def invalidates(cache: Callable[[], Optional[ResultCache]], *tables: str):
+    """Decorator for write functions: invalidates ``tables`` after the write, even if it failed part-way."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                c = cache()
+                if c is not None:
+                    c.invalidate(*tables)
+        return wrapper
+    return decorator
@@ -0,0 +1,140 @@
+# checkout.py
+"""
+Order placement: a cart of several products becomes one orders row per line, all or
+nothing.
+
+``place_order()`` takes every line's quantity from products.stock, provided there is
+enough stock for the whole cart, and prices each line from the product row at that
+moment; a price the UI showed earlier is never trusted. How the stock is taken
+atomically depends on the backend (see StoreBackend.place_orders): a write transaction
+with a conditional UPDATE per line on SQLite and SQLAlchemy, one all-or-nothing MERGE
+per batch on the warehouse.
+
+Concurrent placements are batched: one worker thread hands every cart waiting at that
+moment to the backend in a single call, so under load many sessions share one
+transaction (one commit) or one MERGE instead of queuing for one each. A cart placed
+on an idle store goes alone and does not wait for company. STORE_ORDER_BATCH=0 places
+each cart in the caller's thread instead.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Tuple
+
+import store
+from backends import Cart, OrderLine, OutOfStock, PlacedOrder
+from cache import invalidates
+
+ORDER_BATCHING = os.getenv("STORE_ORDER_BATCH", "1") == "1"
+# Most carts per backend call; bounds the size of the warehouse MERGE.
+ORDER_BATCH_MAX = int(os.getenv("STORE_ORDER_BATCH_MAX", "64"))
+
+
+def make_cart(customer_id: str, lines: Iterable[Tuple[str, int]]) -> Cart:
+    """Validates (product_id, quantity) lines and merges repeated products into one line."""
+    if not customer_id:
+        raise ValueError("An order needs a customer.")
+    quantities = {}
+    for product_id, quantity in lines:
+        if not product_id:
+            raise ValueError("Every order line needs a product.")
+        if int(quantity) < 1:
+            raise ValueError("Quantities must be at least 1.")
+        quantities[product_id] = quantities.get(product_id, 0) + int(quantity)
+    if not quantities:
+        raise ValueError("The cart is empty.")
+    merged = tuple(OrderLine(pid, qty) for pid, qty in quantities.items())
+    return Cart(customer_id, merged, tuple(str(uuid.uuid4()) for _ in merged))
+
+
+class OrderBatcher:
+    """Places submitted carts from one worker thread, as many per backend call as are waiting."""
+
+    def __init__(self, max_batch: int = ORDER_BATCH_MAX):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.max_batch = max_batch
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"carts": 0, "batches": 0, "largest_batch": 0, "rejected": 0}
+
+    def submit(self, cart: Cart) -> Future:
+        """Queues ``cart``; the future resolves to a PlacedOrder or raises OutOfStock."""
+        future: Future = Future()
+        self._queue.put((cart, future, contextvars.copy_context()))
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="store-orders", daemon=True)
+                    self._worker.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._place(batch)
+
+    def _place(self, batch: List[tuple]):
+        carts = [cart for cart, _, _ in batch]
+        try:
+            # The batch's statements show up in the query trace of the first cart's rerun.
+            results = batch[0][2].run(store.get_backend().place_orders, carts)
+        except Exception as e:
+            if len(batch) > 1:
+                # Keep one failing cart from failing the others.
+                for item in batch:
+                    self._place([item])
+                return
+            batch[0][1].set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["carts"] += len(batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.stats["rejected"] += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_batcher: Optional[OrderBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> OrderBatcher:
+    """Process-wide batcher, created on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = OrderBatcher()
+    return _batcher
+
+
+@invalidates(store.get_cache, "orders", "products")
+def place_order(customer_id: str, lines: Iterable[Tuple[str, int]]) -> PlacedOrder:
+    """
+    Places a cart of (product_id, quantity) lines for ``customer_id``. Returns the new
+    order ids and each line's total; raises OutOfStock, with nothing written, when any
+    product lacks the stock.
+    """
+    cart = make_cart(customer_id, lines)
+    if ORDER_BATCHING:
+        placed = get_batcher().submit(cart).result()
+    else:
+        placed = store.get_backend().place_orders([cart])[0]
+        if isinstance(placed, Exception):
+            raise placed
+    store.invalidate_search("orders")  # the new orders show up in the order search
+    return placed
@@ -0,0 +1,197 @@
+# compact.py
+"""
+Compact, typed in-memory copies of whole tables.
+
+A table read as a DataFrame keeps every id, foreign key and (on SQLite) timestamp as a
+string: some 250 bytes per order row with pandas' Arrow-backed strings, 600 with
+object-dtype strings. ``CompactTable`` keeps each column in a fixed-width or
+dictionary-encoded numpy form chosen from its schema.py type:
+
+- ``id``: 16-byte UUID values (numpy "S16") when every id is a canonical lowercase UUID
+  (store-generated ids always are); dictionary-encoded like any string otherwise;
+- STRING (names, e-mails, foreign keys): int32 codes into the column's distinct values,
+  so a customer_id repeated on a million orders costs 4 bytes per row;
+- TIMESTAMP: int64 nanoseconds since the epoch (UTC), NaT as the int64 minimum;
+- DOUBLE: float64; INT: int64, or float64 when the column has NULLs.
+
+An order row takes about 64 bytes. ``to_frame()`` turns the table, or some columns of
+it, back into a DataFrame (string columns in pandas' default string dtype, timestamps
+as datetime64) for display; ``row()`` looks up one row by id without converting the
+rest.
+"""
+
+import importlib.util
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Arrow turns the decoded UUID bytes into a string column without a Python object per value.
+_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+_DASHES = [8, 13, 18, 23]
+_HEX_POSITIONS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+def encode_uuids(values: Sequence[str]) -> Optional[np.ndarray]:
+    """Canonical lowercase UUID strings as an "S16" array; None if any value is not one."""
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype="S16")
+    try:
+        joined = "".join(values).encode("ascii")
+    except (TypeError, UnicodeEncodeError):  # None / NaN / non-ASCII ids
+        return None
+    if len(joined) != 36 * n:
+        return None
+    chars = np.frombuffer(joined, dtype=np.uint8).reshape(n, 36)
+    if not (chars[:, _DASHES] == ord("-")).all():
+        return None
+    hex_chars = chars[:, _HEX_POSITIONS]
+    digit = (hex_chars >= ord("0")) & (hex_chars <= ord("9"))
+    letter = (hex_chars >= ord("a")) & (hex_chars <= ord("f"))
+    if not (digit | letter).all():
+        return None
+    nibbles = np.where(digit, hex_chars - ord("0"), hex_chars - ord("a") + 10).astype(np.uint8)
+    packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return np.ascontiguousarray(packed).view("S16").ravel()
+
+
+def decode_uuids(packed: np.ndarray) -> pd.Series:
+    """Inverse of ``encode_uuids``: a string Series of canonical UUIDs."""
+    n = len(packed)
+    raw = packed.view(np.uint8).reshape(n, 16)
+    chars = np.empty((n, 36), dtype=np.uint8)
+    chars[:, _DASHES] = ord("-")
+    hex_chars = np.empty((n, 32), dtype=np.uint8)
+    hex_chars[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    hex_chars[:, 1::2] = _HEX_DIGITS[raw & 15]
+    chars[:, _HEX_POSITIONS] = hex_chars
+    text = chars.view("S36").ravel()
+    if _ARROW:
+        import pyarrow as pa
+
+        return pd.Series(pd.array(pa.array(text, type=pa.binary(36)).cast(pa.string()), dtype="str"))
+    return pd.Series(text.astype("U36"), dtype="str")
+
+
+def _timestamps_ns(values: pd.Series) -> np.ndarray:
+    # SQLite returns timestamps as text, the warehouse as datetimes (possibly tz-aware).
+    ts = pd.to_datetime(values, format="ISO8601", utc=True).dt.tz_localize(None)
+    return ts.astype("datetime64[ns]").to_numpy().view(np.int64)
+
+
+class Column:
+    """One encoded column: ``kind`` is "uuid", "dict", "timestamp" or "number"."""
+
+    __slots__ = ("kind", "data", "dictionary")
+
+    def __init__(self, kind: str, data: np.ndarray, dictionary: Optional[pd.Index] = None):
+        self.kind = kind
+        self.data = data
+        self.dictionary = dictionary
+
+    @classmethod
+    def encode(cls, values: pd.Series, col_type: str, is_id: bool = False) -> "Column":
+        if is_id:
+            packed = encode_uuids(values.tolist())
+            if packed is not None:
+                return cls("uuid", packed)
+        if col_type == "TIMESTAMP":
+            return cls("timestamp", _timestamps_ns(values))
+        if col_type in ("DOUBLE", "INT"):
+            numbers = pd.to_numeric(values, errors="coerce")
+            if col_type == "INT" and not numbers.isna().any():
+                return cls("number", numbers.to_numpy(dtype=np.int64))
+            return cls("number", numbers.to_numpy(dtype=np.float64, na_value=np.nan))
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        dtype = np.int32 if len(uniques) < 2 ** 31 else np.int64
+        return cls("dict", codes.astype(dtype), pd.Index(uniques, dtype="str"))
+
+    def decode(self, positions: Optional[np.ndarray] = None) -> pd.Series:
+        data = self.data if positions is None else self.data[positions]
+        if self.kind == "uuid":
+            return decode_uuids(data)
+        if self.kind == "dict":
+            return pd.Series(self.dictionary.take(data, allow_fill=True, fill_value=np.nan), dtype="str")
+        if self.kind == "timestamp":
+            return pd.Series(data.view("datetime64[ns]"))
+        return pd.Series(data)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.data.nbytes
+        if self.dictionary is not None:
+            size += int(self.dictionary.memory_usage(deep=True))
+        return size
+
+
+class CompactTable:
+    """Every row of one table, column-encoded; rows keep the order they were loaded in."""
+
+    def __init__(self, columns: Dict[str, Column], length: int):
+        self.columns = columns
+        self._length = length
+        self._id_order: Optional[np.ndarray] = None  # positions sorted by encoded id, built on first row()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, schema: Dict[str, str]) -> "CompactTable":
+        """Encodes ``df`` (e.g. backend.list_rows()) with the column types of ``schema``."""
+        columns = {
+            name: Column.encode(df[name], schema.get(name, "STRING"), is_id=(name == "id"))
+            for name in df.columns
+        }
+        return cls(columns, len(df))
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def empty(self) -> bool:
+        return self._length == 0
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None, positions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """The table (or ``columns`` of the rows at ``positions``) as a DataFrame."""
+        names = list(columns) if columns is not None else list(self.columns)
+        if not self._length:
+            return pd.DataFrame(columns=names)
+        return pd.DataFrame({name: self.columns[name].decode(positions) for name in names})
+
+    def position(self, id_: str) -> Optional[int]:
+        """Row position of ``id_``, or None."""
+        ids = self.columns.get("id")
+        if ids is None or not self._length:
+            return None
+        if ids.kind == "dict":
+            code = ids.dictionary.get_indexer([id_])[0]
+            found = np.flatnonzero(ids.data == code) if code >= 0 else []
+            return int(found[0]) if len(found) else None
+        key = encode_uuids([id_])
+        if key is None:
+            return None
+        if self._id_order is None:
+            self._id_order = np.argsort(ids.data, kind="stable").astype(np.int32)
+        k = np.searchsorted(ids.data, key[0], sorter=self._id_order)
+        if k < self._length and ids.data[self._id_order[k]] == key[0]:
+            return int(self._id_order[k])
+        return None
+
+    def row(self, id_: str) -> Optional[dict]:
+        """One row as a dict of Python values, or None if ``id_`` is not in the table."""
+        pos = self.position(id_)
+        if pos is None:
+            return None
+        frame = self.to_frame(positions=np.array([pos]))
+        return {name: (None if pd.isna(value) else value) for name, value in frame.iloc[0].items()}
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held per column, dictionaries included."""
+        usage = {name: column.nbytes for name, column in self.columns.items()}
+        if self._id_order is not None:
+            usage["id"] += self._id_order.nbytes
+        return usage
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.memory_usage().values())
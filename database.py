@@ -1,6 +1,6 @@
 # database.py
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, ForeignKey
+    create_engine, Column, Integer, String, Float, DateTime, ForeignKey
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship, scoped_session
 import urllib.parse
@@ -9,28 +9,49 @@ import streamlit as st
 
 Base = declarative_base()
 
+# Same tables as store.py creates on Databricks (see schema.py): UUID string ids,
+# CREATED_DATE / LAST_UPDATE_DATE on every table.
 class Customer(Base):
     __tablename__ = "customers"
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String(36), primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    address = Column(String, nullable=True)
+    created_date = Column(DateTime)
+    last_update_date = Column(DateTime)
 
 class Product(Base):
     __tablename__ = "products"
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String(36), primary_key=True)
     name = Column(String, nullable=False)
+    description = Column(String, nullable=True)
     price = Column(Float, nullable=False, default=0.0)
+    stock = Column(Integer, nullable=True, default=0)
+    created_date = Column(DateTime)
+    last_update_date = Column(DateTime)
 
 class Order(Base):
     __tablename__ = "orders"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"))
-    product_id = Column(Integer, ForeignKey("products.id"))
+    id = Column(String(36), primary_key=True)
+    customer_id = Column(String(36), ForeignKey("customers.id"))
+    product_id = Column(String(36), ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False, default=1)
+    total_amount = Column(Float, nullable=True)
+    order_date = Column(DateTime)
+    created_date = Column(DateTime)
+    last_update_date = Column(DateTime)
 
     customer = relationship("Customer", lazy="joined")
     product = relationship("Product", lazy="joined")
 
+# One row per applied schema migration (see migrations.py).
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=True)
+    applied_date = Column(DateTime, primary_key=True)
+
 def get_engine():
     """
     Returns an SQLAlchemy engine.
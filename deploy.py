@@ -0,0 +1,198 @@
+# deploy.py
+"""
+Multi-replica deployment on one host: N Streamlit servers behind a local load balancer.
+
+Streamlit runs app.py in one process, so a single server is bound to one core and every
+cache and pool is per process. ``deploy.py`` starts ``--replicas`` servers of app.py on
+``--base-port``, ``--base-port + 1``, ... and listens on ``--port`` itself:
+
+- every replica gets the same STORE_SHARED_CACHE_PATH, so query results are loaded
+  once for all of them and a create_/update_/delete_ in any replica invalidates the
+  results in all of them (see shared_cache.py);
+- each replica gets its own write-behind journal (STORE_WRITE_BEHIND_PATH + ".<i>"):
+  a journal is drained by the process that owns it; likewise its own local read
+  replica (STORE_REPLICA_PATH + ".<i>", see replica.py) when one is configured;
+- the load balancer is a TCP proxy. A Streamlit session lives in one server (its
+  websocket and session state), so a browser is pinned to a replica by a cookie set on
+  its first response; new browsers go to the replica with the fewest open connections.
+
+    python deploy.py --replicas 4
+    STORE_BACKEND=sqlite python deploy.py --replicas 2 --port 8501 --base-port 8600
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COOKIE = "mini_store_replica"
+_COOKIE_RE = re.compile(rb"^cookie:.*\b" + COOKIE.encode() + rb"=(\d+)", re.IGNORECASE | re.MULTILINE)
+_HEAD_END = b"\r\n\r\n"
+_MAX_HEAD = 64 * 1024
+
+
+# -------------------------
+# Replicas
+# -------------------------
+def replica_env(index: int, shared_cache_path: str, cookie_secret: str) -> dict:
+    env = dict(os.environ)
+    env["STORE_SHARED_CACHE_PATH"] = shared_cache_path
+    env["STREAMLIT_SERVER_COOKIE_SECRET"] = cookie_secret
+    env["STORE_WRITE_BEHIND_PATH"] = f"{env.get('STORE_WRITE_BEHIND_PATH', 'write_behind.db')}.{index}"
+    if env.get("STORE_REPLICA_PATH"):
+        env["STORE_REPLICA_PATH"] = f"{env['STORE_REPLICA_PATH']}.{index}"
+    return env
+
+
+def start_replicas(count: int, base_port: int, shared_cache_path: str) -> List[subprocess.Popen]:
+    # One cookie secret for all replicas, so any of them accepts the others' cookies.
+    cookie_secret = secrets.token_hex(16)
+    replicas = []
+    for i in range(count):
+        replicas.append(subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", os.path.join(HERE, "app.py"),
+                "--server.port", str(base_port + i),
+                "--server.address", "127.0.0.1",
+                "--server.headless", "true",
+            ],
+            cwd=HERE,
+            env=replica_env(i, shared_cache_path, cookie_secret),
+        ))
+    return replicas
+
+
+def stop_replicas(replicas: List[subprocess.Popen], timeout: float = 10.0):
+    for proc in replicas:
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in replicas:
+        try:
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# -------------------------
+# Load balancer
+# -------------------------
+class LoadBalancer:
+    """Sticky TCP proxy in front of the replicas on ``ports``."""
+
+    def __init__(self, ports: List[int], host: str = "127.0.0.1"):
+        self.ports = ports
+        self.host = host
+        self.connections = [0] * len(ports)
+
+    def pick(self, head: bytes) -> Tuple[int, bool]:
+        """Replica for a request head, and whether the response must set the cookie."""
+        match = _COOKIE_RE.search(head)
+        if match and int(match.group(1)) < len(self.ports):
+            return int(match.group(1)), False
+        return min(range(len(self.ports)), key=self.connections.__getitem__), True
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        try:
+            head = await _read_head(client_reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+        index, set_cookie = self.pick(head)
+        self.connections[index] += 1
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.ports[index])
+        except OSError:
+            self.connections[index] -= 1
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await client_writer.drain()
+            client_writer.close()
+            return
+        try:
+            upstream_writer.write(head)
+            response = _pipe(upstream_reader, client_writer, f"{COOKIE}={index}" if set_cookie else None)
+            await asyncio.gather(_pipe(client_reader, upstream_writer), response)
+        except asyncio.CancelledError:
+            pass  # shutting down: open connections are closed below
+        finally:
+            self.connections[index] -= 1
+            for writer in (client_writer, upstream_writer):
+                writer.close()
+
+    async def serve(self, port: int, address: str):
+        """Proxies connections on ``address:port`` until SIGINT/SIGTERM."""
+        server = await asyncio.start_server(self.handle, address, port)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, server.close)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+
+async def _read_head(reader: asyncio.StreamReader) -> bytes:
+    head = await reader.readuntil(_HEAD_END)
+    if len(head) > _MAX_HEAD:
+        raise asyncio.LimitOverrunError("request head too large", len(head))
+    return head
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, cookie: Optional[str] = None):
+    """Copies ``reader`` to ``writer``; with ``cookie``, adds Set-Cookie to the first response head."""
+    try:
+        if cookie is not None:
+            head = await _read_head(reader)
+            line = f"Set-Cookie: {cookie}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+            writer.write(head[:-2] + line + b"\r\n")
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        if writer.can_write_eof():
+            try:
+                writer.write_eof()
+            except OSError:
+                pass
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several app replicas behind a local load balancer.")
+    parser.add_argument("--replicas", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=8501, help="port the load balancer listens on")
+    parser.add_argument("--address", default="127.0.0.1", help="address the load balancer listens on")
+    parser.add_argument("--base-port", type=int, default=8600, help="port of the first replica")
+    parser.add_argument("--shared-cache", help="shared cache file (default: a new temporary file)")
+    args = parser.parse_args(argv)
+    if args.replicas < 1:
+        parser.error("--replicas must be at least 1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_cache_path = args.shared_cache or os.path.join(tmp, "shared_cache.db")
+        replicas = start_replicas(args.replicas, args.base_port, shared_cache_path)
+        balancer = LoadBalancer([args.base_port + i for i in range(args.replicas)])
+        print(f"{args.replicas} replicas on ports {args.base_port}-{args.base_port + args.replicas - 1}, "
+              f"load balancer on http://{args.address}:{args.port}")
+        try:
+            asyncio.run(balancer.serve(args.port, args.address))
+        finally:
+            stop_replicas(replicas)
+
+
+if __name__ == "__main__":
+    main()
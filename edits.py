@@ -0,0 +1,103 @@
+# edits.py
+"""
+Cell-level diff of an edited grid against the rows it was loaded from.
+
+The app shows a page of rows in an editable grid. ``diff()`` compares the grid's
+result with the snapshot the grid was loaded with and returns the net change as one
+``GridEdits``: the rows with an edited cell (their new values for every column edited
+in any row) and the rows removed. store.commit_edits() sends it as one batched
+UPDATE/MERGE and one ``DELETE ... WHERE id IN (...)``, each row guarded by the
+last_update_date it had in the snapshot (optimistic concurrency): a row someone else
+changed or deleted since is left alone and reported back as a conflict.
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from schema import TABLE_SCHEMAS
+
+# Columns the grid lets you edit; id and the timestamps are maintained by the store.
+EDITABLE_COLUMNS = {
+    table: tuple(c for c in schema if c not in ("id", "created_date", "last_update_date"))
+    for table, schema in TABLE_SCHEMAS.items()
+}
+
+
+class GridEdits(NamedTuple):
+    table: str
+    # id, last_update_date as loaded, and the new values of the edited columns.
+    updates: pd.DataFrame
+    # id and last_update_date as loaded.
+    deletes: pd.DataFrame
+    cells: int  # cells changed across the updated rows
+    # id and every editable column of the updated rows, after the edit.
+    rows: pd.DataFrame
+
+    @property
+    def empty(self) -> bool:
+        return self.updates.empty and self.deletes.empty
+
+
+class EditResult(NamedTuple):
+    updated: int
+    deleted: int
+    # Ids not written because they were changed or deleted since the grid was loaded.
+    conflicts: List[str]
+
+
+def _comparable(values: pd.Series, col_type: str) -> pd.Series:
+    if col_type in ("INT", "DOUBLE"):
+        return pd.to_numeric(values, errors="coerce")
+    if col_type == "TIMESTAMP":
+        return pd.to_datetime(values, format="ISO8601", errors="coerce", utc=True).dt.tz_localize(None)
+    return values.astype(object).where(values.notna(), None)
+
+
+def _invalid(values: pd.Series, typed: pd.Series, col_type: str) -> np.ndarray:
+    """Cells that have a value which does not parse as ``col_type``."""
+    if col_type == "STRING":
+        return np.zeros(len(values), dtype=bool)
+    bad = typed.isna() & values.notna()
+    if col_type == "INT":
+        bad |= typed.notna() & (typed % 1 != 0)
+    return bad.to_numpy()
+
+
+def diff(table: str, before: pd.DataFrame, after: pd.DataFrame) -> GridEdits:
+    """
+    Edits that turn ``before`` (the loaded rows, with id and last_update_date) into
+    ``after`` (the grid's rows). Rows are matched by id. Rows missing from ``after``
+    are deletions; rows the grid added are rejected, as are values that do not fit the
+    column type.
+    """
+    editable = [c for c in EDITABLE_COLUMNS[table] if c in before.columns and c in after.columns]
+    schema = TABLE_SCHEMAS[table]
+    old = before.set_index("id", drop=False)
+    new = after.set_index("id", drop=False)
+    if new.index.has_duplicates or not new.index.isin(old.index).all():
+        raise ValueError("New rows and id changes are not supported in the grid; use the create forms.")
+
+    deletes = old.loc[~old.index.isin(new.index), ["id", "last_update_date"]].reset_index(drop=True)
+    old = old.loc[new.index]
+
+    changed = pd.DataFrame(index=new.index)
+    typed = {}
+    for column in editable:
+        a, b = _comparable(old[column], schema[column]), _comparable(new[column], schema[column])
+        bad = _invalid(new[column], b, schema[column])
+        if bad.any():
+            raise ValueError(f"Invalid {column} for id(s): {', '.join(new.index[bad][:5])}")
+        same = (a.isna() & b.isna()) | (a == b).fillna(False).astype(bool)
+        changed[column] = ~same.to_numpy()
+        typed[column] = b
+    rows = changed.any(axis=1).to_numpy() if editable else np.zeros(len(new), dtype=bool)
+    columns = [c for c in editable if changed[c].to_numpy()[rows].any()]
+
+    updates = pd.DataFrame({"id": new.index[rows], "last_update_date": old["last_update_date"].to_numpy()[rows]})
+    for column in columns:
+        values = typed[column].to_numpy()[rows]
+        updates[column] = pd.array(values, dtype="Int64") if schema[column] == "INT" else values
+    edited = new.loc[rows, ["id", *editable]].reset_index(drop=True)
+    return GridEdits(table, updates, deletes, int(changed.to_numpy().sum()), edited)
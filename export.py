@@ -0,0 +1,245 @@
+# export.py
+"""
+Streaming export of customers, products and orders to CSV or Parquet.
+
+Rows are read with store.iter_table() (a streaming cursor; Arrow batches on the
+warehouse) and each batch is written out before the next one is fetched, so memory
+stays at about one batch whatever the size of the table. ``filters`` are pushed down
+to the query like list_page()'s; ``order_range()`` builds the filters for orders
+placed in a date range. Progress and per-batch throughput are reported through a
+callback.
+
+Every batch is written with the column types of schema.py, so the file is the same
+whichever backend it came from (SQLite returns timestamps as text, the warehouse as
+datetimes) and one Parquet schema fits every batch.
+
+CLI:
+    python export.py customers customers.csv
+    python export.py orders orders.parquet --since 2024-01-01 --until 2024-02-01
+    python export.py products products.csv --sqlite store.db   # local stand-in backend
+"""
+
+import argparse
+import time
+from datetime import date, datetime, time as dt_time
+from typing import BinaryIO, Callable, NamedTuple, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+import store
+from schema import TABLE_SCHEMAS
+
+FORMATS = ("csv", "parquet")
+MIME_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+DEFAULT_BATCH_ROWS = store.STREAM_BATCH_ROWS
+
+
+class ExportError(Exception):
+    pass
+
+
+class BatchStats(NamedTuple):
+    batch: int
+    rows: int
+    seconds: float
+    rows_per_sec: float
+    total_rows: int
+
+
+class ExportResult(NamedTuple):
+    table: str
+    rows: int
+    batches: int
+    nbytes: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def order_range(since: Optional[Union[date, datetime]] = None, until: Optional[Union[date, datetime]] = None) -> Tuple[tuple, ...]:
+    """Filters for orders with ``since <= order_date < until``; a date means its midnight."""
+    def as_datetime(value):
+        return value if isinstance(value, datetime) else datetime.combine(value, dt_time.min)
+
+    filters = []
+    if since is not None:
+        filters.append(("order_date", ">=", as_datetime(since)))
+    if until is not None:
+        filters.append(("order_date", "<", as_datetime(until)))
+    return tuple(filters)
+
+
+def file_name(table: str, fmt: str) -> str:
+    return f"{table}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+
+
+# -------------------------
+# Typing
+# -------------------------
+def _typed(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """One batch with the schema's columns, in schema order, as schema types."""
+    schema = TABLE_SCHEMAS[table]
+    out = {}
+    for column, col_type in schema.items():
+        values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if col_type == "TIMESTAMP":
+            values = pd.to_datetime(values, format="ISO8601", utc=True).dt.tz_localize(None).astype("datetime64[us]")
+        elif col_type == "INT":
+            values = pd.to_numeric(values, errors="coerce").astype("Int64")
+        elif col_type == "DOUBLE":
+            values = pd.to_numeric(values, errors="coerce").astype("float64")
+        else:
+            values = values.astype("str").where(values.notna(), None)
+        out[column] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+def _arrow_schema(table: str):
+    import pyarrow as pa
+
+    types = {"STRING": pa.string(), "INT": pa.int64(), "DOUBLE": pa.float64(), "TIMESTAMP": pa.timestamp("us")}
+    return pa.schema([(column, types[col_type]) for column, col_type in TABLE_SCHEMAS[table].items()])
+
+
+# -------------------------
+# Writers
+# -------------------------
+class _CSVWriter:
+    def __init__(self, table: str, out: BinaryIO):
+        self._out = out
+        self._columns = list(TABLE_SCHEMAS[table])
+        self._header = True
+
+    def write(self, df: pd.DataFrame):
+        self._out.write(df.to_csv(index=False, header=self._header, date_format="%Y-%m-%d %H:%M:%S.%f").encode("utf-8"))
+        self._header = False
+
+    def close(self):
+        if self._header:  # no rows: the header alone
+            self._out.write((",".join(self._columns) + "\n").encode("utf-8"))
+
+
+class _ParquetWriter:
+    def __init__(self, table: str, out: BinaryIO):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ExportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self._schema = _arrow_schema(table)
+        # One row group per batch: the writer keeps no more than the batch being written.
+        self._writer = pq.ParquetWriter(out, self._schema, compression="snappy")
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {"csv": _CSVWriter, "parquet": _ParquetWriter}
+
+
+class _Counter:
+    """Binary file wrapper counting the bytes written through it."""
+
+    def __init__(self, out: BinaryIO):
+        self._out = out
+        self.nbytes = 0
+
+    def write(self, data) -> int:
+        self.nbytes += len(data)
+        return self._out.write(data)
+
+    def flush(self):
+        self._out.flush()
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self.nbytes
+
+
+# -------------------------
+# Export
+# -------------------------
+def export_table(
+    table: str,
+    out: Union[str, BinaryIO],
+    fmt: str = "csv",
+    filters: Sequence[Tuple[str, str, object]] = (),
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    on_batch: Optional[Callable[[BatchStats], None]] = None,
+) -> ExportResult:
+    """
+    Streams ``table`` (rows matching ``filters``) into ``out``, a path or a binary file
+    object, as CSV or Parquet. ``on_batch`` is called after every written batch with
+    its throughput (fetch, typing and writing included).
+    """
+    if table not in TABLE_SCHEMAS:
+        raise ExportError(f"Unknown table: {table}")
+    if fmt not in _WRITERS:
+        raise ExportError(f"Unsupported format: {fmt}")
+    if batch_rows < 1:
+        raise ExportError("batch_rows must be at least 1")
+
+    if isinstance(out, str):
+        with open(out, "wb") as f:
+            return export_table(table, f, fmt, filters, batch_rows, on_batch)
+
+    started = time.perf_counter()
+    total = batches = 0
+    counter = _Counter(out)
+    writer = _WRITERS[fmt](table, counter)
+    t0 = time.perf_counter()
+    for df in store.iter_table(table, batch_rows, filters):
+        writer.write(_typed(table, df))
+        elapsed = time.perf_counter() - t0
+        total += len(df)
+        batches += 1
+        if on_batch is not None:
+            on_batch(BatchStats(batches, len(df), elapsed, len(df) / elapsed if elapsed else 0.0, total))
+        t0 = time.perf_counter()
+    writer.close()
+    return ExportResult(table, total, batches, counter.nbytes, time.perf_counter() - started)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export customers, products or orders to CSV/Parquet.")
+    parser.add_argument("table", choices=sorted(TABLE_SCHEMAS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="defaults to the file extension")
+    parser.add_argument("--since", type=date.fromisoformat, help="orders only: first order day (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="orders only: day after the last order day")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS, help="rows fetched and written at a time")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="export from a local SQLite file instead of Databricks")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.path.lower().endswith((".parquet", ".pq")) else "csv")
+    if (args.since or args.until) and args.table != "orders":
+        parser.error("--since/--until apply to orders only")
+
+    if args.sqlite:
+        store.use_backend("sqlite", sqlite_path=args.sqlite)
+    store.initialize_db()
+
+    def report(b: BatchStats):
+        print(f"batch {b.batch:>5}: {b.rows:>7} rows in {b.seconds * 1000:8.1f} ms "
+              f"({b.rows_per_sec:>10,.0f} rows/s)  total={b.total_rows:,}")
+
+    result = export_table(args.table, args.path, fmt, order_range(args.since, args.until), args.batch_rows, report)
+    print(f"Exported {result.rows:,} {result.table} to {args.path} ({result.nbytes / 1e6:,.1f} MB) in "
+          f"{result.seconds:.2f}s ({result.rows_per_sec:,.0f} rows/s, {result.batches} batches)")
+
+
+if __name__ == "__main__":
+    main()
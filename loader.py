@@ -0,0 +1,67 @@
+# loader.py
+"""
+Concurrent data loading for the app's tabs.
+
+Streamlit runs every tab's block on each rerun, one after another, so the tabs'
+independent list queries would otherwise be serial warehouse round-trips. The
+app submits all of a rerun's reads here up front and each tab picks up its own
+results, so page latency is bounded by the slowest query instead of their sum.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Matches the default connection pool size: more workers would only queue on the pool.
+LOADER_MAX_WORKERS = int(os.getenv("STORE_LOADER_MAX_WORKERS", os.getenv("STORE_POOL_MAX_SIZE", "4")))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide worker pool, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LOADER_MAX_WORKERS, thread_name_prefix="store-loader")
+    return _executor
+
+
+class Loads:
+    """
+    Handle for one rerun's reads. ``get(name)`` blocks until that read finished and
+    re-raises its exception, so each tab reports its own failures.
+
+    ``version`` (e.g. the result cache's invalidation counter) is sampled at submit
+    time; if a write later in the same rerun changed it, ``get`` re-runs the job so
+    the tab shows the user's own write. Jobs over untouched tables are cache hits.
+
+    Jobs run in a copy of the caller's context, so per-rerun state kept in context
+    variables (the query trace, see tracing.py) follows them into the workers.
+    """
+
+    def __init__(self, jobs: Dict[str, Callable[[], object]], version: Optional[Callable[[], object]] = None):
+        self._jobs = jobs
+        self._version = version
+        self._submitted_version = version() if version is not None else None
+        executor = get_executor()
+        self._futures: Dict[str, Future] = {
+            name: executor.submit(contextvars.copy_context().run, fn) for name, fn in jobs.items()
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._futures
+
+    def get(self, name: str):
+        if self._version is not None and self._version() != self._submitted_version:
+            return self._jobs[name]()
+        return self._futures[name].result()
+
+
+def load_concurrently(jobs: Iterable[Tuple[str, Callable[[], object]]], version: Optional[Callable[[], object]] = None) -> Loads:
+    """Starts every ``(name, fn)`` job on the worker pool and returns immediately."""
+    return Loads(dict(jobs), version)
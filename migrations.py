@@ -0,0 +1,87 @@
+# migrations.py
+"""
+Schema version and migrations.
+
+The store records which migrations it has applied in its ``schema_version`` table
+(schema.META_SCHEMAS, one row per migration). ``bootstrap()`` runs once per server
+process, from store.initialize_db():
+
+- store at SCHEMA_VERSION: one SELECT, nothing else;
+- older store (or a new one): creates missing tables at the current schema
+  (CREATE TABLE IF NOT EXISTS), then applies each newer migration in order and records
+  it;
+- newer store (a replica already runs newer code): raises SchemaTooNew instead of
+  writing with an outdated schema.
+
+A store created before versioning has no rows and counts as version 1.
+
+Changing the schema: edit schema.py (and database.py's models), so new stores are
+created with the change, and append a migration for existing ones, e.g.
+
+    Migration(2, "customers.loyalty_tier", add_column("customers", "loyalty_tier", "STRING")),
+
+Migrations must be safe to run again: a new store already has the column, and two
+replicas starting together may both apply the same migration. ``add_column`` skips a
+column that exists.
+"""
+
+from typing import Callable, List, NamedTuple, Optional
+
+from schema import TABLE_SCHEMAS
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[object], None]  # called with the StoreBackend
+
+
+class SchemaTooNew(RuntimeError):
+    def __init__(self, stored: int, supported: int):
+        super().__init__(
+            f"The store is at schema version {stored}, newer than this code supports ({supported}). "
+            "Deploy the newer version of the app."
+        )
+        self.stored = stored
+        self.supported = supported
+
+
+def add_column(table: str, column: str, col_type: str) -> Callable[[object], None]:
+    """Migration step adding a nullable ``column`` (a schema.py type) unless it exists."""
+    if table not in TABLE_SCHEMAS:
+        raise ValueError(f"Unknown table: {table}")
+
+    def apply(backend):
+        backend.add_column(table, column, col_type)
+    return apply
+
+
+def _baseline(backend):
+    """Version 1: the tables as they were before versioning; initialize() creates them."""
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "customers, products, orders and daily rollups", _baseline),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def pending(version: Optional[int]) -> List[Migration]:
+    """Migrations newer than ``version`` (None: a new or pre-versioning store), in order."""
+    current = version if version is not None else 0
+    return [m for m in MIGRATIONS if m.version > current]
+
+
+def bootstrap(backend) -> List[Migration]:
+    """Brings the store to SCHEMA_VERSION; returns the migrations applied (none when it was current)."""
+    version = backend.schema_version()
+    if version == SCHEMA_VERSION:
+        return []
+    if version is not None and version > SCHEMA_VERSION:
+        raise SchemaTooNew(version, SCHEMA_VERSION)
+    backend.initialize()
+    todo = pending(version)
+    for migration in todo:
+        migration.apply(backend)
+        backend.record_migration(migration.version, migration.description)
+    return todo
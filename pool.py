@@ -0,0 +1,217 @@
+# pool.py
+"""
+Small, thread-safe connection pool shared by the CRUD helpers.
+
+Opening a Databricks SQL session costs a TLS handshake plus a session open
+round-trip, so the store keeps a bounded set of connections alive and hands
+them out per call instead of connecting for every statement.
+
+The pool only needs a zero-argument ``connect`` callable, so the same code runs
+against Databricks (``store.get_connection``) or a local SQLite file
+(``sqlite_connect``) for offline benchmarking.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections.
+
+    - at most ``max_size`` connections are open at once; callers wait up to
+      ``timeout`` seconds for one to be returned
+    - connections idle for more than ``max_idle`` seconds are closed on the next
+      checkout (warehouse sessions expire server-side anyway)
+    - connections idle for more than ``ping_after`` seconds are health-checked with
+      ``SELECT 1`` before being handed out; a failed check reconnects
+    - a connection whose caller raised is discarded, so the next checkout
+      opens a fresh session
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        max_size: int = 4,
+        timeout: float = 30.0,
+        max_idle: float = 600.0,
+        ping_after: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "evicted": 0, "failed_checks": 0, "discarded": 0}
+
+    # -- checkout / checkin
+    def acquire(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    pooled = self._idle.pop()  # LIFO keeps the warmest sessions in use
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No connection available after {self.timeout:.1f}s (max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+        if pooled is None:
+            return self._new_connection()
+
+        if time.monotonic() - pooled.last_used > self.ping_after and not self._is_healthy(pooled.raw):
+            self.stats["failed_checks"] += 1
+            self._close_quietly(pooled.raw)
+            return self._new_connection()
+
+        self.stats["reused"] += 1
+        return pooled
+
+    def release(self, pooled: _PooledConnection, discard: bool = False):
+        if discard or self._closed:
+            self.stats["discarded"] += 1
+            self._close_quietly(pooled.raw)
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a raw connection for the duration of a ``with`` block."""
+        pooled = self.acquire()
+        try:
+            yield pooled.raw
+        except BaseException:
+            self.release(pooled, discard=True)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        """Close every idle connection. Connections currently checked out are closed on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled.raw)
+
+    @property
+    def size(self) -> int:
+        return self._open
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    # -- internals
+    def _new_connection(self) -> _PooledConnection:
+        try:
+            raw = self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self.stats["created"] += 1
+        return _PooledConnection(raw)
+
+    def _evict_idle(self):
+        # Called with the lock held. Oldest idle connections sit at the left end.
+        now = time.monotonic()
+        while self._idle and now - self._idle[0].last_used > self.max_idle:
+            pooled = self._idle.popleft()
+            self._open -= 1
+            self.stats["evicted"] += 1
+            self._close_quietly(pooled.raw)
+
+    @staticmethod
+    def _is_healthy(raw) -> bool:
+        if getattr(raw, "open", True) is False:
+            return False
+        try:
+            cur = raw.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchall()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+# -------------------------
+# Local stand-in backend
+# -------------------------
+class _SQLiteCursor(sqlite3.Cursor):
+    # The Databricks cursor is a context manager; make the SQLite one behave the same.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _SQLiteConnection(sqlite3.Connection):
+    def cursor(self, factory=_SQLiteCursor):
+        return super().cursor(factory)
+
+
+def sqlite_connect(path: str = "store.db", connect_delay: float = 0.0) -> Callable[[], sqlite3.Connection]:
+    """
+    Connection factory for a local SQLite file (the same ``store.db`` database.py
+    falls back to). ``connect_delay`` simulates the warehouse session-open cost.
+    """
+    def connect():
+        if connect_delay:
+            time.sleep(connect_delay)
+        return sqlite3.connect(path, factory=_SQLiteConnection, isolation_level=None, check_same_thread=False)
+    return connect
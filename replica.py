@@ -0,0 +1,440 @@
+# replica.py
+"""
+Local read replica of customers, products and orders (STORE_REPLICA_PATH).
+
+Every read otherwise goes to the warehouse, round trip and warehouse uptime included,
+however small. With STORE_REPLICA_PATH set, store.py wraps its backend in a
+``ReplicaBackend``:
+
+- writes go to the primary (the warehouse) as before;
+- reads (lists, pages, search, exports, analytics) are served from a local SQLite file
+  (``SQLiteReplica``, the SQLAlchemy backend with the joins and aggregates pushed down)
+  when the replica is fresh enough for the tables they read; otherwise they go to the
+  primary (fallback);
+- a background thread copies changes from the primary into the file every
+  STORE_REPLICA_REFRESH_SECONDS (0: only when needed, so an idle app sends the
+  warehouse nothing), and right after every write.
+
+A table is fresh when its last refresh started less than STORE_REPLICA_MAX_LAG_SECONDS
+ago (the staleness bound) and after the last write to it seen by this process:
+its own writes, and with the shared cache (shared_cache.py) the other replicas'
+too. So a user always reads their own writes, and nobody reads data older than the
+bound.
+
+Refreshes are incremental like sync.py's snapshots: rows with a last_update_date
+past the newest copied (minus STORE_SYNC_OVERLAP_SECONDS) are upserted by id; deletes
+are found by comparing row counts, and by an id reconciliation every
+STORE_SYNC_RECONCILE_SECONDS. The file outlives the process: a restart resumes from
+the newest row in it instead of copying everything again.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+import migrations
+from backends import SQLAlchemyBackend, StoreBackend
+from schema import TABLE_SCHEMAS
+from sync import SYNC_OVERLAP_SECONDS, SYNC_RECONCILE_SECONDS
+
+REPLICA_PATH = os.getenv("STORE_REPLICA_PATH")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("STORE_REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_REFRESH_SECONDS = float(os.getenv("STORE_REPLICA_REFRESH_SECONDS", "10"))
+# Rows copied (and ids deleted) per statement on the replica; SQLite caps bound parameters.
+REPLICA_BATCH_ROWS = int(os.getenv("STORE_REPLICA_BATCH_ROWS", "10000"))
+
+TABLES = tuple(TABLE_SCHEMAS)
+
+
+class SQLiteReplica(SQLAlchemyBackend):
+    """
+    The SQLAlchemy backend on the replica's SQLite file, with the joined and aggregated
+    reads pushed down as single queries (the same ones as statements.py) instead of the
+    ORM and pandas defaults.
+    """
+
+    name = "sqlite replica"
+
+    def list_orders_detailed(self):
+        from sqlalchemy import select
+
+        o, c, p = self._tables["orders"], self._tables["customers"], self._tables["products"]
+        return self._frame(
+            select(o, c.c.name.label("customer_name"), p.c.name.label("product_name"), p.c.price.label("product_price"))
+            .select_from(o.outerjoin(c, c.c.id == o.c.customer_id).outerjoin(p, p.c.id == o.c.product_id))
+            .order_by(o.c.created_date.desc())
+        )
+
+    def revenue_by_period(self, grain, since):
+        from sqlalchemy import func, select
+
+        o = self._tables["orders"]
+        period = {
+            "day": func.date(o.c.order_date),
+            "week": func.date(o.c.order_date, "weekday 0", "-6 days"),  # the Monday of the week
+            "month": func.date(o.c.order_date, "start of month"),
+        }[grain].label("period")
+        return self._frame(
+            select(period, func.count().label("orders"), func.sum(o.c.total_amount).label("revenue"),
+                   func.avg(o.c.total_amount).label("avg_order_value"))
+            .where(o.c.order_date >= since).group_by(period).order_by(period)
+        )
+
+    def sales_summary(self, since):
+        from sqlalchemy import distinct, func, select
+
+        o = self._tables["orders"]
+        return self._frame(
+            select(func.count().label("orders"), func.coalesce(func.sum(o.c.total_amount), 0.0).label("revenue"),
+                   func.avg(o.c.total_amount).label("avg_order_value"),
+                   func.count(distinct(o.c.customer_id)).label("customers"))
+            .where(o.c.order_date >= since)
+        ).to_dict("records")[0]
+
+    def _top(self, key: str, names, name_columns, since, top_n, *aggregates):
+        from sqlalchemy import func, select
+
+        o = self._tables["orders"]
+        revenue = func.sum(o.c.total_amount).label("revenue")
+        top = (select(o.c[key], *aggregates, func.count().label("orders"), revenue)
+               .where(o.c.order_date >= since).group_by(o.c[key]).order_by(revenue.desc()).limit(int(top_n))
+               .subquery())
+        aggregated = [top.c[a.name] for a in aggregates]
+        return self._frame(
+            select(top.c[key], *name_columns(names), *aggregated, top.c.orders, top.c.revenue)
+            .select_from(top.outerjoin(names, names.c.id == top.c[key]))
+            .order_by(top.c.revenue.desc())
+        )
+
+    def top_products(self, since, top_n):
+        from sqlalchemy import func
+
+        o = self._tables["orders"]
+        return self._top("product_id", self._tables["products"], lambda p: [p.c.name.label("product_name")],
+                         since, top_n, func.sum(o.c.quantity).label("units"))
+
+    def top_customers(self, since, top_n):
+        return self._top("customer_id", self._tables["customers"],
+                         lambda c: [c.c.name.label("customer_name"), c.c.email.label("customer_email")],
+                         since, top_n)
+
+
+def sqlite_replica(path: str) -> SQLiteReplica:
+    """Replica backend on the SQLite file at ``path``, in WAL mode so reads do not wait for refreshes."""
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _wal(dbapi_conn, _):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    return SQLiteReplica(engine)
+
+
+def _typed(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """The schema's columns of ``df``, timestamps as datetimes (SQLite returns them as text)."""
+    out = {}
+    for column, col_type in TABLE_SCHEMAS[table].items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if col_type == "TIMESTAMP":
+            values = pd.to_datetime(values, format="ISO8601", utc=True).dt.tz_localize(None)
+        out[column] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+class ReplicaBackend(StoreBackend):
+    """``primary`` for writes, ``local`` (a copy of the tables) for reads while it is fresh."""
+
+    name = "replica"
+
+    def __init__(
+        self,
+        primary: StoreBackend,
+        local: StoreBackend,
+        max_lag: float = REPLICA_MAX_LAG_SECONDS,
+        refresh_every: float = REPLICA_REFRESH_SECONDS,
+        overlap: float = SYNC_OVERLAP_SECONDS,
+        reconcile_every: float = SYNC_RECONCILE_SECONDS,
+        batch_rows: int = REPLICA_BATCH_ROWS,
+    ):
+        self.primary = primary
+        self.local = local
+        self.max_lag = max_lag
+        self.refresh_every = refresh_every
+        self.batch_rows = batch_rows
+        self._overlap = timedelta(seconds=overlap)
+        self._reconcile_every = reconcile_every
+        self._lock = threading.Lock()  # guards _synced / _written
+        self._synced: Dict[str, float] = {}  # table -> monotonic time its last refresh started
+        self._written: Dict[str, float] = {}  # table -> monotonic time of its last write
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._high_water: Dict[str, Optional[datetime]] = {}
+        self._reconciled_at: Dict[str, float] = {}
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"local_reads": 0, "fallbacks": 0, "refreshes": 0, "rows_copied": 0, "rows_deleted": 0,
+                      "reconciles": 0, "failures": 0}
+
+    # -- freshness
+    def lag(self, table: str) -> Optional[float]:
+        """Seconds since the last refresh of ``table`` that includes every write seen; None when there is none."""
+        with self._lock:
+            synced = self._synced.get(table)
+            if synced is None or self._written.get(table, float("-inf")) >= synced:
+                return None
+            return time.monotonic() - synced
+
+    def written(self, *tables: str):
+        """Marks ``tables`` (all when called without) changed on the primary: read there until the next refresh."""
+        now = time.monotonic()
+        with self._lock:
+            for table in tables or TABLES:
+                self._written[table] = now
+        self._wake.set()
+
+    def _reader(self, *tables: str) -> StoreBackend:
+        lags = [self.lag(t) for t in tables]
+        fresh = all(lag is not None and lag <= self.max_lag for lag in lags)
+        self.stats["local_reads" if fresh else "fallbacks"] += 1
+        if not fresh:
+            self._wake.set()
+        return self.local if fresh else self.primary
+
+    def replica_stats(self) -> dict:
+        return {**self.stats, "lag": {t: self.lag(t) for t in TABLES}, "last_error": self.last_error}
+
+    # -- refresh thread
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="store-replica", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._stopping = False
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            self.refresh()
+            self._wake.wait(self.refresh_every if self.refresh_every > 0 else None)
+
+    def refresh(self, *tables: str):
+        """Copies the changes of ``tables`` (all by default) from the primary; a failed table stays behind."""
+        with self._refresh_lock:
+            for table in tables or TABLES:
+                started = time.monotonic()
+                try:
+                    self._refresh_table(table)
+                except Exception as e:  # reads fall back to the primary until a refresh succeeds
+                    self.stats["failures"] += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    continue
+                with self._lock:
+                    self._synced[table] = started
+                self.stats["refreshes"] += 1
+
+    def _refresh_table(self, table: str):
+        first = table not in self._high_water
+        if first:  # resume from what an earlier process copied
+            self._high_water[table] = self.local.high_water(table)
+        high_water = self._high_water[table]
+        if high_water is None:
+            for batch in self.primary.iter_batches(table, self.batch_rows):
+                self._copy(table, batch, "upsert")
+            self._reconciled_at[table] = time.monotonic()
+            return
+        self._copy(table, self.primary.changed_since(table, high_water - self._overlap), "upsert")
+        overdue = time.monotonic() - self._reconciled_at.get(table, 0.0) >= self._reconcile_every
+        if first or overdue or self.primary.count_rows(table) != self.local.count_rows(table):
+            self._reconcile(table)
+
+    def _copy(self, table: str, rows: pd.DataFrame, mode: str):
+        if rows.empty:
+            return
+        rows = _typed(table, rows)
+        for start in range(0, len(rows), self.batch_rows):
+            self.local.write_batch(table, rows.iloc[start:start + self.batch_rows], mode)
+        newest = rows["last_update_date"].max()
+        current = self._high_water.get(table)
+        if pd.notna(newest) and (current is None or newest > current):
+            self._high_water[table] = newest.to_pydatetime()
+        self.stats["rows_copied"] += len(rows)
+
+    def _reconcile(self, table: str):
+        self.stats["reconciles"] += 1
+        self._reconciled_at[table] = time.monotonic()
+        live = pd.Index(self.primary.row_ids(table))
+        copied = pd.Index(self.local.row_ids(table))
+        gone = copied.difference(live)
+        for start in range(0, len(gone), self.batch_rows):
+            self.local.delete_batch(table, gone[start:start + self.batch_rows].tolist())
+        self.stats["rows_deleted"] += len(gone)
+        if len(live.difference(copied)):  # rows never copied, e.g. an interrupted first copy
+            self._copy(table, self.primary.changed_since(table, None), "upsert")
+
+    # -- primitives: schema and writes on the primary
+    def initialize(self):
+        self.primary.initialize()
+
+    def startup(self):
+        self.primary.startup()
+        migrations.bootstrap(self.local)
+        self.start()
+
+    def schema_version(self):
+        return self.primary.schema_version()
+
+    def record_migration(self, version, description):
+        self.primary.record_migration(version, description)
+
+    def add_column(self, table, column, col_type):
+        return self.primary.add_column(table, column, col_type)
+
+    def insert(self, table, row):
+        self.primary.insert(table, row)
+        self.written(table)
+
+    def update(self, table, id_, values):
+        self.primary.update(table, id_, values)
+        self.written(table)
+
+    def delete(self, table, id_):
+        self.primary.delete(table, id_)
+        self.written(table)
+
+    def write_batch(self, table, rows, mode="insert"):
+        self.primary.write_batch(table, rows, mode)
+        self.written(table)
+
+    def delete_batch(self, table, ids):
+        self.primary.delete_batch(table, ids)
+        self.written(table)
+
+    def apply_changes(self, table, upserts, updates, deletes):
+        self.primary.apply_changes(table, upserts, updates, deletes)
+        self.written(table)
+
+    def apply_edits(self, table, updates, deletes, stamp):
+        try:
+            return self.primary.apply_edits(table, updates, deletes, stamp)
+        finally:
+            self.written(table)
+
+    def close(self):
+        self.stop()
+        self.primary.close()
+        self.local.close()
+
+    # -- reads: the replica while fresh
+    def list_rows(self, table):
+        return self._reader(table).list_rows(table)
+
+    def changed_since(self, table, since):
+        return self._reader(table).changed_since(table, since)
+
+    def row_ids(self, table):
+        return self._reader(table).row_ids(table)
+
+    def count_rows(self, table):
+        return self._reader(table).count_rows(table)
+
+    def high_water(self, table):
+        return self._reader(table).high_water(table)
+
+    def iter_batches(self, table, batch_rows, filters=()):
+        return self._reader(table).iter_batches(table, batch_rows, filters)
+
+    def page(self, table, limit, after, filters, sort_by, descending):
+        return self._reader(table).page(table, limit, after, filters, sort_by, descending)
+
+    # -- entity operations
+    def create_customer(self, cid, name, email, phone, address):
+        self.primary.create_customer(cid, name, email, phone, address)
+        self.written("customers")
+
+    def list_customers(self):
+        return self._reader("customers").list_customers()
+
+    def update_customer(self, cid, name, email, phone, address):
+        self.primary.update_customer(cid, name, email, phone, address)
+        self.written("customers")
+
+    def delete_customer(self, cid):
+        self.primary.delete_customer(cid)
+        self.written("customers")
+
+    def create_product(self, pid, name, description, price, stock):
+        self.primary.create_product(pid, name, description, price, stock)
+        self.written("products")
+
+    def list_products(self):
+        return self._reader("products").list_products()
+
+    def update_product(self, pid, name, description, price, stock):
+        self.primary.update_product(pid, name, description, price, stock)
+        self.written("products")
+
+    def delete_product(self, pid):
+        self.primary.delete_product(pid)
+        self.written("products")
+
+    def create_order(self, oid, customer_id, product_id, quantity, total_amount, order_date=None):
+        self.primary.create_order(oid, customer_id, product_id, quantity, total_amount, order_date)
+        self.written("orders")
+
+    def list_orders(self):
+        return self._reader("orders").list_orders()
+
+    def update_order(self, oid, customer_id, product_id, quantity, total_amount, order_date=None):
+        self.primary.update_order(oid, customer_id, product_id, quantity, total_amount, order_date)
+        self.written("orders")
+
+    def delete_order(self, oid):
+        self.primary.delete_order(oid)
+        self.written("orders")
+
+    def place_orders(self, carts):
+        try:
+            return self.primary.place_orders(carts)
+        finally:
+            self.written("orders", "products")
+
+    def list_orders_detailed(self):
+        return self._reader("orders", "customers", "products").list_orders_detailed()
+
+    # -- analytics
+    def revenue_by_period(self, grain, since):
+        return self._reader("orders").revenue_by_period(grain, since)
+
+    def sales_summary(self, since):
+        return self._reader("orders").sales_summary(since)
+
+    def top_products(self, since, top_n):
+        return self._reader("orders", "products").top_products(since, top_n)
+
+    def top_customers(self, since, top_n):
+        return self._reader("orders", "customers").top_customers(since, top_n)
+
+    # Rollups are maintained and checked on the primary; the replica has none.
+    def rebuild_rollups(self, start=None, end=None):
+        self.primary.rebuild_rollups(start, end)
+
+    def recompute_rollup(self, rollup, start=None, end=None):
+        return self.primary.recompute_rollup(rollup, start, end)
+
+    def rollup_rows(self, rollup, start=None, end=None):
+        return self.primary.rollup_rows(rollup, start, end)
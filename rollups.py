@@ -0,0 +1,190 @@
+# rollups.py
+"""
+Daily sales rollups: consistency check and rebuilds.
+
+The SQL backend keeps ``daily_product_sales`` and ``daily_customer_sales`` (one row
+per day and product / customer, see schema.ROLLUP_SCHEMAS) up to date on every order
+write by adding or removing that order's contribution, so reporting reads a few
+thousand rollup rows instead of scanning the orders.
+
+On SQLite an order write and its deltas are one transaction. On the warehouse they are
+separate statements (it has no multi-statement transactions), so a failure between
+them leaves the rollups off by that order: drift is expected there. Batched writes
+(write-behind flushes, grid edits) add one net delta after the write, so a failed write
+leaves the rollups as they were, but a failure after the write still needs the check.
+Bulk inserts and writes outside the app bypass the deltas on any backend. ``check()``
+compares the rollups against a full recomputation from the orders, and ``repair()``
+rebuilds only the days that differ.
+
+On the warehouse the app runs ``check_and_repair()`` over the last
+STORE_ROLLUP_REPAIR_DAYS days every STORE_ROLLUP_REPAIR_SECONDS (0: never) in a
+background thread. Drift in older days, or with the schedule off, needs the CLI, e.g.
+from a nightly job.
+
+CLI:
+    python rollups.py check
+    python rollups.py check --since 2025-01-01 --repair
+    python rollups.py check --days 7 --repair   # what the schedule runs
+    python rollups.py rebuild --since 2025-01-01 --until 2025-02-01
+    python rollups.py check --sqlite store.db   # local stand-in backend
+"""
+
+import argparse
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import store
+from backends import utcnow
+from schema import ROLLUP_KEYS
+
+MEASURES = ("orders", "units", "revenue")
+# Revenue is a sum of doubles maintained by +/- deltas; allow for rounding.
+REVENUE_TOLERANCE = 0.005
+
+ROLLUP_REPAIR_SECONDS = float(os.getenv("STORE_ROLLUP_REPAIR_SECONDS", "3600"))
+ROLLUP_REPAIR_DAYS = int(os.getenv("STORE_ROLLUP_REPAIR_DAYS", "7"))
+
+log = logging.getLogger("store.rollups")
+
+
+def _normalize(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    # Days come back as text (SQLite), dates or timestamps (warehouse), depending on the path.
+    out = df.assign(day=pd.to_datetime(df["day"], format="ISO8601").dt.date)
+    return out.astype({"orders": "int64", "units": "int64", "revenue": "float64"}).set_index(["day", key])[list(MEASURES)]
+
+
+def check(start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+    """
+    Compares every rollup with a recomputation from the orders over [start, end).
+    Returns one row per differing (rollup, day, key) with stored and expected measures;
+    empty when the rollups are consistent.
+    """
+    backend = store.get_backend()
+    mismatches = []
+    for rollup, key in ROLLUP_KEYS.items():
+        stored = _normalize(backend.rollup_rows(rollup, start, end), key)
+        expected = _normalize(backend.recompute_rollup(rollup, start, end), key)
+        both = stored.join(expected, how="outer", lsuffix="_stored", rsuffix="_expected").fillna(0)
+        differs = (
+            (both["orders_stored"] != both["orders_expected"])
+            | (both["units_stored"] != both["units_expected"])
+            | ((both["revenue_stored"] - both["revenue_expected"]).abs() > REVENUE_TOLERANCE)
+        )
+        bad = both[differs].reset_index().rename(columns={key: "key"})
+        mismatches.append(bad.assign(rollup=rollup))
+    columns = ["rollup", "day", "key"] + [f"{m}_{side}" for m in MEASURES for side in ("stored", "expected")]
+    return pd.concat(mismatches, ignore_index=True)[columns]
+
+
+def day_ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Collapses days into [start, end) ranges of consecutive days."""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1] = (ranges[-1][0], day + timedelta(days=1))
+        else:
+            ranges.append((day, day + timedelta(days=1)))
+    return ranges
+
+
+def rebuild(start: Optional[date] = None, end: Optional[date] = None):
+    """Recomputes the rollups of the days in [start, end) (every day by default)."""
+    store.get_backend().rebuild_rollups(start, end)
+
+
+def repair(mismatches: pd.DataFrame) -> int:
+    """Rebuilds the days listed in ``check()``'s result; returns how many day ranges were rebuilt."""
+    ranges = day_ranges(mismatches["day"])
+    for start, end in ranges:
+        rebuild(start, end)
+    return len(ranges)
+
+
+def check_and_repair(days: Optional[int] = ROLLUP_REPAIR_DAYS) -> int:
+    """Checks the last ``days`` days (all history when None) and rebuilds those that differ; returns the ranges rebuilt."""
+    start = utcnow().date() - timedelta(days=days) if days is not None else None
+    mismatches = check(start)
+    return repair(mismatches) if not mismatches.empty else 0
+
+
+# -------------------------
+# Schedule (one thread per server process)
+# -------------------------
+_repair_thread: Optional[threading.Thread] = None
+_repair_lock = threading.Lock()
+repair_stats = {"runs": 0, "repaired_ranges": 0, "last_error": None}
+
+
+def start_repair_schedule(every: float = ROLLUP_REPAIR_SECONDS, days: int = ROLLUP_REPAIR_DAYS):
+    """Runs ``check_and_repair(days)`` every ``every`` seconds in a background thread; a no-op when running or ``every`` is 0."""
+    global _repair_thread
+    if every <= 0:
+        return
+    with _repair_lock:
+        if _repair_thread is not None:
+            return
+        _repair_thread = threading.Thread(target=_repair_loop, args=(every, days), name="store-rollup-repair", daemon=True)
+        _repair_thread.start()
+
+
+def _repair_loop(every: float, days: int):
+    stop = threading.Event()
+    while not stop.wait(every):
+        try:
+            repaired = check_and_repair(days)
+        except Exception as e:  # the warehouse may be down; try again next time
+            repair_stats["last_error"] = f"{type(e).__name__}: {e}"
+            log.warning("rollup check failed: %s", repair_stats["last_error"])
+            continue
+        repair_stats.update(runs=repair_stats["runs"] + 1, last_error=None,
+                            repaired_ranges=repair_stats["repaired_ranges"] + repaired)
+        if repaired:
+            log.warning("rollups had drifted from the orders; rebuilt %d day range(s)", repaired)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the daily sales rollups.")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (default: all history)")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last day")
+    parser.add_argument("--days", type=int, help="instead of --since: the last N days")
+    parser.add_argument("--repair", action="store_true", help="with check: rebuild the days that differ")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="use a local SQLite file instead of Databricks")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        store.use_backend("sqlite", sqlite_path=args.sqlite)
+    store.initialize_db()
+    if args.days is not None:
+        args.since = utcnow().date() - timedelta(days=args.days)
+
+    if args.command == "rebuild":
+        rebuild(args.since, args.until)
+        print("Rollups rebuilt.")
+        return
+
+    mismatches = check(args.since, args.until)
+    if mismatches.empty:
+        print("Rollups are consistent with the orders.")
+        return
+    print(f"{len(mismatches)} rollup rows differ from a recomputation over "
+          f"{mismatches['day'].nunique()} day(s):")
+    print(mismatches.head(50).to_string(index=False))
+    if args.repair:
+        print(f"Rebuilt {repair(mismatches)} day range(s).")
+        remaining = check(args.since, args.until)
+        print("Rollups are consistent with the orders." if remaining.empty else f"{len(remaining)} rows still differ.")
+    else:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
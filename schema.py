@@ -0,0 +1,76 @@
+# schema.py
+"""
+Logical schema of the store, shared by every backend.
+
+Types are the Databricks SQL names; each backend maps them to its own
+(SQLite affinities in store.py, SQLAlchemy column types in database.py).
+Every table has a STRING (UUID) id plus CREATED_DATE and LAST_UPDATE_DATE.
+"""
+
+# Column name -> type per table, in DDL order.
+TABLE_SCHEMAS = {
+    "customers": {
+        "id": "STRING",
+        "name": "STRING",
+        "email": "STRING",
+        "phone": "STRING",
+        "address": "STRING",
+        "created_date": "TIMESTAMP",
+        "last_update_date": "TIMESTAMP",
+    },
+    "products": {
+        "id": "STRING",
+        "name": "STRING",
+        "description": "STRING",
+        "price": "DOUBLE",
+        "stock": "INT",
+        "created_date": "TIMESTAMP",
+        "last_update_date": "TIMESTAMP",
+    },
+    "orders": {
+        "id": "STRING",
+        "customer_id": "STRING",
+        "product_id": "STRING",
+        "quantity": "INT",
+        "total_amount": "DOUBLE",
+        "order_date": "TIMESTAMP",
+        "created_date": "TIMESTAMP",
+        "last_update_date": "TIMESTAMP",
+    },
+}
+
+# Column names per table. Used to whitelist filter/sort columns.
+TABLE_COLUMNS = {table: tuple(cols) for table, cols in TABLE_SCHEMAS.items()}
+
+# Daily rollups of orders, maintained by the SQL backend on every order write (see
+# rollups.py). One row per (day, product) / (day, customer); ``orders`` counts orders.
+ROLLUP_SCHEMAS = {
+    "daily_product_sales": {
+        "day": "DATE",
+        "product_id": "STRING",
+        "orders": "INT",
+        "units": "INT",
+        "revenue": "DOUBLE",
+        "last_update_date": "TIMESTAMP",
+    },
+    "daily_customer_sales": {
+        "day": "DATE",
+        "customer_id": "STRING",
+        "orders": "INT",
+        "units": "INT",
+        "revenue": "DOUBLE",
+        "last_update_date": "TIMESTAMP",
+    },
+}
+
+# Grouping key of each rollup besides ``day``.
+ROLLUP_KEYS = {"daily_product_sales": "product_id", "daily_customer_sales": "customer_id"}
+
+# The store's own bookkeeping: one row per applied schema migration (see migrations.py).
+META_SCHEMAS = {
+    "schema_version": {
+        "version": "INT",
+        "description": "STRING",
+        "applied_date": "TIMESTAMP",
+    },
+}
@@ -0,0 +1,336 @@
+# search.py
+"""
+Typeahead search over customers and products (name / email / description), and over
+orders (id / customer and product names).
+
+A ``SearchIndex`` is built from one load of a table and answers a query in well under a
+millisecond, however many rows the table has:
+
+- name prefix: the lowercased names, sorted once; a prefix is a binary-search range;
+- substring: a trigram index over the first SEARCH_TEXT_BYTES bytes of each row's
+  searchable text (UTF-8). Candidates are the rows holding the query's first trigrams;
+  each is then checked with a plain substring test.
+
+Results are ranked name-prefix matches first (alphabetical), then matches at the start
+of a word, then other substring matches (both in table order, newest first); rows
+written since the build come first within their rank. Once enough matches are found,
+only a bounded number of further candidates are checked for better-ranked ones, so a
+query matching most of a large table stays fast. Queries shorter than three
+characters use the name prefix only.
+
+Rows created, updated or deleted through store.py are applied to a small overlay right
+away. ``TableSearch`` rebuilds the index from the (cached) table every
+STORE_SEARCH_REBUILD_SECONDS, or after ``invalidate()``, in a background thread while
+the current index keeps answering; writes made during the rebuild are replayed on the
+new index.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SEARCH_TEXT_BYTES = int(os.getenv("STORE_SEARCH_TEXT_BYTES", "64"))
+SEARCH_REBUILD_SECONDS = float(os.getenv("STORE_SEARCH_REBUILD_SECONDS", "300"))
+# The first field is the "name" of the prefix search; orders are looked up by id prefix,
+# or by their customer's and product's names (filled in by store.py).
+SEARCH_FIELDS = {
+    "customers": ("name", "email"),
+    "products": ("name", "description"),
+    "orders": ("id", "customer", "product"),
+}
+# A query's trigrams used to find candidates; more only shrinks an already small candidate set.
+_QUERY_TRIGRAMS = 4
+_BUILD_CHUNK_ROWS = 100_000
+_CANDIDATE_BLOCK = 4096
+# Candidates still checked for a word-start match once ``limit`` matches were found.
+_RERANK_CANDIDATES = 5000
+
+
+class Hit(NamedTuple):
+    id: str
+    label: str
+
+
+def normalize(value) -> str:
+    """Lowercase with runs of whitespace collapsed, as queries and rows are compared."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _normalize_column(values: pd.Series) -> pd.Series:
+    """``normalize()`` over a column, vectorized."""
+    return values.fillna("").astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _label(values: Sequence) -> str:
+    parts = [str(v) for v in values if v is not None and str(v).strip() and str(v) != "nan"]
+    return " · ".join(p if len(p) <= 40 else p[:39] + "…" for p in parts)
+
+
+def _trigram_keys(texts: List[str], width: int) -> np.ndarray:
+    """Sorted unique trigram * n_rows + row keys over the first ``width`` UTF-8 bytes of each text."""
+    n = len(texts)
+    keys = []
+    for start in range(0, n, _BUILD_CHUNK_ROWS):
+        chunk = texts[start:start + _BUILD_CHUNK_ROWS]
+        raw = np.array([t.encode("utf-8")[:width] for t in chunk], dtype=f"S{width}")
+        b = raw.view(np.uint8).reshape(len(chunk), width).astype(np.int64)
+        codes = (b[:, :-2] << 16) | (b[:, 1:-1] << 8) | b[:, 2:]
+        valid = b[:, 2:] != 0  # NUL padding past the end of the text
+        rows = np.broadcast_to(np.arange(start, start + len(chunk), dtype=np.int64)[:, None], codes.shape)
+        keys.append(codes[valid] * n + rows[valid])
+    # np.unique() hashes in recent numpy and is many times slower than sort + neighbour compare here.
+    out = np.sort(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64)
+    if len(out):
+        out = out[np.concatenate(([True], out[1:] != out[:-1]))]
+    return out
+
+
+def _trigram_codes(text: str) -> List[int]:
+    b = text.encode("utf-8")
+    return [(b[k] << 16) | (b[k + 1] << 8) | b[k + 2] for k in range(len(b) - 2)]
+
+
+class SearchIndex:
+    """Index over one load of a table, plus an overlay of rows changed since."""
+
+    def __init__(self, rows: pd.DataFrame, fields: Sequence[str], text_bytes: int = SEARCH_TEXT_BYTES):
+        self.fields = tuple(fields)
+        self.text_bytes = max(text_bytes, 3)
+        n = len(rows)
+        self._ids: List[str] = rows["id"].astype(str).tolist() if n else []
+        self._pos: Dict[str, int] = {id_: i for i, id_ in enumerate(self._ids)}
+        self._columns = [rows[f].tolist() if n else [] for f in self.fields]  # labels are made per hit
+        normalized = [_normalize_column(rows[f]) for f in self.fields] if n else []
+        self._texts: List[str] = normalized[0].str.cat(normalized[1:], sep="\n").tolist() if n else []
+
+        names = normalized[0].to_numpy(dtype=object) if n else np.empty(0, dtype=object)
+        self._name_order = np.argsort(names, kind="stable")
+        self._names_sorted = names[self._name_order]
+
+        keys = _trigram_keys(self._texts, self.text_bytes) if n else np.empty(0, dtype=np.int64)
+        grams = keys // max(n, 1)
+        self._gram_rows = (keys % max(n, 1)).astype(np.int32)
+        self._grams, self._gram_starts = _runs(grams)
+
+        self._removed: set = set()  # base positions deleted or superseded by the overlay
+        self._overlay: Dict[str, tuple] = {}  # id -> (label, text), in write order
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._removed) + len(self._overlay)
+
+    # -- changes
+    def upsert(self, id_: str, values: dict):
+        """Adds or replaces a row; ``values`` holds the index's fields."""
+        columns = [values.get(f) for f in self.fields]
+        with self._lock:
+            if id_ in self._pos:
+                self._removed.add(self._pos[id_])
+            self._overlay.pop(id_, None)
+            self._overlay[id_] = (_label(columns), "\n".join(normalize(v) for v in columns))
+
+    def remove(self, id_: str):
+        with self._lock:
+            if id_ in self._pos:
+                self._removed.add(self._pos[id_])
+            self._overlay.pop(id_, None)
+
+    # -- queries
+    def label(self, id_: str) -> Optional[str]:
+        with self._lock:
+            if id_ in self._overlay:
+                return self._overlay[id_][0]
+            pos = self._pos.get(id_)
+            return self._label(pos) if pos is not None and pos not in self._removed else None
+
+    def search(self, query: str, limit: int = 20) -> List[Hit]:
+        q = normalize(query)
+        with self._lock:
+            removed = set(self._removed)
+            overlay = list(self._overlay.items())
+        ranks: List[List[Hit]] = [[], [], []]
+
+        # Overlay: rows written since the build, newest first; small, so scanned.
+        for id_, (label, text) in reversed(overlay):
+            rank = _rank(q, text)
+            if rank is not None:
+                ranks[rank].append(Hit(id_, label))
+
+        if not q:
+            live = (i for i in range(len(self._ids)) if i not in removed)
+            ranks[0].extend(self._hit(i) for _, i in zip(range(limit), live))
+            return ranks[0][:limit]
+
+        # Name prefix: a range of the sorted names, alphabetical.
+        lo = np.searchsorted(self._names_sorted, q, side="left")
+        hi = np.searchsorted(self._names_sorted, q + "\U0010ffff", side="left")
+        taken = set()
+        for i in self._name_order[lo:hi]:
+            if len(ranks[0]) >= limit:
+                break
+            if i not in removed:
+                ranks[0].append(self._hit(i))
+                taken.add(int(i))
+
+        if len(q) >= 3:
+            checked = 0
+            for i in self._candidates(q):
+                if len(ranks[0]) + len(ranks[1]) >= limit:
+                    break
+                checked += 1
+                if checked > _RERANK_CANDIDATES and sum(map(len, ranks)) >= limit:
+                    break  # enough matches; stop looking for better-ranked ones
+                if i in removed or i in taken:
+                    continue
+                rank = _rank(q, self._texts[i])
+                if rank is not None and len(ranks[rank]) < limit:
+                    ranks[rank].append(self._hit(i))
+        return [hit for rank in ranks for hit in rank][:limit]
+
+    def _label(self, i: int) -> str:
+        return _label([column[i] for column in self._columns])
+
+    def _hit(self, i: int) -> Hit:
+        return Hit(self._ids[i], self._label(i))
+
+    def _candidates(self, q: str) -> Iterator[int]:
+        """
+        Rows (ascending) holding the query's first trigrams within their indexed bytes.
+        Intersected a block at a time, so a query matching most rows stops as soon as the
+        caller has enough.
+        """
+        postings = []
+        for code in _trigram_codes(q)[:_QUERY_TRIGRAMS]:
+            k = np.searchsorted(self._grams, code)
+            if k >= len(self._grams) or self._grams[k] != code:
+                return
+            end = self._gram_starts[k + 1] if k + 1 < len(self._gram_starts) else len(self._gram_rows)
+            postings.append(self._gram_rows[self._gram_starts[k]:end])
+        postings.sort(key=len)  # walk the rarest trigram's rows
+        for start in range(0, len(postings[0]), _CANDIDATE_BLOCK):
+            rows = postings[0][start:start + _CANDIDATE_BLOCK]
+            for other in postings[1:]:
+                at = np.minimum(np.searchsorted(other, rows), len(other) - 1)
+                rows = rows[other[at] == rows]
+            yield from rows.tolist()
+
+
+def _runs(sorted_values: np.ndarray):
+    """Distinct values of a sorted array and the index where each run starts."""
+    if not len(sorted_values):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], sorted_values[1:] != sorted_values[:-1])))
+    return sorted_values[starts], starts
+
+
+def _rank(q: str, text: str) -> Optional[int]:
+    """0: the name starts with q; 1: a word starts with q; 2: q occurs elsewhere; None: no match."""
+    if text.startswith(q):
+        return 0
+    at = text.find(q)
+    if at < 0:
+        return None
+    while at >= 0:  # any occurrence may be the one at a word start
+        if text[at - 1] in " \n@._-":
+            return 1
+        at = text.find(q, at + 1)
+    return 2
+
+
+class TableSearch:
+    """The current SearchIndex of one table, rebuilt from ``load()`` in the background."""
+
+    def __init__(self, table: str, load: Callable[[], pd.DataFrame], rebuild_every: float = SEARCH_REBUILD_SECONDS):
+        self.table = table
+        self.fields = SEARCH_FIELDS[table]
+        self._load = load
+        self._rebuild_every = rebuild_every
+        self._index: Optional[SearchIndex] = None
+        self._built_at = 0.0
+        self._stale = False
+        self._building = False
+        self._replay: List[tuple] = []  # changes made while a rebuild runs
+        self._lock = threading.Lock()
+        self.stats = {"builds": 0, "last_build_seconds": 0.0, "rows": 0}
+
+    def index(self) -> SearchIndex:
+        with self._lock:
+            index = self._index
+            due = self._stale or time.monotonic() - self._built_at >= self._rebuild_every
+            start_background = index is not None and due and not self._building
+            if start_background:
+                self._building = True
+        if index is None:
+            return self._build()
+        if start_background:
+            threading.Thread(target=self._build, name=f"store-search-{self.table}", daemon=True).start()
+        return index
+
+    def search(self, query: str, limit: int = 20) -> List[Hit]:
+        return self.index().search(query, limit)
+
+    def label(self, id_: str) -> Optional[str]:
+        return self.index().label(id_)
+
+    def upsert(self, id_: str, values: dict):
+        self._change(("upsert", id_, values))
+
+    def remove(self, id_: str):
+        self._change(("remove", id_, None))
+
+    def invalidate(self):
+        """Rebuilds on the next query (in the background when an index exists), e.g. after a bulk import."""
+        with self._lock:
+            self._stale = True
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+            self._replay = []
+            self._stale = False
+
+    def _change(self, change: tuple):
+        with self._lock:
+            index = self._index
+            if self._building:
+                self._replay.append(change)
+        if index is not None:
+            _apply(index, change)
+
+    def _build(self) -> SearchIndex:
+        with self._lock:
+            self._building = True
+            self._replay = []
+            self._stale = False
+        try:
+            start = time.perf_counter()
+            index = SearchIndex(self._load(), self.fields)
+            seconds = time.perf_counter() - start
+        except BaseException:
+            with self._lock:
+                self._building = False
+                self._stale = True
+            raise
+        with self._lock:
+            for change in self._replay:
+                _apply(index, change)
+            self._replay = []
+            self._index = index
+            self._built_at = time.monotonic()
+            self._building = False
+            self.stats.update(builds=self.stats["builds"] + 1, last_build_seconds=seconds, rows=len(index))
+        return index
+
+
+def _apply(index: SearchIndex, change: tuple):
+    op, id_, values = change
+    if op == "upsert":
+        index.upsert(id_, values)
+    else:
+        index.remove(id_)
@@ -0,0 +1,284 @@
+# shared_cache.py
+"""
+Query-result cache shared by the app replicas on one host (STORE_SHARED_CACHE_PATH).
+
+Each replica is its own server process with its own ResultCache, so without sharing,
+N replicas run every query N times and a write in one replica leaves the others
+serving stale results until their TTL. ``SharedResultCache`` keeps the per-process
+cache in front (hits stay in-memory lookups) and adds a second tier in a local SQLite
+file, standing in for Redis the same way the SQLite backend stands in for the
+warehouse:
+
+- shared results: a miss looks in the file before querying; results are stored there
+  pickled, tagged with their tables' generations;
+- broadcast invalidation: ``invalidate(table)`` (every create_/update_/delete_
+  function) bumps the table's generation in the file. Every replica compares the
+  generations on each lookup and drops its own entries of tables changed elsewhere,
+  so a write in one replica is seen by the next read in any other;
+- one load per key: a replica that misses takes a lease on the key; the others wait
+  for its result instead of sending the same query (up to ``lease_seconds``).
+
+Results larger than ``max_value_bytes`` pickled stay in the replica that loaded them.
+One file belongs to one store: give each deployment its own path.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Callable, Hashable, Iterable, Optional
+
+from cache import ResultCache
+
+SHARED_CACHE_PATH = os.getenv("STORE_SHARED_CACHE_PATH")
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("STORE_SHARED_CACHE_MAX_ENTRIES", "1024"))
+SHARED_CACHE_MAX_VALUE_MB = float(os.getenv("STORE_SHARED_CACHE_MAX_VALUE_MB", "64"))
+SHARED_CACHE_LEASE_SECONDS = float(os.getenv("STORE_SHARED_CACHE_LEASE_SECONDS", "30"))
+
+# Generation bumped by invalidate() without tables; part of every entry's tags.
+_ALL = "*"
+_POLL_SECONDS = 0.02
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS generations (
+  ns TEXT NOT NULL,
+  tbl TEXT NOT NULL,
+  gen INTEGER NOT NULL,
+  PRIMARY KEY (ns, tbl)
+);
+CREATE TABLE IF NOT EXISTS entries (
+  ns TEXT NOT NULL,
+  key BLOB NOT NULL,
+  tables TEXT NOT NULL,
+  gens TEXT NOT NULL,
+  expires_at REAL NOT NULL,
+  value BLOB NOT NULL,
+  PRIMARY KEY (ns, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+  ns TEXT NOT NULL,
+  key BLOB NOT NULL,
+  owner TEXT NOT NULL,
+  expires_at REAL NOT NULL,
+  PRIMARY KEY (ns, key)
+);
+"""
+
+
+class SharedResultCache(ResultCache):
+    """
+    ResultCache whose results and invalidations are shared through the SQLite file at
+    ``path``. ``namespace`` separates caches sharing one file (the store's and analytics').
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+        shared_max_entries: int = SHARED_CACHE_MAX_ENTRIES,
+        max_value_bytes: int = int(SHARED_CACHE_MAX_VALUE_MB * 1024 * 1024),
+        lease_seconds: float = SHARED_CACHE_LEASE_SECONDS,
+    ):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self.namespace = namespace
+        self.shared_max_entries = shared_max_entries
+        self.max_value_bytes = max_value_bytes
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()  # one connection per thread
+        self._seen = None  # table -> generation last applied to this process's entries
+        self._seen_lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.lease_waits = 0
+        self.remote_invalidations = 0
+        self._listeners = []
+        with self._db() as db:
+            db.executescript(_DDL)
+
+    # -- file access
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return _Transaction(db)
+
+    def _shared_generations(self, db) -> dict:
+        return dict(db.execute("SELECT tbl, gen FROM generations WHERE ns = ?", (self.namespace,)).fetchall())
+
+    @staticmethod
+    def _tags(tables, generations: dict) -> str:
+        return ",".join(str(generations.get(t, 0)) for t in (*tables, _ALL))
+
+    @staticmethod
+    def _hash(key: Hashable) -> bytes:
+        # Keys are tuples of plain values (names, ids, numbers, dates), which pickle the
+        # same in every process.
+        return hashlib.blake2b(pickle.dumps(key, protocol=4), digest_size=16).digest()
+
+    # -- ResultCache
+    def get_or_load(self, key: Hashable, tables: Iterable[str], loader: Callable[[], object]):
+        tables = tuple(tables)
+        self._sync()
+        return super().get_or_load(key, tables, lambda: self._load_shared(key, tables, loader))
+
+    def invalidate(self, *tables: str):
+        """Drops results read from ``tables`` (all when called without) in every replica."""
+        bumped = tables or (_ALL,)
+        with self._db() as db:
+            db.begin()
+            for table in bumped:
+                db.execute(
+                    "INSERT INTO generations (ns, tbl, gen) VALUES (?, ?, 1) "
+                    "ON CONFLICT(ns, tbl) DO UPDATE SET gen = gen + 1",
+                    (self.namespace, table),
+                )
+            if tables:
+                for table in tables:
+                    db.execute(
+                        "DELETE FROM entries WHERE ns = ? AND ',' || tables || ',' LIKE ?",
+                        (self.namespace, f"%,{table},%"),
+                    )
+            else:
+                db.execute("DELETE FROM entries WHERE ns = ?", (self.namespace,))
+            generations = self._shared_generations(db)
+        with self._seen_lock:
+            if self._seen is not None:
+                self._seen.update({t: generations.get(t, 0) for t in bumped})
+        super().invalidate(*tables)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(
+            shared_hits=self.shared_hits,
+            shared_misses=self.shared_misses,
+            lease_waits=self.lease_waits,
+            remote_invalidations=self.remote_invalidations,
+        )
+        return stats
+
+    # -- sharing
+    def on_remote_invalidate(self, listener: Callable[[tuple], None]):
+        """Registers ``listener(tables)``, called when another replica's invalidation is applied (``()``: all)."""
+        self._listeners.append(listener)
+
+    def _sync(self):
+        """Applies invalidations made by other replicas since the last lookup."""
+        with self._db() as db:
+            generations = self._shared_generations(db)
+        with self._seen_lock:
+            if self._seen is None:  # this process has nothing cached yet
+                self._seen = generations
+                return
+            changed = [t for t, gen in generations.items() if self._seen.get(t, 0) != gen]
+            self._seen = generations
+        if not changed:
+            return
+        self.remote_invalidations += 1
+        tables = () if _ALL in changed else tuple(changed)
+        ResultCache.invalidate(self, *tables)
+        for listener in self._listeners:
+            listener(tables)
+
+    def _load_shared(self, key: Hashable, tables: tuple, loader: Callable[[], object]):
+        digest = self._hash(key)
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+        deadline = time.monotonic() + self.lease_seconds
+        waited = False
+        while True:
+            with self._db() as db:
+                tags = self._tags(tables, self._shared_generations(db))
+                row = db.execute(
+                    "SELECT value FROM entries WHERE ns = ? AND key = ? AND gens = ? AND expires_at > ?",
+                    (self.namespace, digest, tags, time.time()),
+                ).fetchone()
+                if row is None:
+                    db.execute(
+                        "DELETE FROM leases WHERE ns = ? AND key = ? AND expires_at < ?",
+                        (self.namespace, digest, time.time()),
+                    )
+                    leased = db.execute(
+                        "INSERT OR IGNORE INTO leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                        (self.namespace, digest, owner, time.time() + self.lease_seconds),
+                    ).rowcount == 1
+            if row is not None:
+                self.shared_hits += 1
+                return pickle.loads(row[0])
+            if leased or time.monotonic() >= deadline:
+                break
+            # Another replica is running this query: wait for its result.
+            if not waited:
+                self.lease_waits += 1
+                waited = True
+            time.sleep(_POLL_SECONDS)
+
+        self.shared_misses += 1
+        try:
+            value = loader()
+            self._store(digest, tables, tags, value)
+            return value
+        finally:
+            if leased:
+                with self._db() as db:
+                    db.execute("DELETE FROM leases WHERE ns = ? AND key = ? AND owner = ?", (self.namespace, digest, owner))
+
+    def _store(self, digest: bytes, tables: tuple, tags: str, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_value_bytes:
+            return
+        with self._db() as db:
+            db.begin()
+            # Not stored if a table changed while the query ran.
+            if self._tags(tables, self._shared_generations(db)) != tags:
+                return
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (ns, key, tables, gens, expires_at, value) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, digest, ",".join(tables), tags, now + self.ttl, blob),
+            )
+            db.execute("DELETE FROM entries WHERE ns = ? AND expires_at <= ?", (self.namespace, now))
+            db.execute(
+                "DELETE FROM entries WHERE ns = ? AND key IN "
+                "(SELECT key FROM entries WHERE ns = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.shared_max_entries),
+            )
+
+
+class _Transaction:
+    """``with`` block over a connection; ``begin()`` makes the rest of the block one write transaction."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self._conn = db
+        self._open = False
+
+    def begin(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._open = True
+
+    def execute(self, *args):
+        return self._conn.execute(*args)
+
+    def executescript(self, script: str):
+        return self._conn.executescript(script)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if self._open:
+            self._conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
+
+
+def shared_cache(namespace: str, ttl: float, max_entries: int) -> Optional[SharedResultCache]:
+    """The shared cache for ``namespace`` when STORE_SHARED_CACHE_PATH is set, else None."""
+    if not SHARED_CACHE_PATH:
+        return None
+    return SharedResultCache(SHARED_CACHE_PATH, namespace, ttl=ttl, max_entries=max_entries)
@@ -0,0 +1,366 @@
+# statements.py
+"""
+SQL text for every store operation.
+
+Each statement is written once with ``{table}`` / ``{now}`` placeholders (and
+``{day}`` / ``{week}`` / ``{month}`` for the order_date bucket of the analytics
+queries) and named ``:param`` markers. store.py renders the placeholders once per dialect and binds
+values as parameters, so the SQL text of an operation never changes between calls:
+the warehouse (and SQLite's statement cache) can reuse the parsed plan, calls can
+be batched with ``executemany``, and values never go through string escaping.
+"""
+
+from schema import ROLLUP_KEYS
+
+STATEMENTS = {
+    # -- Customers
+    "create_customer": """
+        INSERT INTO {customers} (id, name, email, phone, address, created_date, last_update_date)
+        VALUES (:id, :name, :email, :phone, :address, {now}, {now})
+    """,
+    "list_customers": "SELECT * FROM {customers} ORDER BY created_date DESC",
+    "update_customer": """
+        UPDATE {customers}
+        SET name = :name,
+            email = :email,
+            phone = :phone,
+            address = :address,
+            last_update_date = {now}
+        WHERE id = :id
+    """,
+    "delete_customer": "DELETE FROM {customers} WHERE id = :id",
+    # -- Products
+    "create_product": """
+        INSERT INTO {products} (id, name, description, price, stock, created_date, last_update_date)
+        VALUES (:id, :name, :description, :price, :stock, {now}, {now})
+    """,
+    "list_products": "SELECT * FROM {products} ORDER BY created_date DESC",
+    "update_product": """
+        UPDATE {products}
+        SET name = :name,
+            description = :description,
+            price = :price,
+            stock = :stock,
+            last_update_date = {now}
+        WHERE id = :id
+    """,
+    "delete_product": "DELETE FROM {products} WHERE id = :id",
+    # -- Orders
+    "create_order": """
+        INSERT INTO {orders}
+        (id, customer_id, product_id, quantity, total_amount, order_date, created_date, last_update_date)
+        VALUES (:id, :customer_id, :product_id, :quantity, :total_amount, COALESCE(:order_date, {now}), {now}, {now})
+    """,
+    "list_orders": "SELECT * FROM {orders} ORDER BY created_date DESC",
+    "update_order": """
+        UPDATE {orders}
+        SET customer_id = :customer_id,
+            product_id = :product_id,
+            quantity = :quantity,
+            total_amount = :total_amount,
+            order_date = COALESCE(:order_date, {now}),
+            last_update_date = {now}
+        WHERE id = :id
+    """,
+    "delete_order": "DELETE FROM {orders} WHERE id = :id",
+    # Orders read model: one joined query instead of loading the three tables separately.
+    "list_orders_detailed": """
+        SELECT o.*,
+               c.name AS customer_name,
+               p.name AS product_name,
+               p.price AS product_price
+        FROM {orders} o
+        LEFT JOIN {customers} c ON c.id = o.customer_id
+        LEFT JOIN {products} p ON p.id = o.product_id
+        ORDER BY o.created_date DESC
+    """,
+    # -- Analytics: aggregated in the warehouse, only the aggregate rows come back.
+    # ``{{top_n}}`` survives rendering as ``{top_n}`` and is filled in with a validated int.
+    **{
+        f"revenue_by_{grain}": """
+            SELECT {%s} AS period,
+                   COUNT(*) AS orders,
+                   SUM(o.total_amount) AS revenue,
+                   AVG(o.total_amount) AS avg_order_value
+            FROM {orders} o
+            WHERE o.order_date >= :since
+            GROUP BY 1
+            ORDER BY 1
+        """ % grain
+        for grain in ("day", "week", "month")
+    },
+    "sales_summary": """
+        SELECT COUNT(*) AS orders,
+               COALESCE(SUM(total_amount), 0) AS revenue,
+               AVG(total_amount) AS avg_order_value,
+               COUNT(DISTINCT customer_id) AS customers
+        FROM {orders}
+        WHERE order_date >= :since
+    """,
+    "top_products": """
+        SELECT t.product_id, p.name AS product_name, t.units, t.orders, t.revenue
+        FROM (
+            SELECT product_id, SUM(quantity) AS units, COUNT(*) AS orders, SUM(total_amount) AS revenue
+            FROM {orders}
+            WHERE order_date >= :since
+            GROUP BY product_id
+            ORDER BY revenue DESC
+            LIMIT {{top_n}}
+        ) t
+        LEFT JOIN {products} p ON p.id = t.product_id
+        ORDER BY t.revenue DESC
+    """,
+    "top_customers": """
+        SELECT t.customer_id, c.name AS customer_name, c.email AS customer_email, t.orders, t.revenue
+        FROM (
+            SELECT customer_id, COUNT(*) AS orders, SUM(total_amount) AS revenue
+            FROM {orders}
+            WHERE order_date >= :since
+            GROUP BY customer_id
+            ORDER BY revenue DESC
+            LIMIT {{top_n}}
+        ) t
+        LEFT JOIN {customers} c ON c.id = t.customer_id
+        ORDER BY t.revenue DESC
+    """,
+}
+
+# -- Daily rollups (schema.ROLLUP_SCHEMAS). Generated per rollup; ``{day}`` etc. and
+# the table placeholders are filled in by store.py like in STATEMENTS.
+for _rollup, _key in ROLLUP_KEYS.items():
+    STATEMENTS.update({
+        # Rebuild of the days in [:start, :end) from orders: delete, then re-aggregate.
+        f"{_rollup}_clear": f"DELETE FROM {{{_rollup}}} WHERE day >= :start AND day < :end",
+        f"{_rollup}_rebuild": f"""
+            INSERT INTO {{{_rollup}}} (day, {_key}, orders, units, revenue, last_update_date)
+            SELECT {{day}}, o.{_key}, COUNT(*), SUM(o.quantity), SUM(o.total_amount), {{now}}
+            FROM {{orders}} o
+            WHERE o.order_date >= :start AND o.order_date < :end
+            GROUP BY 1, o.{_key}
+        """,
+        # Full recomputation over [:start, :end), for the consistency check.
+        f"{_rollup}_recompute": f"""
+            SELECT {{day}} AS day, o.{_key}, COUNT(*) AS orders, SUM(o.quantity) AS units, SUM(o.total_amount) AS revenue
+            FROM {{orders}} o
+            WHERE o.order_date >= :start AND o.order_date < :end
+            GROUP BY 1, o.{_key}
+        """,
+        f"{_rollup}_rows": f"""
+            SELECT day, {_key}, orders, units, revenue
+            FROM {{{_rollup}}}
+            WHERE day >= :start AND day < :end AND orders <> 0
+        """,
+    })
+
+# Analytics over the rollups: the same results as the order-level statements above, read
+# from one row per day and product/customer. The subquery names ``day`` order_date so
+# the {day}/{week}/{month} bucket expressions apply unchanged.
+STATEMENTS.update({
+    **{
+        f"rollup_revenue_by_{grain}": """
+            SELECT {%s} AS period,
+                   SUM(o.orders) AS orders,
+                   SUM(o.revenue) AS revenue,
+                   SUM(o.revenue) / NULLIF(SUM(o.orders), 0) AS avg_order_value
+            FROM (SELECT day AS order_date, orders, revenue FROM {daily_product_sales} WHERE day >= :since) o
+            GROUP BY 1
+            HAVING SUM(o.orders) > 0
+            ORDER BY 1
+        """ % grain
+        for grain in ("day", "week", "month")
+    },
+    "rollup_sales_summary": """
+        SELECT COALESCE(SUM(orders), 0) AS orders,
+               COALESCE(SUM(revenue), 0) AS revenue,
+               SUM(revenue) / NULLIF(SUM(orders), 0) AS avg_order_value,
+               (SELECT COUNT(DISTINCT customer_id) FROM {daily_customer_sales}
+                WHERE day >= :since AND orders > 0) AS customers
+        FROM {daily_product_sales}
+        WHERE day >= :since
+    """,
+    "rollup_top_products": """
+        SELECT t.product_id, p.name AS product_name, t.units, t.orders, t.revenue
+        FROM (
+            SELECT product_id, SUM(units) AS units, SUM(orders) AS orders, SUM(revenue) AS revenue
+            FROM {daily_product_sales}
+            WHERE day >= :since
+            GROUP BY product_id
+            HAVING SUM(orders) > 0
+            ORDER BY revenue DESC
+            LIMIT {{top_n}}
+        ) t
+        LEFT JOIN {products} p ON p.id = t.product_id
+        ORDER BY t.revenue DESC
+    """,
+    "rollup_top_customers": """
+        SELECT t.customer_id, c.name AS customer_name, c.email AS customer_email, t.orders, t.revenue
+        FROM (
+            SELECT customer_id, SUM(orders) AS orders, SUM(revenue) AS revenue
+            FROM {daily_customer_sales}
+            WHERE day >= :since
+            GROUP BY customer_id
+            HAVING SUM(orders) > 0
+            ORDER BY revenue DESC
+            LIMIT {{top_n}}
+        ) t
+        LEFT JOIN {customers} c ON c.id = t.customer_id
+        ORDER BY t.revenue DESC
+    """,
+})
+
+# Statements whose syntax differs between dialects; store.statement() prefers these.
+DIALECT_STATEMENTS = {"sqlite": {}, "databricks": {}}
+
+for _rollup, _key in ROLLUP_KEYS.items():
+    # Adds (:sign = 1) or removes (:sign = -1) one order's contribution. Run after the
+    # order is inserted / before it is deleted; an update is a remove and an add.
+    DIALECT_STATEMENTS["sqlite"][f"{_rollup}_delta"] = f"""
+        INSERT INTO {{{_rollup}}} (day, {_key}, orders, units, revenue, last_update_date)
+        SELECT date(order_date), {_key}, :sign, :sign * quantity, :sign * total_amount, {{now}}
+        FROM {{orders}}
+        WHERE id = :id
+        ON CONFLICT (day, {_key}) DO UPDATE SET
+            orders = orders + excluded.orders,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue,
+            last_update_date = excluded.last_update_date
+    """
+    DIALECT_STATEMENTS["databricks"][f"{_rollup}_delta"] = f"""
+        MERGE INTO {{{_rollup}}} AS t
+        USING (
+            SELECT to_date(order_date) AS day, {_key}, :sign AS orders, :sign * quantity AS units, :sign * total_amount AS revenue
+            FROM {{orders}}
+            WHERE id = :id
+        ) AS s
+        ON t.day = s.day AND t.{_key} = s.{_key}
+        WHEN MATCHED THEN UPDATE SET
+            t.orders = t.orders + s.orders,
+            t.units = t.units + s.units,
+            t.revenue = t.revenue + s.revenue,
+            t.last_update_date = {{now}}
+        WHEN NOT MATCHED THEN INSERT (day, {_key}, orders, units, revenue, last_update_date)
+            VALUES (s.day, s.{_key}, s.orders, s.units, s.revenue, {{now}})
+    """
+
+# -- Order placement (store.SQLBackend.place_orders). A cart's stock is taken only if
+# every line has enough; totals are priced from the product rows, not from the caller.
+DIALECT_STATEMENTS["sqlite"].update({
+    # Run per line inside a write transaction; no row back means not enough stock.
+    "take_stock": """
+        UPDATE {products}
+        SET stock = stock - :quantity,
+            last_update_date = {now}
+        WHERE id = :product_id AND stock >= :quantity
+        RETURNING price
+    """,
+})
+
+# The warehouse has no multi-statement transactions: one MERGE takes the stock of a whole
+# batch of carts, or of nothing when any product falls short (``enough``), and Delta
+# commits it atomically. ``{{lines}}`` / ``{{ids}}`` are filled in with VALUES tuples / IN
+# lists of bound parameter markers.
+DIALECT_STATEMENTS["databricks"].update({
+    "take_stock_batch": """
+        MERGE INTO {products} AS t
+        USING (
+            SELECT l.product_id, l.quantity,
+                   MIN(CASE WHEN p.stock >= l.quantity THEN 1 ELSE 0 END) OVER () AS enough
+            FROM (
+                SELECT product_id, SUM(quantity) AS quantity
+                FROM VALUES {{lines}} AS v(product_id, quantity)
+                GROUP BY product_id
+            ) l
+            LEFT JOIN {products} p ON p.id = l.product_id
+        ) AS s
+        ON t.id = s.product_id
+        WHEN MATCHED AND s.enough = 1 THEN UPDATE SET
+            t.stock = t.stock - s.quantity,
+            t.last_update_date = {now}
+    """,
+    # Gives the stock back when writing the orders failed after take_stock_batch.
+    "return_stock_batch": """
+        MERGE INTO {products} AS t
+        USING (
+            SELECT product_id, SUM(quantity) AS quantity
+            FROM VALUES {{lines}} AS v(product_id, quantity)
+            GROUP BY product_id
+        ) AS s
+        ON t.id = s.product_id
+        WHEN MATCHED THEN UPDATE SET
+            t.stock = t.stock + s.quantity,
+            t.last_update_date = {now}
+    """,
+    "insert_cart_orders": """
+        INSERT INTO {orders}
+        (id, customer_id, product_id, quantity, total_amount, order_date, created_date, last_update_date)
+        SELECT v.id, v.customer_id, v.product_id, v.quantity, v.quantity * p.price, {now}, {now}, {now}
+        FROM VALUES {{lines}} AS v(id, customer_id, product_id, quantity)
+        JOIN {products} p ON p.id = v.product_id
+    """,
+    "cart_order_totals": "SELECT id, total_amount FROM {orders} WHERE id IN ({{ids}})",
+    "cart_stock": "SELECT id, stock FROM {products} WHERE id IN ({{ids}})",
+})
+
+for _rollup, _key in ROLLUP_KEYS.items():
+    # Adds (:sign = 1) or removes (:sign = -1) the contribution of a batch of orders, like
+    # {rollup}_delta for one order; ``{{ids}}`` is an IN list of bound order id markers.
+    DIALECT_STATEMENTS["sqlite"][f"{_rollup}_delta_ids"] = f"""
+        INSERT INTO {{{_rollup}}} (day, {_key}, orders, units, revenue, last_update_date)
+        SELECT date(order_date), {_key}, :sign * COUNT(*), :sign * SUM(quantity), :sign * SUM(total_amount), {{now}}
+        FROM {{orders}}
+        WHERE id IN ({{{{ids}}}})
+        GROUP BY 1, {_key}
+        ON CONFLICT (day, {_key}) DO UPDATE SET
+            orders = orders + excluded.orders,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue,
+            last_update_date = excluded.last_update_date
+    """
+    DIALECT_STATEMENTS["databricks"][f"{_rollup}_delta_ids"] = f"""
+        MERGE INTO {{{_rollup}}} AS t
+        USING (
+            SELECT to_date(order_date) AS day, {_key}, :sign * COUNT(*) AS orders,
+                   :sign * SUM(quantity) AS units, :sign * SUM(total_amount) AS revenue
+            FROM {{orders}}
+            WHERE id IN ({{{{ids}}}})
+            GROUP BY 1, {_key}
+        ) AS s
+        ON t.day = s.day AND t.{_key} = s.{_key}
+        WHEN MATCHED THEN UPDATE SET
+            t.orders = t.orders + s.orders,
+            t.units = t.units + s.units,
+            t.revenue = t.revenue + s.revenue,
+            t.last_update_date = {{now}}
+        WHEN NOT MATCHED THEN INSERT (day, {_key}, orders, units, revenue, last_update_date)
+            VALUES (s.day, s.{_key}, s.orders, s.units, s.revenue, {{now}})
+    """
+
+for _rollup, _key in ROLLUP_KEYS.items():
+    # Adds deltas the caller has already netted per (day, key); ``{{rows}}`` is a VALUES
+    # list of (day, key, orders, units, revenue) bound markers.
+    DIALECT_STATEMENTS["sqlite"][f"{_rollup}_add"] = f"""
+        WITH s (day, {_key}, orders, units, revenue) AS (VALUES {{{{rows}}}})
+        INSERT INTO {{{_rollup}}} (day, {_key}, orders, units, revenue, last_update_date)
+        SELECT day, {_key}, orders, units, revenue, {{now}}
+        FROM s
+        WHERE true
+        ON CONFLICT (day, {_key}) DO UPDATE SET
+            orders = orders + excluded.orders,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue,
+            last_update_date = excluded.last_update_date
+    """
+    DIALECT_STATEMENTS["databricks"][f"{_rollup}_add"] = f"""
+        MERGE INTO {{{_rollup}}} AS t
+        USING (
+            SELECT * FROM VALUES {{{{rows}}}} AS v(day, {_key}, orders, units, revenue)
+        ) AS s
+        ON t.day = s.day AND t.{_key} = s.{_key}
+        WHEN MATCHED THEN UPDATE SET
+            t.orders = t.orders + s.orders,
+            t.units = t.units + s.units,
+            t.revenue = t.revenue + s.revenue,
+            t.last_update_date = {{now}}
+        WHEN NOT MATCHED THEN INSERT (day, {_key}, orders, units, revenue, last_update_date)
+            VALUES (s.day, s.{_key}, s.orders, s.units, s.revenue, {{now}})
+    """
@@ -0,0 +1,140 @@
+# sync.py
+"""
+Incremental table snapshots kept in sync by last_update_date.
+
+A ``TableSnapshot`` holds one table in memory for the server process. The first
+refresh loads it in full; later refreshes fetch only rows whose last_update_date is
+past the high-water mark (minus a small overlap, see below) and merge them by id, so
+the warehouse work of a refresh grows with the amount of change rather than with the
+table.
+
+Deletes leave no row to fetch. They are handled three ways:
+- deletes made through store.py are applied to the snapshot directly (``discard``);
+- every refresh compares the snapshot's row count with ``COUNT(*)``; fewer rows in the
+  table than in the snapshot means rows were deleted elsewhere and triggers an id
+  reconciliation (``SELECT id``) right away;
+- the reconciliation also runs every STORE_SYNC_RECONCILE_SECONDS, for the case an
+  insert and a delete elsewhere cancel out in the count.
+
+last_update_date is set by the database when the statement runs, not when it commits,
+so a row can become visible with a timestamp slightly behind the high-water mark.
+Refreshes therefore re-read the last STORE_SYNC_OVERLAP_SECONDS; the merge by id makes
+re-reading harmless.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+SYNC_ENABLED = os.getenv("STORE_SYNC", "0") == "1"
+SYNC_OVERLAP_SECONDS = float(os.getenv("STORE_SYNC_OVERLAP_SECONDS", "5"))
+SYNC_RECONCILE_SECONDS = float(os.getenv("STORE_SYNC_RECONCILE_SECONDS", "300"))
+
+
+def _timestamps(values: pd.Series) -> pd.Series:
+    # SQLite returns timestamps as text, the warehouse as datetimes.
+    return pd.to_datetime(values, format="ISO8601")
+
+
+def _newest_first(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("created_date", ascending=False, kind="stable")
+
+
+class TableSnapshot:
+    """In-memory copy of one table, refreshed incrementally through ``backend()``."""
+
+    def __init__(self, table: str, backend: Callable[[], object],
+                 overlap: float = SYNC_OVERLAP_SECONDS, reconcile_every: float = SYNC_RECONCILE_SECONDS):
+        self.table = table
+        self._backend = backend
+        self._overlap = timedelta(seconds=overlap)
+        self._reconcile_every = reconcile_every
+        self._lock = threading.Lock()
+        self._rows: Optional[pd.DataFrame] = None  # indexed by id, newest created_date first
+        self._view: Optional[pd.DataFrame] = None  # _rows as returned by rows(), built on demand
+        self._high_water: Optional[datetime] = None
+        self._reconciled_at = 0.0
+        self.stats = {"full_loads": 0, "refreshes": 0, "rows_fetched": 0, "rows_deleted": 0, "reconciles": 0}
+
+    @property
+    def high_water(self) -> Optional[datetime]:
+        return self._high_water
+
+    def rows(self) -> pd.DataFrame:
+        """Refreshes, then returns the table newest created_date first (like backend.list_rows)."""
+        with self._lock:
+            self._refresh()
+            if self._view is None:
+                self._view = self._rows.reset_index(drop=True)
+            return self._view
+
+    def discard(self, ids: Iterable[str]):
+        """Drops rows deleted by this process, without waiting for a reconciliation."""
+        ids = list(ids)
+        with self._lock:
+            if self._rows is not None:
+                self._drop(self._rows.index.intersection(ids))
+
+    def reset(self):
+        with self._lock:
+            self._rows = self._view = self._high_water = None
+
+    def _refresh(self):
+        backend = self._backend()
+        if self._rows is None:
+            since = None
+            self.stats["full_loads"] += 1
+        else:
+            since = self._high_water - self._overlap if self._high_water is not None else None
+            self.stats["refreshes"] += 1
+
+        changed = backend.changed_since(self.table, since)
+        self.stats["rows_fetched"] += len(changed)
+        if self._rows is None:
+            self._rows = _newest_first(changed.set_index("id", drop=False))
+            self._view = None
+            self._reconciled_at = time.monotonic()
+        elif len(changed):
+            self._merge(changed.set_index("id", drop=False))
+        if len(changed):
+            newest = _timestamps(changed["last_update_date"]).max()
+            if pd.notna(newest) and (self._high_water is None or newest > self._high_water):
+                self._high_water = newest.to_pydatetime()
+
+        if since is not None:
+            overdue = time.monotonic() - self._reconciled_at >= self._reconcile_every
+            if overdue or backend.count_rows(self.table) < len(self._rows):
+                self._reconcile(backend)
+
+    def _merge(self, changed: pd.DataFrame):
+        # Updates never change created_date, so updated rows keep their place and the
+        # snapshot is not re-sorted; new rows normally sort before every existing one.
+        # get_indexer() uses the index's hash table; isin() walks Arrow-backed strings in Python.
+        existing = self._rows.index.get_indexer(changed.index) >= 0
+        if existing.any():
+            updated = changed[existing]
+            self._rows.loc[updated.index, updated.columns] = updated
+        added = changed[~existing]
+        if len(added):
+            added = _newest_first(added)
+            in_order = self._rows.empty or (
+                _timestamps(added["created_date"]).min() >= _timestamps(self._rows["created_date"].iloc[:1]).iloc[0]
+            )
+            self._rows = pd.concat([added, self._rows]) if in_order else _newest_first(pd.concat([added, self._rows]))
+        self._view = None
+
+    def _reconcile(self, backend):
+        self.stats["reconciles"] += 1
+        self._reconciled_at = time.monotonic()
+        live = pd.Index(backend.row_ids(self.table))
+        self._drop(self._rows.index.difference(live))
+
+    def _drop(self, ids: pd.Index):
+        if len(ids):
+            self._rows = self._rows.drop(ids)
+            self._view = None
+            self.stats["rows_deleted"] += len(ids)
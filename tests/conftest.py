@@ -0,0 +1,25 @@
+# conftest.py
+"""
+Shared fixtures. The modules live at the repository root, as app.py imports them; the
+store runs on a throwaway SQLite file per test (no warehouse needed).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STORE_BACKEND", "memory")
+
+import store  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    """store.py on a fresh SQLite file; yields the backend."""
+    store.use_backend("sqlite", sqlite_path=str(tmp_path / "store.db"))
+    store.initialize_db()
+    yield store.get_backend()
+    store.use_backend("memory")
+
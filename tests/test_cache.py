@@ -0,0 +1,126 @@
+import threading
+import time
+
+from cache import ResultCache, cached_query, invalidates
+
+
+def test_hit_after_miss():
+    cache = ResultCache()
+    calls = []
+    load = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert cache.get_or_load("k", ["customers"], load) == 1
+    assert cache.get_or_load("k", ["customers"], load) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResultCache(ttl=0.0)
+    cache.get_or_load("k", [], lambda: 1)
+    assert cache.get_or_load("k", [], lambda: 2) == 2
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.get_or_load("a", [], lambda: "a")
+    cache.get_or_load("b", [], lambda: "b")
+    cache.get_or_load("a", [], lambda: "stale")  # a is now the most recent
+    cache.get_or_load("c", [], lambda: "c")
+    assert cache.get_or_load("a", [], lambda: "reloaded") == "a"
+    assert cache.get_or_load("b", [], lambda: "reloaded") == "reloaded"
+    assert cache.evictions >= 1
+
+
+def test_invalidate_table_drops_only_its_entries():
+    cache = ResultCache()
+    cache.get_or_load("c", ["customers"], lambda: 1)
+    cache.get_or_load("o", ["orders", "products"], lambda: 1)
+    cache.invalidate("products")
+    assert cache.get_or_load("c", ["customers"], lambda: 2) == 1
+    assert cache.get_or_load("o", ["orders", "products"], lambda: 2) == 2
+
+
+def _racing_load(cache, invalidate):
+    """Loads "k" while ``invalidate`` runs mid-load; returns what a second read gets."""
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    reader = threading.Thread(target=cache.get_or_load, args=("k", ["customers"], slow))
+    reader.start()
+    started.wait(5)
+    invalidate()
+    release.set()
+    reader.join(5)
+    return cache.get_or_load("k", ["customers"], lambda: "new")
+
+
+def test_read_in_flight_during_invalidate_is_not_stored():
+    cache = ResultCache()
+    assert _racing_load(cache, lambda: cache.invalidate("customers")) == "new"
+
+
+def test_invalidate_all_covers_tables_never_invalidated():
+    cache = ResultCache()
+    assert _racing_load(cache, cache.invalidate) == "new"
+    cache.get_or_load("p", ["products"], lambda: 1)
+    cache.invalidate()
+    assert cache.get_or_load("p", ["products"], lambda: 2) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResultCache()
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return "v"
+
+    def read(results):
+        barrier.wait()
+        results.append(cache.get_or_load("k", [], load))
+
+    results = []
+    threads = [threading.Thread(target=read, args=(results,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert results == ["v"] * 4
+    assert len(calls) == 1 and cache.coalesced == 3
+
+
+def test_decorators():
+    cache = ResultCache()
+    rows = ["a"]
+
+    @cached_query(lambda: cache, "customers")
+    def list_rows():
+        return list(rows)
+
+    @invalidates(lambda: cache, "customers")
+    def add(row):
+        rows.append(row)
+
+    assert list_rows() == ["a"]
+    rows.append("unseen")
+    assert list_rows() == ["a"]  # served from the cache
+    add("b")
+    assert list_rows() == ["a", "unseen", "b"]
+    assert list_rows.uncached() == ["a", "unseen", "b"]
+
+
+def test_decorator_without_cache():
+    calls = []
+
+    @cached_query(lambda: None, "customers")
+    def read():
+        calls.append(1)
+
+    read()
+    read()
+    assert len(calls) == 2
@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+
+import edits
+import store
+
+
+def loaded():
+    return pd.DataFrame({
+        "id": ["a", "b", "c"],
+        "name": ["Ann", "Bob", "Cy"],
+        "description": ["", None, "x"],
+        "price": [1.0, 2.0, 3.0],
+        "stock": [1, 2, 3],
+        "last_update_date": ["2026-01-01 00:00:00", "2026-01-02 00:00:00", "2026-01-03 00:00:00"],
+    })
+
+
+def test_no_change():
+    grid = edits.diff("products", loaded(), loaded())
+    assert grid.empty and grid.cells == 0
+
+
+def test_edited_cells_and_deleted_rows():
+    after = loaded()
+    after.loc[0, "price"] = 1.5
+    after.loc[1, "description"] = "now set"
+    after = after.drop(index=2)
+    grid = edits.diff("products", loaded(), after)
+    assert grid.cells == 2
+    assert grid.updates["id"].tolist() == ["a", "b"]
+    assert list(grid.updates.columns) == ["id", "last_update_date", "description", "price"]
+    assert grid.updates["last_update_date"].tolist() == ["2026-01-01 00:00:00", "2026-01-02 00:00:00"]
+    assert grid.deletes.to_dict("records") == [{"id": "c", "last_update_date": "2026-01-03 00:00:00"}]
+    assert grid.rows["id"].tolist() == ["a", "b"]
+
+
+def test_equivalent_values_are_not_edits():
+    after = loaded()
+    after["price"] = after["price"].astype(str)  # "1.0" == 1.0
+    after["stock"] = after["stock"].astype(float)
+    assert edits.diff("products", loaded(), after).empty
+
+
+def test_clearing_a_cell_is_an_edit():
+    after = loaded()
+    after.loc[2, "description"] = None
+    grid = edits.diff("products", loaded(), after)
+    assert grid.cells == 1 and pd.isna(grid.updates["description"].iloc[0])
+
+
+@pytest.mark.parametrize("change", [
+    lambda df: pd.concat([df, pd.DataFrame({"id": ["new"], "name": ["New"]})], ignore_index=True),
+    lambda df: df.assign(id=["a", "b", "z"]),
+])
+def test_new_rows_and_id_changes_are_rejected(change):
+    with pytest.raises(ValueError, match="not supported"):
+        edits.diff("products", loaded(), change(loaded()))
+
+
+@pytest.mark.parametrize("column, value", [("price", "cheap"), ("stock", 1.5)])
+def test_values_that_do_not_fit_the_column_are_rejected(column, value):
+    after = loaded().astype({column: object})
+    after.loc[0, column] = value
+    with pytest.raises(ValueError, match=f"Invalid {column}"):
+        edits.diff("products", loaded(), after)
+
+
+# -- committing on SQLite
+@pytest.mark.parametrize("bind_limit", [0, 7])  # 7: several statements per kind of change
+def test_commit_reports_rows_changed_since_loading(sqlite_store, monkeypatch, bind_limit):
+    monkeypatch.setattr(store, "MAX_BIND_PARAMS", bind_limit)
+    ids = [store.create_product(f"P{i}", "", 1.0 + i, 10) for i in range(6)]
+    before = store.list_page("products", limit=50).rows
+    by_id = before.set_index("id")
+    # Someone else edits a row the grid will edit and one it will delete.
+    store.update_product(ids[0], "theirs", "", 9.0, 10)
+    store.update_product(ids[5], "kept", "", 9.0, 10)
+
+    after = before.set_index("id")
+    after.loc[[ids[0], ids[2], ids[3]], "name"] = ["mine", "O'Neil \\", "Cy"]
+    after.loc[ids[4], "price"] = 42.0
+    after = after.drop(index=[ids[1], ids[5]]).reset_index()
+    result = store.commit_edits(edits.diff("products", before, after))
+
+    assert result.updated == 3 and result.deleted == 1
+    assert sorted(result.conflicts) == sorted([ids[0], ids[5]])
+    stored = store.get_backend().list_rows("products").set_index("id")
+    assert sorted(stored.index) == sorted([ids[0], ids[2], ids[3], ids[4], ids[5]])
+    assert stored.loc[ids[0], "name"] == "theirs" and stored.loc[ids[5], "name"] == "kept"  # left alone
+    assert stored.loc[ids[2], "name"] == "O'Neil \\" and stored.loc[ids[4], "price"] == 42.0
+    assert by_id.loc[ids[3], "last_update_date"] != stored.loc[ids[3], "last_update_date"]
+
+
+def test_commit_waits_only_for_its_own_tables_journal(sqlite_store, tmp_path, monkeypatch):
+    import writebehind
+
+    ids = [store.create_product(f"P{i}", "", 1.0, 10) for i in range(2)]
+    before = store.list_page("products", limit=50).rows
+    after = before.set_index("id")
+    after.loc[ids[0], "price"] = 5.0
+    grid = edits.diff("products", before, after.reset_index())
+
+    monkeypatch.setattr(writebehind, "WRITE_BEHIND_ENABLED", True)
+    monkeypatch.setattr(writebehind, "WRITE_BEHIND_PATH", str(tmp_path / "journal.db"))
+    monkeypatch.setattr(store, "_write_queue", None)
+    monkeypatch.setattr(store, "EDIT_PENDING_TIMEOUT", 0.3)
+    queue = store.write_queue()
+    queue.stop()
+    queue.retry_seconds = 60.0
+    try:
+        # A customers row failing on its own, held for a retry: not this grid's concern.
+        queue.enqueue("customers", "update", "c1", {"no_such_column": 1})
+        queue.flush_once()
+        assert queue.pending()["failing"] == 1
+        # Nor a customers write still waiting (the flush thread is stopped).
+        queue.enqueue("customers", "delete", "c2")
+        assert store.commit_edits(grid).updated == 1
+
+        # A products write not applied yet: the checked write must wait for it.
+        queue.enqueue("products", "update", ids[1], {"stock": 3})
+        with pytest.raises(RuntimeError, match="still being saved"):
+            store.commit_edits(grid)
+    finally:
+        queue.close()
@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+import migrations
+import replica
+import store
+from replica import ReplicaBackend
+
+
+def open_replica(path, primary, **kwargs):
+    local = replica.sqlite_replica(str(path))
+    migrations.bootstrap(local)
+    return ReplicaBackend(primary, local, **{"max_lag": 60.0, "refresh_every": 0.0, "reconcile_every": 3600.0, **kwargs})
+
+
+@pytest.fixture
+def replicated(sqlite_store, tmp_path):
+    """A replica of the SQLite store (the primary), refreshed by hand."""
+    backend = open_replica(tmp_path / "replica.db", sqlite_store)
+    yield backend
+    backend.stop()
+    backend.local.close()
+
+
+def names(df):
+    return sorted(df["name"])
+
+
+def test_reads_fall_back_until_the_first_refresh(replicated):
+    replicated.create_customer("a", "Ann", "a@x", "1", "x")
+    assert replicated.lag("customers") is None
+    assert names(replicated.list_customers()) == ["Ann"]
+    assert replicated.stats["fallbacks"] == 1 and replicated.stats["local_reads"] == 0
+
+    replicated.refresh()
+    assert replicated.lag("customers") is not None
+    assert names(replicated.list_customers()) == ["Ann"]
+    assert replicated.stats["local_reads"] == 1
+
+
+def test_own_write_is_read_from_the_primary_until_copied(replicated):
+    replicated.create_customer("a", "Ann", "a@x", "1", "x")
+    replicated.refresh()
+    replicated.update_customer("a", "Ann2", "a@x", "1", "x")
+    # The replica still has the old row, so the read must not go there.
+    assert replicated.local.list_rows("customers")["name"].tolist() == ["Ann"]
+    assert names(replicated.list_customers()) == ["Ann2"]
+    assert replicated.lag("products") is not None  # other tables stay local
+    replicated.refresh("customers")
+    assert replicated.local.list_rows("customers")["name"].tolist() == ["Ann2"]
+    before = replicated.stats["local_reads"]
+    assert names(replicated.list_customers()) == ["Ann2"]
+    assert replicated.stats["local_reads"] == before + 1
+
+
+def test_write_elsewhere_marks_tables_stale(replicated):
+    replicated.refresh()
+    store.get_backend().create_customer("b", "Bob", "b@x", "1", "x")  # primary, behind the replica's back
+    assert replicated.list_customers().empty  # within the staleness bound: served locally
+    replicated.written()  # e.g. learnt from the shared cache
+    assert all(replicated.lag(t) is None for t in replica.TABLES)
+    assert names(replicated.list_customers()) == ["Bob"]
+
+
+def test_staleness_bound(sqlite_store, tmp_path):
+    backend = open_replica(tmp_path / "replica.db", sqlite_store, max_lag=-1.0)
+    try:
+        backend.refresh()
+        backend.list_customers()
+        assert backend.stats["fallbacks"] == 1 and backend.stats["local_reads"] == 0
+    finally:
+        backend.local.close()
+
+
+def test_deletes_on_the_primary_are_reconciled(replicated):
+    for cid in ("a", "b", "c"):
+        replicated.create_customer(cid, cid.upper(), f"{cid}@x", "1", "x")
+    replicated.refresh()
+    store.get_backend().delete_customer("b")
+    replicated.refresh("customers")
+    assert sorted(replicated.local.row_ids("customers")) == ["a", "c"]
+    assert replicated.stats["rows_deleted"] == 1
+
+
+def test_failed_refresh_keeps_reads_on_the_primary(replicated, monkeypatch):
+    replicated.create_customer("a", "Ann", "a@x", "1", "x")
+
+    def down(*args, **kwargs):
+        raise ConnectionError("warehouse unreachable")
+
+    monkeypatch.setattr(replicated.primary, "iter_batches", down)
+    replicated.refresh("customers")
+    assert replicated.lag("customers") is None and "unreachable" in replicated.last_error
+    assert names(replicated.list_customers()) == ["Ann"]
+    monkeypatch.undo()
+
+
+def test_restart_resumes_from_the_file(sqlite_store, tmp_path):
+    first = open_replica(tmp_path / "replica.db", sqlite_store)
+    for i in range(5):
+        first.create_customer(f"c{i}", f"C{i}", "c@x", "1", "x")
+    first.refresh()
+    first.local.close()
+
+    second = open_replica(tmp_path / "replica.db", sqlite_store, overlap=0.0)
+    try:
+        second.refresh("customers")
+        assert second.stats["rows_copied"] <= 1  # the newest row again, not the whole table
+        assert len(second.list_customers()) == 5
+    finally:
+        second.local.close()
+
+
+def test_copied_rows_match_the_primary(replicated):
+    replicated.create_product("p", "Widget", "O'Neil \\ desc", 2.5, 7)
+    replicated.refresh()
+    copied = replicated.local.list_rows("products").set_index("id")
+    primary = store.get_backend().list_rows("products").set_index("id")
+    assert copied.loc["p", "description"] == "O'Neil \\ desc" and copied.loc["p", "stock"] == 7
+    assert pd.Timestamp(copied.loc["p", "last_update_date"]) == pd.Timestamp(primary.loc["p", "last_update_date"])
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import rollups
+
+
+def order(quantity, day):
+    stamp = datetime(2026, 1, day, 12)
+    return pd.DataFrame([{"id": "o1", "customer_id": "c1", "product_id": "p1", "quantity": quantity,
+                          "total_amount": quantity * 2.0, "order_date": stamp, "created_date": stamp,
+                          "last_update_date": stamp}])
+
+
+def test_rewritten_batch_counts_once(sqlite_store):
+    sqlite_store.apply_changes("orders", order(2, 1), [], [])
+    sqlite_store.apply_changes("orders", order(2, 1), [], [])
+    sqlite_store.apply_changes("orders", order(3, 2), [], [])
+    assert rollups.check().empty
+    day = sqlite_store.rollup_rows("daily_product_sales").set_index("day")
+    assert int(day["orders"].sum()) == 1 and int(day["units"].sum()) == 3
+
+
+def test_failed_write_leaves_rollups_untouched(sqlite_store, monkeypatch):
+    # Regression: the old contribution was taken out before the write, so on the warehouse
+    # (no transaction) a failed write followed by a retry subtracted it twice.
+    sqlite_store.apply_changes("orders", order(2, 1), [], [])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("warehouse unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(sqlite_store, "write_batch", fail)
+        with pytest.raises(RuntimeError):
+            sqlite_store._apply_changes("orders", order(5, 2), [], [])  # as on the warehouse: no transaction
+    assert rollups.check().empty
+    sqlite_store.apply_changes("orders", order(5, 2), [], [])
+    assert rollups.check().empty
+
+
+def test_grid_edits_move_rollups(sqlite_store):
+    sqlite_store.apply_changes("orders", pd.concat([order(2, 1), order(4, 1).assign(id="o2")]), [], [])
+    loaded = "2026-01-01 12:00:00"
+    updates = pd.DataFrame({"id": ["o1"], "last_update_date": [loaded], "quantity": [7],
+                            "order_date": [datetime(2026, 1, 3, 12)]})
+    deletes = pd.DataFrame({"id": ["o2"], "last_update_date": [loaded]})
+    assert sqlite_store.apply_edits("orders", updates, deletes, datetime(2026, 1, 4)) == []
+    assert rollups.check().empty
+    day = sqlite_store.rollup_rows("daily_product_sales").set_index("day")
+    assert int(day["orders"].sum()) == 1 and int(day["units"].sum()) == 7
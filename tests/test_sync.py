@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pandas as pd
+
+import store
+from backends import utcnow
+from sync import TableSnapshot
+
+
+def write(rows, mode="upsert"):
+    store.get_backend().write_batch("customers", pd.DataFrame(rows), mode)
+
+
+def customer(id_, name, created, updated=None):
+    return {"id": id_, "name": name, "email": f"{id_}@example.com", "phone": "1", "address": "x",
+            "created_date": created, "last_update_date": updated or created}
+
+
+def snapshot(**kwargs):
+    return TableSnapshot("customers", store.get_backend, **{"overlap": 5.0, "reconcile_every": 3600.0, **kwargs})
+
+
+def test_full_load_then_incremental_refresh(sqlite_store):
+    now = utcnow()
+    write([customer("a", "Ann", now - timedelta(minutes=2)), customer("b", "Bob", now - timedelta(minutes=1))])
+    snap = snapshot()
+    assert snap.rows()["id"].tolist() == ["b", "a"]
+    write([customer("a", "Ann2", now - timedelta(minutes=2), now)])
+    assert snap.rows().set_index("id").loc["a", "name"] == "Ann2"
+    assert snap.stats["full_loads"] == 1 and snap.stats["refreshes"] == 1
+
+
+def test_new_rows_keep_newest_first(sqlite_store):
+    # Regression: new rows are prepended without a sort when they are newer than every
+    # row held; a row created earlier (a backdated import) must still land in order.
+    now = utcnow()
+    write([customer("a", "Ann", now - timedelta(hours=3)), customer("c", "Cy", now - timedelta(hours=1))])
+    snap = snapshot()
+    snap.rows()
+    write([customer("d", "Dee", now), customer("b", "Bob", now - timedelta(hours=2), now)])
+    assert snap.rows()["id"].tolist() == ["d", "c", "b", "a"]
+    write([customer("e", "Eve", now + timedelta(seconds=1))])
+    assert snap.rows()["id"].tolist() == ["e", "d", "c", "b", "a"]
+    assert snap.rows()["id"].tolist() == store.get_backend().list_rows("customers")["id"].tolist()
+
+
+def test_rows_committed_late_within_the_overlap_are_fetched(sqlite_store):
+    now = utcnow()
+    write([customer("a", "Ann", now)])
+    snap = snapshot()
+    snap.rows()
+    # Stamped before the high-water mark (statement time), visible only now (commit time).
+    write([customer("b", "Bob", now - timedelta(seconds=2))])
+    assert sorted(snap.rows()["id"]) == ["a", "b"]
+
+
+def test_delete_elsewhere_triggers_reconcile(sqlite_store):
+    now = utcnow()
+    write([customer("a", "Ann", now - timedelta(minutes=1)), customer("b", "Bob", now)])
+    snap = snapshot()
+    snap.rows()
+    store.get_backend().delete_batch("customers", ["a"])
+    assert snap.rows()["id"].tolist() == ["b"]
+    assert snap.stats["reconciles"] == 1 and snap.stats["rows_deleted"] == 1
+
+
+def test_periodic_reconcile_catches_insert_and_delete_that_cancel_out(sqlite_store):
+    now = utcnow()
+    write([customer("a", "Ann", now - timedelta(hours=1))])
+    snap = snapshot(overlap=0.0, reconcile_every=0.0)
+    snap.rows()
+    store.get_backend().delete_batch("customers", ["a"])
+    write([customer("b", "Bob", now)])
+    assert snap.rows()["id"].tolist() == ["b"]
+
+
+def test_discard_drops_rows_at_once(sqlite_store):
+    now = utcnow()
+    write([customer("a", "Ann", now)])
+    snap = snapshot()
+    snap.rows()
+    store.get_backend().delete_batch("customers", ["a"])  # this process's delete
+    snap.discard(["a", "unknown"])
+    assert snap.rows().empty
+    assert snap.stats["reconciles"] == 0
@@ -0,0 +1,253 @@
+import pandas as pd
+import pytest
+
+import rollups
+import store
+import writebehind
+from backends import utcnow
+from writebehind import WriteQueue, coalesce, net_changes
+
+
+def customer(name, **values):
+    return {"name": name, "email": f"{name.lower()}@example.com", "phone": "1", "address": "x",
+            "created_date": utcnow(), **values}
+
+
+def order(customer_id, product_id, quantity, price=2.0):
+    now = utcnow()
+    return {"customer_id": customer_id, "product_id": product_id, "quantity": quantity,
+            "total_amount": quantity * price, "order_date": now, "created_date": now}
+
+
+@pytest.fixture
+def queue(sqlite_store, tmp_path):
+    q = WriteQueue(str(tmp_path / "journal.db"), store.get_backend, retry_seconds=0.0, max_attempts=3)
+    yield q
+    q.close()
+
+
+def drain(q, rounds=20):
+    for _ in range(rounds):
+        if not q.pending()["count"]:
+            return
+        q.flush_once()
+    raise AssertionError(f"journal not drained: {q.pending()}")
+
+
+def rows(table):
+    return store.get_backend().list_rows(table).set_index("id")
+
+
+# -- coalesce
+def test_coalesce_folds_each_row():
+    net, last_seq = coalesce([
+        (1, "customers", "insert", "a", {"name": "A"}),
+        (2, "customers", "update", "a", {"phone": "2"}),
+        (3, "customers", "update", "b", {"name": "B"}),
+        (4, "customers", "update", "b", {"name": "B2"}),
+        (5, "customers", "insert", "c", {"name": "C"}),
+        (6, "customers", "delete", "c", None),
+        (7, "customers", "delete", "d", None),
+    ])
+    assert net == {
+        ("customers", "a"): ("insert", {"name": "A", "phone": "2"}),
+        ("customers", "b"): ("update", {"name": "B2"}),
+        ("customers", "c"): ("noop", None),
+        ("customers", "d"): ("delete", None),
+    }
+    assert last_seq == 7
+
+
+def test_coalesce_stops_before_reinsert_after_delete():
+    net, last_seq = coalesce([
+        (1, "customers", "delete", "a", None),
+        (2, "customers", "update", "b", {"name": "B"}),
+        (3, "customers", "insert", "a", {"name": "A2"}),
+    ])
+    assert net == {("customers", "a"): ("delete", None), ("customers", "b"): ("update", {"name": "B"})}
+    assert last_seq == 2
+
+
+def test_net_changes_for_reads():
+    net = net_changes([
+        ("insert", "a", {"name": "A"}, 0.0),
+        ("update", "a", {"name": "A2"}, 1.0),
+        ("delete", "b", None, 2.0),
+        ("update", "b", {"name": "gone"}, 3.0),
+        ("update", "c", {"name": "C"}, 4.0),
+    ])
+    assert net["a"][0] == "insert" and net["a"][1]["name"] == "A2"
+    assert net["b"] == ("delete", None)
+    assert net["c"][0] == "update" and net["c"][1]["name"] == "C"
+
+
+# -- flushing to SQLite
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 500])
+def test_entries_apply_in_journal_order(queue, batch_size):
+    # Regression: a row's entries, spread over any number of flushes, must reach the
+    # backend in the order they were journaled: the row ends with the last values.
+    queue.batch_size = batch_size
+    queue.enqueue("customers", "insert", "c1", customer("First"))
+    queue.enqueue("customers", "insert", "c2", customer("Other"))
+    queue.enqueue("customers", "update", "c1", {"phone": "2"})
+    queue.enqueue("customers", "delete", "c1")
+    queue.enqueue("customers", "update", "c2", {"phone": "5"})
+    queue.enqueue("customers", "insert", "c1", customer("Second"))
+    queue.enqueue("customers", "update", "c1", {"phone": "9"})
+    queue.enqueue("customers", "update", "c2", {"phone": "6"})
+    queue.enqueue("customers", "delete", "c2")
+    queue.enqueue("customers", "insert", "c3", customer("Third"))
+    drain(queue)
+    stored = rows("customers")
+    assert sorted(stored.index) == ["c1", "c3"]
+    assert stored.loc["c1", "name"] == "Second" and stored.loc["c1", "phone"] == "9"
+
+
+def test_orders_reinserted_keep_rollups_consistent(queue):
+    queue.enqueue("customers", "insert", "c1", customer("Ann"))
+    queue.enqueue("products", "insert", "p1", {"name": "Widget", "description": "", "price": 2.0, "stock": 100,
+                                               "created_date": utcnow()})
+    queue.enqueue("orders", "insert", "o1", order("c1", "p1", 1))
+    queue.enqueue("orders", "delete", "o1")
+    queue.enqueue("orders", "insert", "o1", order("c1", "p1", 3))
+    queue.enqueue("orders", "insert", "o2", order("c1", "p1", 2))
+    drain(queue)
+    assert rows("orders")["quantity"].to_dict() == {"o1": 3, "o2": 2}
+    assert rollups.check().empty
+
+
+def test_values_are_bound_not_inlined(queue):
+    tricky = "O'Neil \\' ); DROP TABLE customers; --"
+    queue.enqueue("customers", "insert", "c1", customer(tricky))
+    queue.enqueue("customers", "insert", "c2", customer("Bob"))
+    queue.enqueue("customers", "update", "c2", {"address": "back\\slash"})
+    drain(queue)
+    stored = rows("customers")
+    assert stored.loc["c1", "name"] == tricky and stored.loc["c2", "address"] == "back\\slash"
+
+
+def test_journal_survives_restart(sqlite_store, tmp_path):
+    path = str(tmp_path / "journal.db")
+    first = WriteQueue(path, store.get_backend)
+    first.enqueue("customers", "insert", "c1", customer("Ann"))
+    first.close()
+    second = WriteQueue(path, store.get_backend)
+    try:
+        assert second.pending()["count"] == 1
+        drain(second)
+        assert list(rows("customers").index) == ["c1"]
+    finally:
+        second.close()
+
+
+# -- failures
+def test_failing_entry_is_dead_lettered_and_the_rest_flush(queue):
+    queue.enqueue("customers", "insert", "bad", customer("Bad"))
+    queue.enqueue("customers", "update", "bad", {"no_such_column": 1})
+    queue.enqueue("customers", "insert", "good", customer("Good"))
+    queue.flush_once()
+    assert queue.pending()["failing"] == 1
+    drain(queue)
+    assert list(rows("customers").index) == ["good"]
+    pending = queue.pending()
+    assert pending["count"] == 0 and pending["dead_letters"] == 2
+    letters = queue.dead_letters()
+    assert letters["id"].tolist() == ["bad", "bad"] and (letters["attempts"] == 3).all()
+    assert "no_such_column" in letters["last_error"].iloc[0]
+
+
+def test_dead_letter_retry_and_discard(queue):
+    queue.enqueue("customers", "update", "c1", {"no_such_column": 1})
+    drain(queue)
+    seq = int(queue.dead_letters()["seq"].iloc[0])
+    assert queue.retry_dead_letter(seq) is not None
+    assert queue.pending()["count"] == 1 and queue.pending()["dead_letters"] == 0
+    drain(queue)
+    seq = int(queue.dead_letters()["seq"].iloc[0])
+    queue.discard_dead_letter(seq)
+    assert queue.dead_letters().empty
+    assert queue.retry_dead_letter(seq) is None
+
+
+def test_held_rows_do_not_block_the_rows_behind_them(sqlite_store, tmp_path):
+    q = WriteQueue(str(tmp_path / "journal.db"), store.get_backend, batch_size=2, retry_seconds=60.0)
+    try:
+        q.enqueue("customers", "insert", "bad", customer("Bad"))
+        q.enqueue("customers", "update", "bad", {"no_such_column": 1})
+        q.enqueue("customers", "update", "bad", {"phone": "2"})
+        for name in ("A", "B", "C"):
+            q.enqueue("customers", "insert", name.lower(), customer(name))
+        q.flush_once()  # "bad" fails and is held for a minute, its entries filling a batch
+        for _ in range(3):
+            q.flush_once()
+        assert sorted(rows("customers").index) == ["a", "b", "c"]
+        assert q.pending()["count"] == 3 and q.waiting() == 0
+        assert q.wait_idle(timeout=1.0)
+    finally:
+        q.close()
+
+
+class _Down:
+    """A backend that cannot be reached."""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("warehouse unreachable")
+        return fail
+
+
+def test_backend_outage_is_retried_not_dead_lettered(sqlite_store, tmp_path):
+    q = WriteQueue(str(tmp_path / "journal.db"), _Down, retry_seconds=0.0, max_attempts=1)
+    try:
+        q.enqueue("customers", "insert", "c1", customer("Ann"))
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                q.flush_once()
+        assert q.pending()["count"] == 1 and q.pending()["dead_letters"] == 0
+    finally:
+        q.close()
+
+
+# -- reading your own writes
+@pytest.fixture
+def write_behind(sqlite_store, tmp_path, monkeypatch):
+    """store.py in write-behind mode with the flush thread stopped; yields the queue."""
+    monkeypatch.setattr(writebehind, "WRITE_BEHIND_ENABLED", True)
+    monkeypatch.setattr(writebehind, "WRITE_BEHIND_PATH", str(tmp_path / "journal.db"))
+    monkeypatch.setattr(store, "_write_queue", None)
+    q = store.write_queue()
+    q.stop()
+    yield q
+    q.close()
+
+
+def test_pending_writes_show_in_reads(write_behind):
+    kept = store.create_customer("Ann", "ann@example.com", "1", "x")
+    removed = store.create_customer("Bob", "bob@example.com", "1", "x")
+    drain(write_behind)
+    new = store.create_customer("Cy", "cy@example.com", "1", "x")
+    store.update_customer(kept, "Ann2", "ann@example.com", "1", "x")
+    store.delete_customer(removed)
+    assert write_behind.pending()["count"] == 3
+
+    hit = store.search_rows("customers", "cy")[0]
+    assert store.table_rows("customers").row(hit.id)["name"] == "Cy"
+    assert store.list_customers()["name"].tolist() == ["Cy", "Ann2"]
+    page = store.list_page("customers", limit=1)
+    assert page.rows["name"].tolist() == ["Cy"]
+    assert store.list_page("customers", limit=1, after=page.next_cursor).rows["name"].tolist() == ["Ann2"]
+
+    drain(write_behind)
+    assert store.list_customers()["name"].tolist() == ["Cy", "Ann2"]
+    assert rows("customers").loc[new, "name"] == "Cy"
+
+
+def test_overlay_page_respects_filters():
+    page_rows = pd.DataFrame({"id": ["a", "b"], "name": ["Ann", "Bob"],
+                              "created_date": ["2026-01-02 00:00:00", "2026-01-01 00:00:00"]})
+    page = store.Page(page_rows, None)
+    changes = {"c": ("insert", {"name": "Carl", "created_date": "2026-01-03T00:00:00"}),
+               "a": ("update", {"name": "Zoe"})}
+    out = writebehind.overlay_page("customers", page, changes, 10, None, (("name", "contains", "o"),),
+                                   "created_date", True)
+    assert out.rows["id"].tolist() == ["a", "b"]
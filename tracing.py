@@ -0,0 +1,161 @@
+# tracing.py
+"""
+Per-query timing for every warehouse call.
+
+store.execute() records each statement as a ``QueryTrace``: how long it waited for
+a pooled connection (acquire), ran the statement (execute), fetched the rows
+(fetch) and built the DataFrame (frame), plus rows and result bytes. Each trace is
+
+- added to the current script run's ``RunTrace`` (see ``begin_run``), which the
+  app's debug panel shows for the current rerun;
+- written to the slow-query log when it took longer than STORE_SLOW_QUERY_MS;
+- passed to every hook registered with ``add_hook``.
+
+The current run is a context variable: the loader copies the caller's context into
+its worker threads, so reads it runs in parallel count towards the same rerun.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+PHASES = ("acquire", "execute", "fetch", "frame")
+
+SLOW_QUERY_MS = float(os.getenv("STORE_SLOW_QUERY_MS", "500"))
+# Optional file for the slow-query log; otherwise it goes to the standard logging setup.
+SLOW_QUERY_LOG = os.getenv("STORE_SLOW_QUERY_LOG")
+
+slow_query_log = logging.getLogger("store.slow_queries")
+if SLOW_QUERY_LOG:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_log.addHandler(_handler)
+    slow_query_log.setLevel(logging.INFO)
+
+
+class QueryTrace:
+    """Timings of one statement. Created by ``start``; phases are closed with ``mark``."""
+
+    __slots__ = ("label", "phases", "rows", "nbytes", "error", "started", "_last", "_run")
+
+    def __init__(self, label: str, run: Optional["RunTrace"]):
+        self.label = label
+        self.phases: Dict[str, float] = {}
+        self.rows = 0
+        self.nbytes = 0
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self._last = time.perf_counter()
+        self._run = run
+
+    def mark(self, phase: str):
+        """Ends ``phase``: it lasted from the previous mark (or start) until now."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def resume(self):
+        """Restarts the clock without recording, e.g. after handing a streamed batch to the consumer."""
+        self._last = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def finish(self, frame: Optional[pd.DataFrame] = None, error: Optional[BaseException] = None):
+        if error is not None:
+            self.mark("error")
+            self.error = f"{type(error).__name__}: {error}"
+        slow = self.seconds * 1000 >= SLOW_QUERY_MS
+        if frame is not None:
+            self.rows = len(frame)
+            if not self.nbytes and (self._run is not None or slow):
+                # Without Arrow fetching (which records the Arrow result size) the DB-API does
+                # not expose wire bytes; the result's in-memory size is the closest measure.
+                self.nbytes = int(frame.memory_usage(deep=True).sum())
+        if self._run is not None:
+            self._run.add(self)
+        if slow:
+            slow_query_log.warning("%s", self.describe())
+        for hook in list(_hooks):
+            hook(self)
+
+    def describe(self) -> str:
+        phases = " ".join(f"{p}={s * 1000:.1f}ms" for p, s in self.phases.items())
+        text = f"{self.seconds * 1000:.1f}ms {self.label!r} rows={self.rows} bytes={self.nbytes} {phases}"
+        return text + (f" error={self.error}" if self.error else "")
+
+    def as_dict(self) -> dict:
+        row = {"statement": self.label, "total_ms": self.seconds * 1000}
+        row.update({f"{p}_ms": self.phases.get(p, 0.0) * 1000 for p in PHASES})
+        row.update(rows=self.rows, bytes=self.nbytes, error=self.error)
+        return row
+
+
+class RunTrace:
+    """Every QueryTrace of one script run (one Streamlit rerun)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._queries: List[QueryTrace] = []
+        self._lock = threading.Lock()
+
+    def add(self, trace: QueryTrace):
+        with self._lock:
+            self._queries.append(trace)
+
+    @property
+    def queries(self) -> List[QueryTrace]:
+        with self._lock:
+            return list(self._queries)
+
+    def totals(self) -> dict:
+        queries = self.queries
+        out = {
+            "queries": len(queries),
+            "rows": sum(q.rows for q in queries),
+            "bytes": sum(q.nbytes for q in queries),
+            "errors": sum(1 for q in queries if q.error),
+            "query_ms": sum(q.seconds for q in queries) * 1000,
+            "wall_ms": (time.perf_counter() - self.started) * 1000,
+        }
+        out.update({f"{p}_ms": sum(q.phases.get(p, 0.0) for q in queries) * 1000 for p in PHASES})
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        columns = ["statement", "total_ms"] + [f"{p}_ms" for p in PHASES] + ["rows", "bytes", "error"]
+        return pd.DataFrame([q.as_dict() for q in self.queries], columns=columns)
+
+
+_current_run: contextvars.ContextVar[Optional[RunTrace]] = contextvars.ContextVar("store_run_trace", default=None)
+_hooks: List[Callable[[QueryTrace], None]] = []
+
+
+def begin_run() -> RunTrace:
+    """Starts collecting the queries of the current script run and returns the collector."""
+    run = RunTrace()
+    _current_run.set(run)
+    return run
+
+
+def current_run() -> Optional[RunTrace]:
+    return _current_run.get()
+
+
+def start(label: str) -> QueryTrace:
+    """Starts timing one statement; the first ``mark`` closes the acquire phase."""
+    return QueryTrace(label, _current_run.get())
+
+
+def add_hook(hook: Callable[[QueryTrace], None]):
+    """Registers ``hook(trace)`` to be called after every finished statement."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[QueryTrace], None]):
+    _hooks.remove(hook)
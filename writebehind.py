@@ -0,0 +1,525 @@
+# writebehind.py
+"""
+Write-behind queue for the CRUD writes (STORE_WRITE_BEHIND=1).
+
+A single-row INSERT/UPDATE/DELETE on the warehouse can take seconds when it is cold or
+busy, and a Streamlit form submit waits for it. In write-behind mode store.py appends
+each mutation to a local SQLite journal (STORE_WRITE_BEHIND_PATH) and returns at once
+with the generated id; a background thread flushes the journal to the backend.
+
+- Durable: an entry is committed to the journal before the write returns, and removed
+  only after the backend applied it, so a restart resumes with whatever was pending.
+- Coalesced: a flush takes up to STORE_WRITE_BEHIND_BATCH entries in journal order and
+  folds each row's entries into one net change (insert + updates -> one insert;
+  updates -> one update; anything + delete -> one delete; insert + delete -> nothing).
+  The changes then go out per table as one delete, one update and one upsert batch
+  (StoreBackend.apply_changes).
+- Ordered: entries of one row are applied in the order they were made. A batch never
+  reorders across flushes, and a delete followed by a new insert of the same id ends the
+  batch, so they go out in two flushes.
+- Retried: a failed flush stays in the journal and is retried, with the wait doubling
+  from STORE_WRITE_BEHIND_RETRY_SECONDS up to a minute. Rewriting a batch is harmless
+  (rows are upserted by id). A failing batch is retried one row at a time from the
+  front; when a row fails alone while the backend answers, the fault is that row's
+  (a constraint violation, a row deleted elsewhere): its entries wait for their own
+  retry while the rest go ahead, and after STORE_WRITE_BEHIND_MAX_ATTEMPTS failures they
+  move to the dead_letters table, which the UI lists to retry or discard.
+
+Reads go to the backend with the journal laid over them (``overlay_rows`` /
+``overlay_page``), so a write shows up in lists and lookups as soon as it is journaled;
+``pending()`` tells the UI how much is still waiting. One journal belongs to one
+server process: each replica needs its own path.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from backends import Page, filter_frame, keyset_mask, utcnow
+from schema import TABLE_SCHEMAS
+
+WRITE_BEHIND_ENABLED = os.getenv("STORE_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_PATH = os.getenv("STORE_WRITE_BEHIND_PATH", "write_behind.db")
+WRITE_BEHIND_BATCH = int(os.getenv("STORE_WRITE_BEHIND_BATCH", "500"))
+WRITE_BEHIND_RETRY_SECONDS = float(os.getenv("STORE_WRITE_BEHIND_RETRY_SECONDS", "1"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("STORE_WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+MAX_RETRY_SECONDS = 60.0
+
+OPS = ("insert", "update", "delete")
+# Inserts are applied parents first, deletes children first.
+TABLE_ORDER = ("customers", "products", "orders")
+
+_JOURNAL_DDL = """
+CREATE TABLE IF NOT EXISTS journal (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  tbl TEXT NOT NULL,
+  op TEXT NOT NULL,
+  entity_id TEXT NOT NULL,
+  payload TEXT,
+  enqueued_at REAL NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT
+)
+"""
+
+# Entries given up on after WRITE_BEHIND_MAX_ATTEMPTS failures of their own.
+_DEAD_LETTERS_DDL = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+  seq INTEGER PRIMARY KEY,
+  tbl TEXT NOT NULL,
+  op TEXT NOT NULL,
+  entity_id TEXT NOT NULL,
+  payload TEXT,
+  enqueued_at REAL NOT NULL,
+  attempts INTEGER NOT NULL,
+  last_error TEXT,
+  failed_at REAL NOT NULL
+)
+"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+
+def coalesce(entries: Iterable[Tuple[int, str, str, str, Optional[dict]]]) -> Tuple[Dict[Tuple[str, str], tuple], int]:
+    """
+    Folds (seq, table, op, id, values) entries, in seq order, into one net change per
+    row: ("insert", values) / ("update", values) / ("delete", None) / ("noop", None).
+    Stops before an insert of a row deleted earlier in the batch. Returns the changes and
+    the last seq they cover.
+    """
+    net: Dict[Tuple[str, str], tuple] = {}
+    last_seq = 0
+    for seq, table, op, id_, values in entries:
+        key = (table, id_)
+        state, current = net.get(key, (None, None))
+        if op == "insert":
+            if state is not None:
+                break  # re-insert after a delete: next flush
+            net[key] = ("insert", dict(values))
+        elif op == "update":
+            if state in ("insert", "update"):
+                net[key] = (state, {**current, **values})
+            elif state is None:
+                net[key] = ("update", dict(values))
+            # update after delete (or of a row inserted and deleted here): the row is gone
+        elif op == "delete":
+            net[key] = ("noop", None) if state in ("insert", "noop") else ("delete", None)
+        else:
+            raise ValueError(f"Unknown journal op: {op}")
+        last_seq = seq
+    return net, last_seq
+
+
+def net_changes(entries: Iterable[Tuple[str, str, Optional[dict], float]]) -> Dict[str, tuple]:
+    """
+    Folds one table's (op, id, values, enqueued_at) entries, in seq order, into what a
+    read should show per row: ("insert", values) for a row not in the backend yet,
+    ("update", values) for changed columns, or ("delete", None).
+    """
+    net: Dict[str, tuple] = {}
+    for op, id_, values, enqueued_at in entries:
+        stamp = {"last_update_date": datetime.fromtimestamp(enqueued_at, timezone.utc).replace(tzinfo=None).isoformat()}
+        state, current = net.get(id_, (None, None))
+        if op == "insert":
+            net[id_] = ("insert", {**values, **stamp})
+        elif op == "update":
+            if state in ("insert", "update"):
+                net[id_] = (state, {**current, **values, **stamp})
+            elif state is None:
+                net[id_] = ("update", {**values, **stamp})
+        elif op == "delete":
+            net[id_] = ("delete", None)
+    return net
+
+
+def _like(values: pd.Series, like: pd.Series, col_type: str) -> pd.Series:
+    """Journal values as ``like`` holds them: timestamps as datetimes, or as the text SQLite stores."""
+    if col_type != "TIMESTAMP":
+        return values
+    ts = pd.to_datetime(values, format="ISO8601")
+    if not pd.api.types.is_datetime64_any_dtype(like):
+        return ts.map(lambda v: v.isoformat(sep=" "), na_action="ignore").astype(object)
+    return ts.dt.tz_localize("UTC").dt.tz_convert(like.dt.tz) if like.dt.tz is not None else ts
+
+
+def overlay_rows(table: str, df: pd.DataFrame, changes: Dict[str, tuple]) -> pd.DataFrame:
+    """
+    ``df`` (rows of ``table`` read from the backend, newest first) with the journaled
+    ``changes`` (see net_changes) applied: deleted rows dropped, updates applied and new
+    rows added in front.
+    """
+    if not changes:
+        return df
+    schema = TABLE_SCHEMAS[table]
+    inserted = {id_: values for id_, (state, values) in changes.items() if state == "insert"}
+    updated = {id_: values for id_, (state, values) in changes.items() if state == "update"}
+    gone = {id_ for id_, (state, _) in changes.items() if state == "delete"} | set(inserted)
+    df = df[~df["id"].isin(gone)].reset_index(drop=True)
+    if updated:
+        df = df.copy()
+        ids = df["id"].tolist()
+        for id_, values in updated.items():
+            if id_ in ids:
+                at = ids.index(id_)
+                for column, value in values.items():
+                    if column in df.columns:
+                        df.at[at, column] = _like(pd.Series([value]), df[column], schema.get(column))[0]
+    if inserted:
+        new = pd.DataFrame.from_records([{"id": id_, **values} for id_, values in inserted.items()], columns=list(df.columns))
+        for column in new.columns:
+            new[column] = _like(new[column], df[column], schema.get(column))
+        new = new.sort_values("created_date", ascending=False, kind="stable")
+        df = pd.concat([new, df], ignore_index=True) if len(df) else new.reset_index(drop=True)
+    return df
+
+
+def overlay_page(table: str, page: Page, changes: Dict[str, tuple], limit: int, after, filters,
+                 sort_by: str, descending: bool) -> Page:
+    """
+    ``page`` of ``table`` with the journaled ``changes`` applied like overlay_rows(). A
+    new row joins the page whose keyset range holds it; rows pushed past ``limit`` move
+    the cursor back, so the next page reads them from the backend.
+    """
+    if not changes:
+        return page
+    on_page = set(page.rows["id"])
+    rows = overlay_rows(table, page.rows, {id_: c for id_, c in changes.items() if c[0] == "insert" or id_ in on_page})
+    rows = filter_frame(rows, filters)
+    rows = rows[rows["id"].isin(on_page) | keyset_mask(rows, after, page.next_cursor, sort_by, descending)]
+    rows = rows.sort_values([sort_by, "id"], ascending=not descending, kind="stable").reset_index(drop=True)
+    if len(rows) <= limit:
+        return Page(rows, page.next_cursor)
+    rows = rows.iloc[:limit]
+    last = rows.iloc[-1]
+    return Page(rows, (last[sort_by], last["id"]))
+
+
+_EMPTY = pd.DataFrame(columns=["id"])
+
+
+def _backoff(retry_seconds: float, attempts: int) -> float:
+    return min(retry_seconds * 2 ** (attempts - 1), MAX_RETRY_SECONDS)
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _frame(table: str, rows: List[dict]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows)
+    for column in df.columns:
+        if TABLE_SCHEMAS[table].get(column) == "TIMESTAMP":
+            df[column] = pd.to_datetime(df[column], format="ISO8601")
+    return df
+
+
+class WriteQueue:
+    """Journal plus flush thread. ``backend()`` returns the backend to flush to."""
+
+    def __init__(self, path: str, backend: Callable[[], object],
+                 on_flush: Optional[Callable[[List[str]], None]] = None,
+                 batch_size: int = WRITE_BEHIND_BATCH, retry_seconds: float = WRITE_BEHIND_RETRY_SECONDS,
+                 max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS):
+        self.path = path
+        self._backend = backend
+        self._on_flush = on_flush
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(_JOURNAL_DDL)
+        self._db.execute(_DEAD_LETTERS_DDL)
+        if "attempts" not in {row[1] for row in self._db.execute("PRAGMA table_info(journal)")}:
+            # Journal left by a version without per-entry retries.
+            self._db.execute("ALTER TABLE journal ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("ALTER TABLE journal ADD COLUMN last_error TEXT")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.attempts = 0  # consecutive failed flushes
+        self.last_error: Optional[str] = None
+        self._held: Dict[int, float] = {}  # seq of a failing entry -> monotonic time of its retry
+        self.stats = {"enqueued": 0, "flushed": 0, "coalesced": 0, "batches": 0, "failures": 0, "dead_lettered": 0}
+
+    # -- producer side
+    def enqueue(self, table: str, op: str, id_: str, values: Optional[dict] = None) -> int:
+        """Journals one mutation and returns its sequence number; the write happens later."""
+        if table not in TABLE_SCHEMAS:
+            raise ValueError(f"Unknown table: {table}")
+        if op not in OPS:
+            raise ValueError(f"Unknown journal op: {op}")
+        payload = json.dumps(values, default=_json_default) if values is not None else None
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO journal (tbl, op, entity_id, payload, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                (table, op, id_, payload, time.time()),
+            )
+        self.stats["enqueued"] += 1
+        self._wake.set()
+        return cur.lastrowid
+
+    def pending(self) -> dict:
+        """
+        Entries waiting, age of the oldest in seconds, and the last flush error while
+        failing; entries failing on their own (``failing``, with the first one's error)
+        and entries given up on (``dead_letters``).
+        """
+        with self._lock:
+            count, oldest = self._db.execute("SELECT COUNT(*), MIN(enqueued_at) FROM journal").fetchone()
+            failing = self._db.execute(
+                "SELECT COUNT(*), (SELECT last_error FROM journal WHERE attempts > 0 ORDER BY seq LIMIT 1) "
+                "FROM journal WHERE attempts > 0"
+            ).fetchone()
+            dead = self._db.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return {
+            "count": count,
+            "oldest_seconds": time.time() - oldest if oldest is not None else 0.0,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "failing": failing[0],
+            "failing_error": failing[1],
+            "dead_letters": dead,
+        }
+
+    def pending_changes(self, table: str) -> Dict[str, tuple]:
+        """Net journaled change per row of ``table`` (see net_changes), for reads to lay over the backend."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT op, entity_id, payload, enqueued_at FROM journal WHERE tbl = ? ORDER BY seq", (table,)
+            ).fetchall()
+        return net_changes((op, id_, json.loads(payload) if payload else None, at) for op, id_, payload, at in rows)
+
+    # -- dead letters
+    def dead_letters(self) -> pd.DataFrame:
+        """Writes given up on, oldest first: seq, table, op, id, values, attempts, last_error, failed_at."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, tbl, op, entity_id, payload, attempts, last_error, failed_at FROM dead_letters ORDER BY seq"
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=["seq", "table", "op", "id", "values", "attempts", "last_error", "failed_at"])
+        df["values"] = [json.loads(payload) if payload else None for payload in df["values"]]
+        df["failed_at"] = pd.to_datetime(df["failed_at"], unit="s")
+        return df
+
+    def retry_dead_letter(self, seq: int) -> Optional[int]:
+        """Journals a dead-lettered write again, behind the current entries; returns its new seq (None if unknown)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT tbl, op, entity_id, payload FROM dead_letters WHERE seq = ?", (seq,)).fetchone()
+                if row is None:
+                    self._db.execute("ROLLBACK")
+                    return None
+                cur = self._db.execute(
+                    "INSERT INTO journal (tbl, op, entity_id, payload, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                    (*row, time.time()),
+                )
+                self._db.execute("DELETE FROM dead_letters WHERE seq = ?", (seq,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return cur.lastrowid
+
+    def discard_dead_letter(self, seq: int):
+        """Drops a dead-lettered write for good."""
+        with self._lock:
+            self._db.execute("DELETE FROM dead_letters WHERE seq = ?", (seq,))
+
+    # -- flush thread
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="store-write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._stopping = False
+
+    def waiting(self, table: Optional[str] = None) -> int:
+        """
+        Entries (of ``table``, or all) the next flushes can apply: all but those of rows
+        with a failing entry.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM journal AS j WHERE (:tbl IS NULL OR j.tbl = :tbl) AND NOT EXISTS "
+                "(SELECT 1 FROM journal AS f WHERE f.tbl = j.tbl AND f.entity_id = j.entity_id AND f.attempts > 0)",
+                {"tbl": table},
+            ).fetchone()[0]
+
+    def wait_idle(self, timeout: Optional[float] = None, table: Optional[str] = None) -> bool:
+        """
+        Blocks until every entry (of ``table``, or all) that can be applied has been (or
+        ``timeout``); returns whether it got there. Rows failing on their own, waiting
+        for a retry or for the dead-letter table, are not waited for.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self.waiting(table):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wake.set()
+                self._idle.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                flushed = self.flush_once()
+            except Exception as e:  # the backend failed: keep the entries; retry with backoff
+                self.attempts += 1
+                self.stats["failures"] += 1
+                self.last_error = _error(e)
+                self._wake.wait(_backoff(self.retry_seconds, self.attempts))
+                self._wake.clear()
+                continue
+            self.attempts, self.last_error = 0, None
+            if not flushed:
+                with self._idle:
+                    self._idle.notify_all()
+                self._wake.wait(1.0)
+                self._wake.clear()
+
+    def flush_once(self) -> int:
+        """
+        Applies up to one batch of journal entries; returns how many were removed. Raises
+        when the backend fails; an entry failing on its own is retried or dead-lettered.
+        """
+        now = time.monotonic()
+        self._held = {seq: at for seq, at in self._held.items() if at > now}
+        held = list(self._held)
+        # Rows with an entry waiting for its retry sit out, with all their entries; the
+        # batch is taken from the rest, however many entries the held rows have.
+        skip = (
+            "WHERE (tbl, entity_id) NOT IN (SELECT tbl, entity_id FROM journal WHERE seq IN "
+            f"({', '.join('?' * len(held))})) " if held else ""
+        )
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT seq, tbl, op, entity_id, payload FROM journal {skip}ORDER BY seq LIMIT ?",
+                (*held, self.batch_size),
+            ).fetchall()
+        if not rows:
+            return 0
+        head = [r for r in rows if (r[1], r[3]) == (rows[0][1], rows[0][3])]  # the first row's entries
+        try:
+            return self._apply(rows)
+        except Exception as e:
+            error = e
+        if len(head) < len(rows):
+            # Something in the batch fails: go on one row at a time until the failing one is first.
+            try:
+                return self._apply(head)
+            except Exception as e:
+                error = e
+        # The row fails alone. If the backend answers otherwise, the fault is the row's.
+        try:
+            self._backend().count_rows(head[0][1])
+        except Exception:
+            raise error
+        self._failed([r[0] for r in head], error)
+        return 0
+
+    def _failed(self, seqs: List[int], error: Exception):
+        """
+        Counts a failure of the entries ``seqs`` (one row's, the first carrying the count);
+        moves them to dead_letters after ``max_attempts``.
+        """
+        self.stats["failures"] += 1
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                attempts = self._db.execute(
+                    "UPDATE journal SET attempts = attempts + 1, last_error = ? WHERE seq = ? RETURNING attempts",
+                    (_error(error), seqs[0]),
+                ).fetchone()[0]
+                if attempts >= self.max_attempts:
+                    self._db.executemany(
+                        "INSERT INTO dead_letters (seq, tbl, op, entity_id, payload, enqueued_at, attempts, last_error, failed_at) "
+                        "SELECT seq, tbl, op, entity_id, payload, enqueued_at, ?, ?, ? FROM journal WHERE seq = ?",
+                        [(attempts, _error(error), time.time(), seq) for seq in seqs],
+                    )
+                    self._db.executemany("DELETE FROM journal WHERE seq = ?", [(seq,) for seq in seqs])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if attempts >= self.max_attempts:
+            self.stats["dead_lettered"] += len(seqs)
+            self._held.pop(seqs[0], None)
+            self._wake.set()
+        else:
+            self._held[seqs[0]] = time.monotonic() + _backoff(self.retry_seconds, attempts)
+
+    def _apply(self, rows: List[tuple]) -> int:
+        """Applies journal ``rows`` (in seq order) to the backend and removes those it covered."""
+        entries = [(seq, table, op, id_, json.loads(payload) if payload else None) for seq, table, op, id_, payload in rows]
+        net, last_seq = coalesce(entries)
+        taken = [e[0] for e in entries if e[0] <= last_seq]
+
+        backend = self._backend()
+        now = utcnow()
+        per_table: Dict[str, Dict[str, tuple]] = {}
+        for (table, id_), change in net.items():
+            if change[0] != "noop":
+                per_table.setdefault(table, {})[id_] = change
+        # Deletes children first, then inserts and updates parents first.
+        for table in reversed(TABLE_ORDER):
+            deletes = [id_ for id_, (state, _) in per_table.get(table, {}).items() if state == "delete"]
+            if deletes:
+                backend.apply_changes(table, _EMPTY, [], deletes)
+        for table in TABLE_ORDER:
+            changes = per_table.get(table, {})
+            upserts = [{"id": id_, "created_date": now, **values, "last_update_date": now}
+                       for id_, (state, values) in changes.items() if state == "insert"]
+            by_columns: Dict[tuple, List[dict]] = {}
+            for id_, (state, values) in changes.items():
+                if state == "update":
+                    by_columns.setdefault(tuple(sorted(values)), []).append({"id": id_, **values, "last_update_date": now})
+            if upserts or by_columns:
+                backend.apply_changes(
+                    table,
+                    _frame(table, upserts) if upserts else _EMPTY,
+                    [_frame(table, rows) for rows in by_columns.values()],
+                    [],
+                )
+
+        with self._lock:
+            # By seq, not range: rows skipped past a failing entry stay in the journal.
+            self._db.executemany("DELETE FROM journal WHERE seq = ?", [(seq,) for seq in taken])
+        for seq in taken:
+            self._held.pop(seq, None)
+        self.stats["flushed"] += len(taken)
+        self.stats["coalesced"] += len(taken) - sum(len(changes) for changes in per_table.values())
+        self.stats["batches"] += 1
+        if per_table and self._on_flush is not None:
+            self._on_flush(list(per_table))
+        return len(taken)
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._db.close()